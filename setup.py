@@ -35,4 +35,7 @@ setup(
     ],
     python_requires='>=3.9',
     package_dir={'': 'src'},
+    entry_points={
+        'console_scripts': ['osw-confidence-metric=osw_confidence_metric.cli:main'],
+    },
 )
\ No newline at end of file
@@ -0,0 +1,40 @@
+# benchmark_distributed.py
+# Scores one area on dask.distributed clusters of increasing size and reports the tile throughput of each.
+#
+#   python src/benchmark_distributed.py --area ./src/assets/caphill_mini.geojson --workers 1 2 4 8
+#   python src/benchmark_distributed.py --scheduler tcp://scheduler:8786
+import time
+import argparse
+from distributed import Client, LocalCluster
+from osw_confidence_metric.osm_data_handler import OSMDataHandler
+from osw_confidence_metric.area_analyzer import AreaAnalyzer
+
+
+def run(client, area):
+    start_time = time.time()
+    with AreaAnalyzer(osm_data_handler=OSMDataHandler(), client=client) as area_analyzer:
+        score = area_analyzer.calculate_area_confidence_score(file_path=area)
+        tiles = 0 if area_analyzer.gdf is None else len(area_analyzer.gdf.index)
+    return score, tiles, time.time() - start_time
+
+
+def report(workers, score, tiles, seconds):
+    print(f'{workers:>8} {tiles:>8} {seconds:>10.1f} {tiles / seconds:>10.2f} {score:>10.4f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tile throughput against dask.distributed worker count')
+    parser.add_argument('--area', default='./src/assets/caphill_mini.geojson')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--scheduler', help='Address of an existing cluster to benchmark at its current size')
+    args = parser.parse_args()
+
+    print(f'{"workers":>8} {"tiles":>8} {"seconds":>10} {"tiles/s":>10} {"score":>10}')
+    if args.scheduler:
+        with Client(args.scheduler) as client:
+            report(len(client.scheduler_info()['workers']), *run(client=client, area=args.area))
+    else:
+        for n_workers in args.workers:
+            with LocalCluster(n_workers=n_workers, threads_per_worker=1, dashboard_address=None) as cluster, \
+                    Client(cluster) as client:
+                report(n_workers, *run(client=client, area=args.area))
@@ -0,0 +1,110 @@
+# aggregates.py file
+
+import json
+import math
+
+# Statistics of the sidewalk edges whose means are the direct and time trust thresholds
+EDGE_THRESHOLD_COLUMNS = ['versions', 'direct_confirmations', 'tags', 'user_count', 'days_since_last_edit']
+
+
+class MeanAggregate:
+    """
+    Count and sum of the non-missing values seen so far. Aggregates of separate chunks merge into the aggregate
+    of all of them, so a mean can be built up per tile, per worker or per node.
+    """
+
+    def __init__(self, count=0, total=0.0):
+        self.count = count
+        self.total = total
+
+    def __eq__(self, other):
+        return isinstance(other, MeanAggregate) and (self.count, self.total) == (other.count, other.total)
+
+    def __repr__(self):
+        return f'MeanAggregate(count={self.count}, total={self.total})'
+
+    def __add__(self, other):
+        return self.merge(other)
+
+    def add(self, values):
+        """
+        Add a Series of values, skipping missing ones.
+        """
+        values = values.astype(float).dropna()
+        self.count += int(values.count())
+        self.total += float(values.sum())
+        return self
+
+    def merge(self, other):
+        return MeanAggregate(count=self.count + other.count, total=self.total + other.total)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def to_dict(self):
+        return {'count': self.count, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(count=data['count'], total=data['total'])
+
+
+class ThresholdAggregates:
+    """
+    Mergeable per-column mean aggregates from which trust thresholds are taken.
+
+    Every threshold in the trust model is a mean, so a count and a sum per column are enough to combine chunks
+    exactly; no approximate sketch is needed.
+    """
+
+    def __init__(self, columns, aggregates=None):
+        self.columns = list(columns)
+        self.aggregates = {col: MeanAggregate() for col in self.columns}
+        self.aggregates.update(aggregates or {})
+
+    def __eq__(self, other):
+        return isinstance(other, ThresholdAggregates) and self.aggregates == other.aggregates
+
+    @classmethod
+    def from_frame(cls, frame, columns):
+        return cls(columns=columns).update(frame=frame)
+
+    def update(self, frame):
+        """
+        Add the values of a (Geo)DataFrame chunk. Columns the chunk does not have are skipped.
+        """
+        for col in self.columns:
+            if col in frame:
+                self.aggregates[col].add(frame[col])
+        return self
+
+    def merge(self, other):
+        columns = self.columns + [col for col in other.columns if col not in self.aggregates]
+        return ThresholdAggregates(columns=columns, aggregates={
+            col: self.aggregates.get(col, MeanAggregate()).merge(other.aggregates.get(col, MeanAggregate()))
+            for col in columns
+        })
+
+    def thresholds(self):
+        """
+        Returns:
+            dict: The mean of each column (NaN for a column without values).
+        """
+        return {col: self.aggregates[col].mean for col in self.columns}
+
+    def to_dict(self):
+        return {col: self.aggregates[col].to_dict() for col in self.columns}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(columns=list(data), aggregates={col: MeanAggregate.from_dict(value) for col, value in data.items()})
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
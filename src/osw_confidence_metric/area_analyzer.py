@@ -1,109 +1,706 @@
 # area_analyzer.py file
+import os
+import copy
+import json
+import time
+import hashlib
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 import osmnx as ox
 import pandas as pd
-import dask_geopandas
 import geopandas as gpd
 import geonetworkx as gnx
 from datetime import datetime
 from shapely.ops import voronoi_diagram
 from .osm_data_handler import OSMDataHandler
+from .aggregates import MeanAggregate, ThresholdAggregates
+from .checkpoint_store import CheckpointStore
 from shapely.geometry import Polygon, MultiPolygon
 from .trust_score_calculator import TrustScoreAnalyzer
-from .utils import compute_feature_indirect_trust, calculate_overall_trust_score
+from .worker_pool import TileWorkerPool
+from .distributed_pool import DistributedTilePool
+from .pipeline_pool import PipelinedTilePool
+from .result_spill import TileResultSpill
+from .result_cache import ResultCache, canonical_shapes, get_result_key
+from .rollup import roll_up_boundaries, roll_up_quadtree
+from .element_index import ElementScoreIndex, merge_element_scores
+from .progressive import AreaEstimate, estimate_area_mean, stratified_order
+from .tile_stream import TileScoreStream
+from .utils import INDIRECT_VALUE_COLUMNS, compute_indirect_trust_scores, calculate_overall_trust_scores, \
+    extract_road_ids_from_polygon, extract_tile_road_ids
+
+
+def _get_threshold_aggregates(gdf):
+    return ThresholdAggregates.from_frame(frame=gdf, columns=INDIRECT_VALUE_COLUMNS)
 
 
 def _get_threshold_values(gdf):
-    gdf2 = pd.json_normalize(gdf['indirect_values'])
-    return {
-        'poi_count': gdf2['poi_count'].mean(),
-        'bldg_count': gdf2['bldg_count'].mean(),
-        'road_count': gdf2['road_count'].mean(),
-        'poi_users': gdf2['poi_users'].mean(),
-        'road_users': gdf2['road_users'].mean(),
-        'bldg_users': gdf2['bldg_users'].mean(),
-        'poi_time': gdf2['poi_time'].mean(),
-        'road_time': gdf2['road_time'].mean(),
-        'bldg_time': gdf2['bldg_time'].mean(),
-    }
+    return _get_threshold_aggregates(gdf=gdf).thresholds()
+
+
+def _get_sample_trust_scores(gdf, thresholds=None):
+    """
+    Trust scores of a sample of tiles, against thresholds taken over the sample where they are not supplied.
+    """
+    threshold_values = dict(thresholds or {})
+    if any(col not in threshold_values for col in INDIRECT_VALUE_COLUMNS):
+        threshold_values = {**_get_threshold_values(gdf=gdf), **threshold_values}
+    indirect_trust_scores = compute_indirect_trust_scores(gdf=gdf, thresholds=threshold_values)
+    return calculate_overall_trust_scores(gdf=gdf.assign(indirect_trust_score=indirect_trust_scores))
+
+
+def _read_area(area):
+    if isinstance(area, gpd.GeoDataFrame):
+        return area.reset_index(drop=True)
+    if isinstance(area, (Polygon, MultiPolygon)):
+        return gpd.GeoDataFrame({'geometry': [area]}, crs='epsg:4326')
+    # Read the GeoDataFrame from the file
+    return gpd.read_file(area)
+
+
+def _get_run_key(file_path, sidewalk_filter):
+    digest = hashlib.sha256(sidewalk_filter.encode())
+    if isinstance(file_path, (gpd.GeoDataFrame, Polygon, MultiPolygon)):
+        # In-memory areas are keyed on their geometry, as for the result cache
+        digest.update(json.dumps(canonical_shapes(geometries=_read_area(area=file_path).geometry)).encode())
+    elif os.path.isfile(file_path):
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    else:
+        digest.update(str(file_path).encode())
+    return digest.hexdigest()
 
 
 def _initialize_columns(gdf):
-    for col in ['direct_confirmations', 'direct_trust_score', 'time_trust_score', 'indirect_values']:
-        gdf[col] = None
+    gdf['direct_confirmations'] = None
+    for col in ['direct_trust_score', 'time_trust_score'] + INDIRECT_VALUE_COLUMNS:
+        gdf[col] = float('nan')
     return gdf
 
 
+def _assign_measures(gdf, tile_id, measures):
+    """
+    Store the measures of a tile in the typed score and indirect value columns of its row.
+    """
+    gdf.at[tile_id, 'direct_trust_score'] = measures['direct_trust_score']
+    gdf.at[tile_id, 'time_trust_score'] = measures['time_trust_score']
+    indirect_values = measures['indirect_values'] or {}
+    for col in INDIRECT_VALUE_COLUMNS:
+        gdf.at[tile_id, col] = indirect_values.get(col)
+
+
 class AreaAnalyzer:
-    def __init__(self, osm_data_handler: OSMDataHandler):
-        self.DATE = datetime.now()
-        self.PROJ = 'epsg:26910'
+    def __init__(self, osm_data_handler: OSMDataHandler, checkpoint_store: CheckpointStore = None, processes=None,
+                 thresholds=None, edge_thresholds=None, client=None, statistics_store=None, tiling='auto',
+                 map_snapshot=False, memory_budget=None, spill_dir=None, sidewalk_source='graph', pipeline=False,
+                 result_cache: ResultCache = None, snapshot_id=None, date=None, element_scores=False):
+        """
+        Args:
+            osm_data_handler (OSMDataHandler): Handler used to fetch element histories.
+            checkpoint_store (CheckpointStore): Optional store to checkpoint and resume runs.
+            processes (int): Number of worker processes scoring tiles (defaults to the CPU count).
+            thresholds (dict): Optional indirect value thresholds, for example ThresholdAggregates.thresholds() of
+                aggregates merged over earlier runs or other nodes. Values that are not supplied are the means over
+                the tiles of the run.
+            edge_thresholds (dict): Optional sidewalk edge thresholds keyed by EDGE_THRESHOLD_COLUMNS. Values that
+                are not supplied are the means over the edges of each tile.
+            client (distributed.Client): Optional dask.distributed client. When given, tiles are scored as tasks
+                on its cluster instead of on a local process pool.
+            statistics_store (ElementStatisticsStore): Optional per-element statistics table shared across tiles,
+                areas and runs.
+            tiling (string): 'auto' splits a single-polygon area into Voronoi tiles around its roads; 'none' scores
+                the features of the area as they are.
+            map_snapshot (bool): Take a map snapshot of each tile and derive the histories of its version-1 elements
+                from it, so that only edited elements need a history call.
+            memory_budget (int): Bytes of tile results kept in memory. When set, results above the budget are
+                spilled to Parquet files and the area score is aggregated from them one chunk at a time.
+            spill_dir (string): Directory for the spilled results; the system temporary directory by default.
+            sidewalk_source (string): 'graph' scores the segments of an osmnx sidewalk graph of each tile; 'ways'
+                queries the sidewalk ways as a table without building a graph and scores one row per way.
+            pipeline (bool): Score the tiles in this process through a staged pipeline, overlapping the network
+                fetches of some tiles with the scoring of others, instead of on a process pool.
+            result_cache (ResultCache): Optional store of whole-area scores, answering repeat requests for the same
+                area, as-of day, settings and data snapshot without scoring.
+            snapshot_id (string): Identifier of the state of the OSM data the scores are computed from, part of the
+                result cache key.
+            date (datetime): The as-of date of the scores; now by default. Cached results are shared by the
+                analyzers of the same as-of day.
+            element_scores (bool): Keep the trust scores of every sidewalk way in element_scores, for
+                element_index(). Areas answered by the result cache have no element scores.
+        """
+        self.DATE = date or datetime.now()
         self.SIDEWALK_FILTER = '["highway"~"footway|steps|living_street|path"]'
         self.osm_data_handler = osm_data_handler
+        self.checkpoint_store = checkpoint_store
+        if checkpoint_store is not None and getattr(osm_data_handler, 'history_store', None) is None:
+            # Checkpoint fetched histories alongside the tile results, on a copy of the caller's handler
+            self.osm_data_handler = copy.copy(osm_data_handler)
+            self.osm_data_handler.history_store = checkpoint_store
         self.trust_score = TrustScoreAnalyzer(
             sidewalk=self.SIDEWALK_FILTER,
             osm_data_handler=self.osm_data_handler,
             date=self.DATE,
-            proj=self.PROJ
+            edge_thresholds=edge_thresholds,
+            statistics_store=statistics_store,
+            map_snapshot=map_snapshot,
+            sidewalk_source=sidewalk_source,
+            element_scores=element_scores
         )
+        self.thresholds = thresholds
+        # Mergeable aggregates of the indirect values of the last scored area, to combine or save across runs
+        self.threshold_aggregates = None
+        # Trust score per tile of the last scored area, kept for roll_up_scores
+        self.tile_scores = None
+        # Per-way trust scores of the last scored area, when element_scores is set
+        self.element_scores = None
+        self._element_frames = []
         self.gdf = None
+        self.processes = processes
+        self.client = client
+        self.tiling = tiling
+        self.pipeline = pipeline
+        self.result_cache = result_cache
+        self.snapshot_id = snapshot_id
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self._run_key = None
+        self._worker_pool = None
+        # Road id table of every tile, clipped from the road network fetched to tile the area
+        self._road_ids = None
 
-    def calculate_area_confidence_score(self, file_path):
-        # Read the GeoDataFrame from the file
-        self.gdf = gpd.read_file(file_path)
+    def calculate_area_confidence_score(self, file_path, on_tile=None):
+        """
+        Calculate the confidence score of an area.
 
-        # Check if tiling is needed and create tiling if necessary
-        self._create_tiling_if_needed()
-        if self.gdf is None:
-            return 0
+        Args:
+            file_path: A file path, a GeoDataFrame or a (Multi)Polygon in EPSG:4326.
+            on_tile (callable): Optional callback called as on_tile(tile_id, polygon, measures) for every tile as its
+                measures become available, for example to stream them to a file.
+
+        Returns:
+            float: The mean trust score of the tiles (0 when the area could not be tiled). A score served from the
+            result cache is returned without tiling the area, so gdf is None, or calling on_tile.
+        """
+        self.tile_scores = None
+        self.element_scores = None
+        self._element_frames = []
+        if self.result_cache is None:
+            score, _ = self._score_area(file_path=file_path, area=file_path, on_tile=on_tile)
+        else:
+            area = _read_area(area=file_path)
+            score = self.result_cache.get(result_key=self._get_result_key(area=area))
+            if score is not None:
+                # No tiles of this area were loaded; those of an earlier area must not be reported for it
+                self.gdf = None
+            else:
+                score, date = self._score_area(file_path=file_path, area=area, on_tile=on_tile)
+                # Keyed on the date the area was scored as of, which is the original date of a resumed run
+                self.result_cache.put(result_key=self._get_result_key(area=area, date=date), score=score,
+                                      snapshot_id=self.snapshot_id)
+
+        self._merge_element_frames()
+        return score
+
+    def _merge_element_frames(self):
+        if self.trust_score.element_scores:
+            # Ways crossing tile borders are scored by every tile they cross and merged here
+            self.element_scores = merge_element_scores(frames=self._element_frames)
+            self._element_frames = []
+
+    def element_index(self):
+        """
+        Build a spatial index of the per-way scores of the last scored area.
+
+        Returns:
+            ElementScoreIndex: The index, to query or save() for lookups without the analyzer.
+        """
+        if self.element_scores is None:
+            raise ValueError('Score an area with element_scores set before indexing its elements')
+        return ElementScoreIndex(element_scores=self.element_scores)
+
+    def calculate_area_confidence_estimate(self, file_path, time_budget=None, precision=None, confidence=0.95,
+                                           batch_size=None, min_tiles=30, seed=None, on_estimate=None, on_tile=None):
+        """
+        Estimate the confidence score of an area progressively, for a usable number long before every tile is scored.
+
+        Tiles are scored in batches, in a spatially stratified random order, so the tiles scored so far are a random
+        sample spread over the whole area. After every batch the estimate of the area mean and its confidence
+        interval is passed to on_estimate. The run stops once time_budget seconds are spent, once the interval is
+        at most precision wide on either side of the mean (after at least min_tiles tiles), or once every tile is
+        scored, when the estimate is the score calculate_area_confidence_score returns. Until then, indirect value
+        thresholds that are not supplied are the means over the scored tiles. With element_scores set, element_scores
+        holds the ways of the tiles scored before the run stopped. Runs are not checkpointed and do not use the
+        result cache.
+
+        Args:
+            file_path: A file path, a GeoDataFrame or a (Multi)Polygon in EPSG:4326.
+            time_budget (float): Seconds after which no further batch is started.
+            precision (float): Half-width of the confidence interval, before clipping to [0, 1], at which to stop.
+            confidence (float): Confidence level of the interval.
+            batch_size (int): Tiles per batch; twice the number of workers by default.
+            min_tiles (int): Tiles scored before the precision target can stop the run.
+            seed (int): Seed of the tile order.
+            on_estimate (callable): Optional callback called with the AreaEstimate after every batch.
+            on_tile (callable): Optional per-tile callback, as for calculate_area_confidence_score.
+
+        Returns:
+            AreaEstimate: The last estimate.
+        """
+        self.tile_scores = None
+        self.element_scores = None
+        self._element_frames = []
+        estimate = self._estimate_area(file_path=file_path, time_budget=time_budget, precision=precision,
+                                       confidence=confidence, batch_size=batch_size, min_tiles=min_tiles, seed=seed,
+                                       on_estimate=on_estimate, on_tile=on_tile)
+        self._merge_element_frames()
+        return estimate
+
+    def _estimate_area(self, file_path, time_budget, precision, confidence, batch_size, min_tiles, seed,
+                       on_estimate, on_tile):
+        start_time = time.perf_counter()
+        output = self._load_tiles(area=file_path)
+        if output is None:
+            return AreaEstimate(mean=0, lower=0, upper=0, scored=0, tiles=0, seconds=time.perf_counter() - start_time)
+        output = _initialize_columns(gdf=output)
 
+        order = stratified_order(geometry=output.geometry, seed=seed)
+        if not order:
+            return self._estimate_area_score(output=output, scored=[], confidence=confidence, start_time=start_time)
+        batch_size = batch_size or 2 * (self.processes or os.cpu_count())
+        estimate = None
+        for batch_start in range(0, len(order), batch_size):
+            batch = order[batch_start:batch_start + batch_size]
+            tiles = [
+                (tile_id, output.geometry[tile_id]) for tile_id in batch
+                if isinstance(output.geometry[tile_id], Polygon) or isinstance(output.geometry[tile_id], MultiPolygon)
+            ]
+            for tile_id, measures in self._get_worker_pool().score_tiles(tiles=tiles, road_ids=self._road_ids):
+                _assign_measures(gdf=output, tile_id=tile_id, measures=measures)
+                self._keep_element_scores(measures=measures)
+                if on_tile is not None:
+                    on_tile(tile_id, output.geometry[tile_id], measures)
+
+            estimate = self._estimate_area_score(output=output, scored=order[:batch_start + len(batch)],
+                                                 confidence=confidence, start_time=start_time)
+            if on_estimate is not None:
+                on_estimate(estimate)
+            if estimate.complete:
+                break
+            if time_budget is not None and estimate.seconds >= time_budget:
+                break
+            if precision is not None and estimate.scored >= min_tiles and estimate.half_width <= precision:
+                break
+        return estimate
+
+    def stream_tile_scores(self, file_path, seed=None, confidence=0.95):
+        """
+        Score an area and hand out every tile as soon as it is done, instead of returning once all tiles are.
+
+        Tiles are submitted in the spatially stratified random order of calculate_area_confidence_estimate, so the
+        running estimate of the stream is taken over a sample spread over the area; it becomes the score
+        calculate_area_confidence_score returns once the last tile is done. The area is read and tiled when the
+        stream is first advanced. Only the scores of the tiles are kept, not their measures. Streams are not
+        checkpointed and do not use the result cache.
+
+        Args:
+            file_path: A file path, a GeoDataFrame or a (Multi)Polygon in EPSG:4326.
+            seed (int): Seed of the tile order.
+            confidence (float): Confidence level of the interval of the running estimate.
+
+        Returns:
+            TileScoreStream: An iterator and async iterator of (tile_id, polygon, measures) in completion order.
+        """
+        start_time = time.perf_counter()
+        output = None
+        # Tiles without a polygon count towards the mean as soon as the area is tiled, with a score of 0
+        scored = []
+
+        def results():
+            nonlocal output
+            self.tile_scores = None
+            tiles = self._load_tiles(area=file_path)
+            if tiles is None:
+                return
+            output = _initialize_columns(gdf=tiles)
+
+            polygons = []
+            for tile_id in stratified_order(geometry=output.geometry, seed=seed):
+                polygon = output.geometry[tile_id]
+                if isinstance(polygon, Polygon) or isinstance(polygon, MultiPolygon):
+                    polygons.append((tile_id, polygon))
+                else:
+                    scored.append(tile_id)
+
+            for tile_id, measures in self._get_worker_pool().score_tiles(tiles=polygons, road_ids=self._road_ids):
+                _assign_measures(gdf=output, tile_id=tile_id, measures=measures)
+                scored.append(tile_id)
+                yield tile_id, output.geometry[tile_id], measures
+
+        def estimate():
+            if output is None:
+                return None
+            return self._estimate_area_score(output=output, scored=list(scored), confidence=confidence,
+                                             start_time=start_time)
+
+        return TileScoreStream(results=results(), estimate=estimate)
+
+    def _estimate_area_score(self, output, scored, confidence, start_time):
+        if len(scored) >= len(output.index):
+            mean = self._summarize_scores(output=output)
+            return AreaEstimate(mean=mean, lower=mean, upper=mean, scored=len(scored), tiles=len(output.index),
+                                seconds=time.perf_counter() - start_time)
+
+        self.tile_scores = _get_sample_trust_scores(gdf=output.loc[scored], thresholds=self.thresholds)
+        mean, lower, upper, half_width = estimate_area_mean(scores=self.tile_scores, tiles=len(output.index),
+                                                            confidence=confidence)
+        return AreaEstimate(mean=mean, lower=lower, upper=upper, scored=len(scored), tiles=len(output.index),
+                            seconds=time.perf_counter() - start_time, half_width=half_width)
+
+    def _get_result_key(self, area, date=None):
+        settings = {
+            'thresholds': self.thresholds,
+            'edge_thresholds': self.trust_score.edge_thresholds,
+            'tiling': self.tiling,
+            'sidewalk_source': self.trust_score.sidewalk_source
+        }
+        return get_result_key(geometries=area.geometry, date=date or self.DATE, sidewalk_filter=self.SIDEWALK_FILTER,
+                              snapshot_id=self.snapshot_id, settings=settings)
+
+    def _score_area(self, file_path, area, on_tile=None):
+        """
+        Args:
+            file_path: The area as given, which keys the checkpointed run.
+            area: The area itself, or its already read GeoDataFrame.
+            on_tile (callable): Optional per-tile callback.
+
+        Returns:
+            tuple: The score of the area and the date it was scored as of.
+        """
+        # Resume a checkpointed run with its original tiling and date, if there is one
+        run = None
+        if self.checkpoint_store is not None:
+            self._run_key = _get_run_key(file_path=file_path, sidewalk_filter=self.SIDEWALK_FILTER)
+            run = self.checkpoint_store.load_run(run_key=self._run_key)
+
+        if run is None:
+            self.gdf = self._load_tiles(area=area)
+            if self.gdf is None:
+                return 0, self.DATE
+
+            if self.checkpoint_store is not None:
+                self.checkpoint_store.save_run(run_key=self._run_key, date=self.DATE, tiles=self.gdf)
+            return self._score_tiles(on_tile=on_tile), self.DATE
+
+        date, self.gdf = run
+        # The tiles of a resumed run query their own roads
+        self._road_ids = None
+        # Only the resumed run is scored as of its original date; later areas use the date of the analyzer
+        self.trust_score.date = date
+        try:
+            return self._score_tiles(on_tile=on_tile), date
+        finally:
+            self.trust_score.date = self.DATE
+
+    def _score_tiles(self, on_tile=None):
+        """
+        Score the tiles of self.gdf, skipping those an earlier run of the same checkpointed area finished.
+        """
         # Initialize columns
         self.gdf = _initialize_columns(gdf=self.gdf)
 
-        # Convert to Dask GeoDataFrame
-        df_dask = dask_geopandas.from_geopandas(self.gdf, npartitions=16, name='measures')
-
-        # Apply processing to each feature
-        output = df_dask.apply(
-            self._process_feature,
-            axis=1,
-            meta=gpd.GeoDataFrame(
-                {
-                    'geometry': 'geometry',
-                    'direct_confirmations': 'object',
-                    'direct_trust_score': 'object',
-                    'time_trust_score': 'object',
-                    'indirect_values': 'object'
-                },
-                index=[0]
-            )
-        ).compute(scheduler='multiprocessing')
-
-        # Calculate threshold values
-        threshold_values = _get_threshold_values(gdf=output)
-
-        # Calculate indirect trust scores and overall trust scores for each feature
-        output['indirect_trust_score'] = output.apply(lambda x: compute_feature_indirect_trust(
-            feature=x,
-            thresholds=threshold_values
-        ), axis=1)
-        output['trust_score'] = output.apply(lambda x: calculate_overall_trust_score(feature=x), axis=1)
+        completed = {}
+        if self.checkpoint_store is not None:
+            completed = self.checkpoint_store.load_tile_results(run_key=self._run_key)
+
+        if self.memory_budget is not None:
+            score = self._calculate_spilled_score(completed=completed, on_tile=on_tile)
+        elif completed:
+            # Score only the tiles an earlier, interrupted run did not finish and merge them back in tile order
+            finished = self.gdf.index.isin(list(completed))
+            pending = self.gdf.loc[~finished]
+            restored = self.gdf.loc[finished].copy()
+            for tile_id, measures in completed.items():
+                _assign_measures(gdf=restored, tile_id=tile_id, measures=measures)
+                self._keep_element_scores(measures=measures)
+                if on_tile is not None:
+                    on_tile(tile_id, restored.geometry[tile_id], measures)
+            outputs = [self._process_tiles(gdf=pending, on_tile=on_tile)] if len(pending.index) else []
+            output = pd.concat(outputs + [restored]).sort_index()
+            score = self._summarize_scores(output=output)
+        else:
+            score = self._summarize_scores(output=self._process_tiles(gdf=self.gdf, on_tile=on_tile))
+
+        if self.checkpoint_store is not None:
+            # A finished run is not resumed: scoring the area again starts a new run as of a new date
+            self.checkpoint_store.clear_run(run_key=self._run_key)
+        return score
+
+    def calculate_area_confidence_series(self, area, dates):
+        """
+        Calculate the confidence of an area as of each of several dates.
+
+        Every tile fetches its features and their histories once and is scored at all dates from them, instead of
+        re-running the whole area per date.
+
+        Args:
+            area: A file path, a GeoDataFrame or a (Multi)Polygon in EPSG:4326.
+            dates (list): The as-of dates (datetime).
+
+        Returns:
+            tuple: (tile_scores, area_scores). tile_scores is a DataFrame of trust scores with a row per tile and
+            a column per date, area_scores a Series of the mean trust score per date. Both are None when the area
+            could not be tiled.
+        """
+        dates = sorted(dates)
+        tiles = self._load_tiles(area=area)
+        if tiles is None:
+            return None, None
+
+        outputs = {date: _initialize_columns(gdf=tiles.copy()) for date in dates}
+        polygons = [
+            (tile_id, poly) for tile_id, poly in tiles.geometry.items()
+            if isinstance(poly, Polygon) or isinstance(poly, MultiPolygon)
+        ]
+        for tile_id, series in self._get_worker_pool().score_tiles(tiles=polygons, dates=dates,
+                                                                   road_ids=self._road_ids):
+            for date, measures in series.items():
+                _assign_measures(gdf=outputs[date], tile_id=tile_id, measures=measures)
+
+        # Thresholds are taken across the tiles of each date, as for a single-date run
+        tile_scores = pd.DataFrame(index=tiles.index)
+        area_scores = {}
+        for date, output in outputs.items():
+            area_scores[date] = self._summarize_scores(output=output)
+            tile_scores[date] = output['trust_score']
+        return tile_scores, pd.Series(area_scores, name='trust_score').rename_axis('date')
+
+    def load_tiles(self, area):
+        """
+        Read an area and split it into tiles, to be scored one by one with submit_tile.
+
+        Args:
+            area: A file path, a GeoDataFrame or a (Multi)Polygon in EPSG:4326.
+
+        Returns:
+            tuple: The tiles of the area (None if the tiling failed) and the road id tables of the tiles keyed by
+            tile id, empty when the tiles are to query their own roads.
+        """
+        tiles = self._load_tiles(area=area)
+        return tiles, dict(self._road_ids or {})
+
+    def submit_tile(self, tile_id, polygon, road_ids=None):
+        """
+        Score a tile on the worker pool of the analyzer, which is kept until close().
+
+        Args:
+            tile_id: The id of the tile.
+            polygon (Polygon): The tile.
+            road_ids (DataFrame): The road id table of the tile from load_tiles; queried when None.
+
+        Returns:
+            Future: Resolves to a (tile_id, measures) tuple.
+        """
+        return self._get_worker_pool().submit(tile_id=tile_id, polygon=polygon, road_ids=road_ids)
+
+    def summarize_tiles(self, tiles, measures):
+        """
+        Calculate the score of an area from the measures of its tiles, as calculate_area_confidence_score does.
+
+        Args:
+            tiles (GeoDataFrame): The tiles of the area from load_tiles.
+            measures (dict): The measures of the scored tiles keyed by tile id. Tiles without measures are left
+                empty, like tiles without a polygon.
+
+        Returns:
+            float: The mean trust score of the tiles.
+        """
+        output = _initialize_columns(gdf=tiles.copy())
+        for tile_id, tile_measures in measures.items():
+            _assign_measures(gdf=output, tile_id=tile_id, measures=tile_measures)
+        return self._summarize_scores(output=output)
+
+    def roll_up_scores(self, levels=None, quadtree_depth=3):
+        """
+        Roll the tile scores of the last scored area up through aggregation levels.
+
+        The tiles are scored once by calculate_area_confidence_score; every level is then merged from the mean
+        aggregates of the level below it, so any number of levels costs about as much as the tiles themselves.
+
+        Args:
+            levels (dict): Boundary GeoDataFrames keyed by level name, from the finest (e.g. blocks) to the
+                coarsest (e.g. the city). An automatic quadtree over the tiles is used when omitted.
+            quadtree_depth (int): Levels of the automatic quadtree below its root cell.
+
+        Returns:
+            dict: A GeoDataFrame of units per level, keyed by level name from the finest to the coarsest, with the
+            number of scored tiles (tiles) and their mean trust score (trust_score) of every unit.
+        """
+        if self.tile_scores is None:
+            raise ValueError('Score an area before rolling up its tile scores')
+        if levels is not None:
+            return roll_up_boundaries(tile_scores=self.tile_scores, tile_geometry=self.gdf.geometry, levels=levels)
+        return roll_up_quadtree(tile_scores=self.tile_scores, tile_geometry=self.gdf.geometry, depth=quadtree_depth)
+
+    def _load_tiles(self, area):
+        """
+        Read an area and split it into tiles when it is a single polygon.
+
+        Args:
+            area: A file path, a GeoDataFrame or a (Multi)Polygon in EPSG:4326.
+
+        Returns:
+            GeoDataFrame: The tiles of the area, or None if the tiling failed.
+        """
+        self.gdf = _read_area(area=area)
+        self._road_ids = None
+
+        # Check if tiling is needed and create tiling if necessary
+        self._create_tiling_if_needed()
+        return self.gdf
+
+    def _get_worker_pool(self):
+        if self._worker_pool is None:
+            if self.client is not None:
+                self._worker_pool = DistributedTilePool(client=self.client, trust_score=self.trust_score)
+            elif self.pipeline:
+                self._worker_pool = PipelinedTilePool(trust_score=self.trust_score)
+            else:
+                self._worker_pool = TileWorkerPool(trust_score=self.trust_score, processes=self.processes)
+        return self._worker_pool
+
+    def close(self):
+        """
+        Stop the worker pool owned by the analyzer. A dask.distributed client is left running for its owner.
+        """
+        if self._worker_pool is not None:
+            self._worker_pool.close()
+            self._worker_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _process_tiles(self, gdf, on_tile=None):
+        output = gdf.copy()
+        tiles = [
+            (tile_id, poly) for tile_id, poly in gdf.geometry.items()
+            if isinstance(poly, Polygon) or isinstance(poly, MultiPolygon)
+        ]
+
+        # Score the tiles on the warm worker pool and record each one as it completes
+        for tile_id, measures in self._get_worker_pool().score_tiles(tiles=tiles, road_ids=self._road_ids):
+            _assign_measures(gdf=output, tile_id=tile_id, measures=measures)
+            self._record_tile(tile_id=tile_id, polygon=output.geometry[tile_id], measures=measures, on_tile=on_tile)
+        return output
+
+    def _record_tile(self, tile_id, polygon, measures, on_tile=None):
+        self._keep_element_scores(measures=measures)
+        if self.checkpoint_store is not None:
+            self.checkpoint_store.save_tile_result(run_key=self._run_key, tile_id=tile_id, measures=measures)
+        if on_tile is not None:
+            on_tile(tile_id, polygon, measures)
+
+    def _keep_element_scores(self, measures):
+        if measures is not None and measures.get('element_scores') is not None:
+            self._element_frames.append(measures['element_scores'])
+
+    def _calculate_spilled_score(self, completed, on_tile=None):
+        """
+        Score the tiles of self.gdf keeping at most `memory_budget` bytes of tile results in memory.
+
+        Args:
+            completed (dict): Measures of the tiles finished by an earlier run, keyed by tile id.
+            on_tile (callable): Optional per-tile callback, as for calculate_area_confidence_score.
+
+        Returns:
+            float: The mean trust score of the tiles.
+        """
+        with TileResultSpill(memory_budget=self.memory_budget, directory=self.spill_dir) as results:
+            for tile_id, measures in completed.items():
+                results.add(tile_id=tile_id, measures=measures)
+                self._keep_element_scores(measures=measures)
+                if on_tile is not None:
+                    on_tile(tile_id, self.gdf.geometry[tile_id], measures)
+
+            tiles = []
+            for tile_id, poly in self.gdf.loc[~self.gdf.index.isin(list(completed))].geometry.items():
+                if isinstance(poly, Polygon) or isinstance(poly, MultiPolygon):
+                    tiles.append((tile_id, poly))
+                else:
+                    # Tiles without a polygon still count towards the mean, with a score of 0
+                    results.add(tile_id=tile_id, measures=None)
+
+            for tile_id, measures in self._get_worker_pool().score_tiles(tiles=tiles, road_ids=self._road_ids):
+                results.add(tile_id=tile_id, measures=measures)
+                self._record_tile(tile_id=tile_id, polygon=self.gdf.geometry[tile_id], measures=measures,
+                                  on_tile=on_tile)
+            return self._summarize_spilled_scores(results=results)
+
+    def _summarize_spilled_scores(self, results):
+        """
+        Calculate the mean trust score of spilled tile results, reading one chunk at a time: a first pass merges
+        the threshold aggregates, a second one scores every chunk against the thresholds.
+        """
+        self.threshold_aggregates = ThresholdAggregates(columns=INDIRECT_VALUE_COLUMNS)
+        for frame in results.frames():
+            self.threshold_aggregates.update(frame=frame)
+        threshold_values = dict(self.thresholds or {})
+        if any(col not in threshold_values for col in INDIRECT_VALUE_COLUMNS):
+            threshold_values = {**self.threshold_aggregates.thresholds(), **threshold_values}
+
+        trust_score = MeanAggregate()
+        tile_scores = []
+        for frame in results.frames():
+            frame['indirect_trust_score'] = compute_indirect_trust_scores(gdf=frame, thresholds=threshold_values)
+            tile_scores.append(calculate_overall_trust_scores(gdf=frame))
+            trust_score.add(tile_scores[-1])
+        # One float per tile is kept for roll-ups
+        self.tile_scores = pd.concat(tile_scores).rename('trust_score') if tile_scores else None
+        return trust_score.mean
+
+    def _summarize_scores(self, output):
+        # Calculate threshold values, unless all of them were supplied
+        self.threshold_aggregates = _get_threshold_aggregates(gdf=output)
+        threshold_values = dict(self.thresholds or {})
+        if any(col not in threshold_values for col in INDIRECT_VALUE_COLUMNS):
+            threshold_values = {**self.threshold_aggregates.thresholds(), **threshold_values}
+
+        # Calculate indirect trust scores and overall trust scores for all features at once
+        output['indirect_trust_score'] = compute_indirect_trust_scores(gdf=output, thresholds=threshold_values)
+        output['trust_score'] = calculate_overall_trust_scores(gdf=output)
+        self.tile_scores = output['trust_score']
 
         # Calculate the mean trust score
         mean_trust_score = output['trust_score'].mean()
         return mean_trust_score
 
     def _create_tiling_if_needed(self):
-        if len(self.gdf.index) == 1:
+        if self.tiling != 'none' and len(self.gdf.index) == 1:
+            polygon = self.gdf.geometry.loc[0]
             try:
-                gdf_roads_simplified = ox.graph.graph_from_polygon(
-                    self.gdf.geometry.loc[0], network_type='drive', simplify=True, retain_all=True
-                )
-                self.gdf = self._create_voronoi_diagram(gdf_edges=gdf_roads_simplified, bounds=self.gdf.geometry.loc[0])
+                with self.osm_data_handler.overpass():
+                    self._create_tiling(polygon=polygon)
             except Exception as e:
                 print("No voronoi diagram created in confidence lib: ",e)
                 self.gdf = None
+                self._road_ids = None
+
+    def _create_tiling(self, polygon):
+        gdf_roads_simplified = ox.graph.graph_from_polygon(
+            polygon, network_type='drive', simplify=True, retain_all=True
+        )
+        self.gdf = self._create_voronoi_diagram(gdf_edges=gdf_roads_simplified, bounds=polygon)
+        # The unsimplified, edge-truncated network is clipped to each tile for its road ids instead of a road query
+        # per tile. It comes from the same Overpass query as the tiling, answered from the osmnx cache.
+        roads = ox.graph.graph_from_polygon(
+            polygon, network_type='drive', simplify=False, retain_all=True, truncate_by_edge=True
+        )
+        self._road_ids = extract_tile_road_ids(
+            tiles=self.gdf, roads=gnx.graph_edges_to_gdf(roads), road_ids=extract_road_ids_from_polygon(polygon)
+        )
 
     def _create_voronoi_diagram(self, gdf_edges, bounds):
         """
@@ -111,17 +708,7 @@ class AreaAnalyzer:
         """
         gdf_roads_simplified = gnx.graph_edges_to_gdf(gdf_edges)
         voronoi = voronoi_diagram(gdf_roads_simplified.boundary.unary_union, envelope=bounds)
-        voronoi_gdf = gpd.GeoDataFrame({'geometry': voronoi.geoms})
-        voronoi_gdf.set_crs(self.PROJ)
+        voronoi_gdf = gpd.GeoDataFrame({'geometry': voronoi.geoms}, crs=gdf_roads_simplified.crs)
         voronoi_gdf_clipped = gpd.clip(voronoi_gdf, bounds)
 
         return voronoi_gdf_clipped
-
-    def _process_feature(self, feature):
-        poly = feature.geometry
-        if isinstance(poly, Polygon) or isinstance(poly, MultiPolygon):
-            measures = self.trust_score.get_measures_from_polygon(polygon=poly)
-            feature['direct_trust_score'] = measures['direct_trust_score']
-            feature['time_trust_score'] = measures['time_trust_score']
-            feature['indirect_values'] = measures['indirect_values']
-        return feature
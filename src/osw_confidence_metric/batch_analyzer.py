@@ -0,0 +1,71 @@
+# batch_analyzer.py file
+
+import copy
+from shapely.geometry import Polygon, MultiPolygon
+from .area_analyzer import AreaAnalyzer
+from .checkpoint_store import CheckpointStore
+from .history_cache import MemoryHistoryCache
+from .osm_data_handler import OSMDataHandler
+
+
+class BatchAreaAnalyzer:
+    """
+    Scores many areas on one long-lived worker pool.
+
+    The tiles of all areas are scheduled together. Every worker keeps its analyzer, and with it an in-memory
+    history cache, for the life of the pool, so elements shared by bordering areas are fetched once per worker.
+    When a cache directory is given, fetched histories are also shared on disk between workers and runs.
+    With a dask.distributed client, the tiles are scheduled on its cluster instead.
+    """
+
+    def __init__(self, osm_data_handler: OSMDataHandler, processes=None, cache_dir=None, cache_size=100000,
+                 client=None, statistics_store=None, map_snapshot=False):
+        backing_store = CheckpointStore(path=cache_dir) if cache_dir else osm_data_handler.history_store
+        if not isinstance(backing_store, MemoryHistoryCache):
+            # The caches are set on a copy of the caller's handler, which is left as it was
+            osm_data_handler = copy.copy(osm_data_handler)
+            osm_data_handler.history_store = MemoryHistoryCache(max_items=cache_size, backing_store=backing_store)
+        self.area_analyzer = AreaAnalyzer(osm_data_handler=osm_data_handler, processes=processes, client=client,
+                                          statistics_store=statistics_store, map_snapshot=map_snapshot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.area_analyzer.close()
+
+    def calculate_area_confidence_scores(self, areas):
+        """
+        Calculate the confidence score of every area.
+
+        Args:
+            areas (list): File paths, GeoDataFrames or (Multi)Polygons in EPSG:4326.
+
+        Returns:
+            list: The mean trust score of each area, in input order (0 when an area could not be tiled).
+        """
+        tiled = [self.area_analyzer.load_tiles(area=area) for area in areas]
+
+        # Submit the tiles of every area before waiting on any of them, so the pool stays busy across areas
+        futures = []
+        for tiles, road_ids in tiled:
+            area_futures = {}
+            if tiles is not None:
+                for tile_id, polygon in tiles.geometry.items():
+                    if isinstance(polygon, Polygon) or isinstance(polygon, MultiPolygon):
+                        area_futures[tile_id] = self.area_analyzer.submit_tile(
+                            tile_id=tile_id, polygon=polygon, road_ids=road_ids.get(tile_id)
+                        )
+            futures.append(area_futures)
+
+        scores = []
+        for (tiles, _), area_futures in zip(tiled, futures):
+            if tiles is None:
+                scores.append(0)
+                continue
+            measures = dict(future.result() for future in area_futures.values())
+            scores.append(self.area_analyzer.summarize_tiles(tiles=tiles, measures=measures))
+        return scores
@@ -0,0 +1,106 @@
+# checkpoint_store.py file
+
+import os
+import pickle
+import sqlite3
+from datetime import datetime
+from contextlib import contextmanager
+
+
+class CheckpointStore:
+    """
+    Local SQLite store for the progress of long-running scoring jobs.
+
+    It keeps the tiling and as-of date of every unfinished run, the measures of each finished tile and the
+    histories fetched from the OSM API. Only the file path is held on the instance, so the store can be shipped
+    to worker processes, each of which opens its own connection.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (string): Path of the SQLite file, or of a directory in which `checkpoint.sqlite` is created. A
+                path ending in a separator names a directory, which is created if it does not exist.
+        """
+        if os.path.isdir(path) or path.endswith(os.sep) or path.endswith('/'):
+            os.makedirs(path, exist_ok=True)
+            path = os.path.join(path, 'checkpoint.sqlite')
+        self.path = path
+        with self._connect() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (run_key TEXT PRIMARY KEY, date TEXT, tiles BLOB);
+                CREATE TABLE IF NOT EXISTS tiles (
+                    run_key TEXT, tile_id INTEGER, measures BLOB, PRIMARY KEY (run_key, tile_id)
+                );
+                CREATE TABLE IF NOT EXISTS histories (
+                    element_type TEXT, osmid INTEGER, history BLOB, PRIMARY KEY (element_type, osmid)
+                );
+            """)
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def load_run(self, run_key):
+        """
+        Returns:
+            tuple: The as-of date and the tiles GeoDataFrame of the run, or None if the run is unknown.
+        """
+        with self._connect() as connection:
+            row = connection.execute('SELECT date, tiles FROM runs WHERE run_key = ?', (run_key,)).fetchone()
+        if row is None:
+            return None
+        return datetime.fromisoformat(row[0]), pickle.loads(row[1])
+
+    def save_run(self, run_key, date, tiles):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO runs (run_key, date, tiles) VALUES (?, ?, ?)',
+                (run_key, date.isoformat(), pickle.dumps(tiles))
+            )
+
+    def load_tile_results(self, run_key):
+        """
+        Returns:
+            dict: The measures of every finished tile of the run, keyed by tile id.
+        """
+        with self._connect() as connection:
+            rows = connection.execute('SELECT tile_id, measures FROM tiles WHERE run_key = ?', (run_key,)).fetchall()
+        return {tile_id: pickle.loads(measures) for tile_id, measures in rows}
+
+    def save_tile_result(self, run_key, tile_id, measures):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO tiles (run_key, tile_id, measures) VALUES (?, ?, ?)',
+                (run_key, int(tile_id), pickle.dumps(measures))
+            )
+
+    def clear_run(self, run_key):
+        """
+        Drop a finished run. Once no unfinished run is left, the histories are dropped as well, so that later runs
+        fetch the current ones.
+        """
+        with self._connect() as connection:
+            connection.execute('DELETE FROM tiles WHERE run_key = ?', (run_key,))
+            connection.execute('DELETE FROM runs WHERE run_key = ?', (run_key,))
+            if connection.execute('SELECT 1 FROM runs LIMIT 1').fetchone() is None:
+                connection.execute('DELETE FROM histories')
+
+    def get_history(self, element_type, osmid):
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT history FROM histories WHERE element_type = ? AND osmid = ?', (element_type, int(osmid))
+            ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def put_history(self, element_type, osmid, history):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO histories (element_type, osmid, history) VALUES (?, ?, ?)',
+                (element_type, int(osmid), pickle.dumps(history))
+            )
@@ -0,0 +1,223 @@
+# cli.py file
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import pstats
+import argparse
+import cProfile
+import functools
+import osmnx as ox
+from .area_analyzer import AreaAnalyzer
+from .checkpoint_store import CheckpointStore
+from .element_index import ElementScoreIndex, merge_element_scores
+from .element_statistics import ElementStatisticsStore
+from .history_cache import MemoryHistoryCache
+from .history_store import ArrowHistoryStore
+from .osm_data_handler import OSMDataHandler
+from .request_archive import RequestArchive
+from .result_cache import ResultCache
+from .single_flight import FlightStore
+from .tile_writers import open_tile_writer
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='osw-confidence-metric',
+        description='Calculate the confidence score of one or many GeoJSON areas.'
+    )
+    parser.add_argument('areas', nargs='+', help='Area files (GeoJSON or any format geopandas reads).')
+    parser.add_argument('--workers', type=int, default=None, help='Number of tile workers (default: CPU count).')
+    parser.add_argument('--executor', choices=['process', 'distributed', 'pipeline'], default='process',
+                        help='Score tiles on a local process pool, on a dask.distributed cluster, or through an '
+                             'in-process pipeline that overlaps network fetches with scoring.')
+    parser.add_argument('--scheduler', help='dask.distributed scheduler address; a LocalCluster is started '
+                                            'when omitted.')
+    parser.add_argument('--cache-dir', help='Directory of the checkpoint store: resumes interrupted runs and keeps '
+                                            'the histories fetched by them.')
+    parser.add_argument('--history-dir', help='Directory of a shared Arrow history store.')
+    parser.add_argument('--statistics', help='Path of a shared per-element statistics table.')
+    parser.add_argument('--flight-store', help='Path of a store through which worker processes share concurrent '
+                                               'history requests.')
+    parser.add_argument('--result-cache', help='Path of a store of whole-area scores answering repeat requests.')
+    parser.add_argument('--snapshot-id', help='Identifier of the OSM data state, part of the result cache key.')
+    parser.add_argument('--osmnx-cache-dir', help='Directory of cached Overpass responses, reused before the network.')
+    parser.add_argument('--map-snapshot', action='store_true',
+                        help='Take a map snapshot of each tile and only request the histories of edited elements.')
+    parser.add_argument('--sidewalk-source', choices=['graph', 'ways'], default='graph',
+                        help="'graph' scores the segments of a sidewalk graph; 'ways' scores the sidewalk ways "
+                             "without building a graph.")
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument('--record', metavar='DIR', help='Record every OSM API and Overpass response to DIR.')
+    archive.add_argument('--replay', metavar='DIR', help='Serve OSM API and Overpass responses recorded in DIR, '
+                                                        'offline.')
+    parser.add_argument('--replay-latency', default=None,
+                        help="Latency simulated per replayed request: 'recorded' or a number of seconds.")
+    parser.add_argument('--tiling', choices=['auto', 'none'], default='auto',
+                        help="'auto' splits single-polygon areas into Voronoi tiles; 'none' uses the features as "
+                             "tiles.")
+    parser.add_argument('--memory-budget', type=int, help='Megabytes of tile results kept in memory per area; '
+                                                          'the rest is spilled to disk.')
+    parser.add_argument('--spill-dir', help='Directory for spilled tile results (default: the temporary directory).')
+    parser.add_argument('--time-budget', type=float, help='Seconds after which an area is scored from the tiles '
+                                                          'done so far, with a confidence interval.')
+    parser.add_argument('--precision', type=float, help='Stop scoring an area once the half-width of its '
+                                                        'confidence interval is at most this.')
+    parser.add_argument('--output', help='Stream per-tile results to this file.')
+    parser.add_argument('--element-index', help='Save the trust scores of every sidewalk way of the areas to this '
+                                                'GeoParquet file, for lookups with ElementScoreIndex.')
+    parser.add_argument('--format', choices=['parquet', 'csv'], dest='output_format',
+                        help='Per-tile output format (default: from the output extension, GeoParquet otherwise).')
+    parser.add_argument('--profile', help='Write a profile report of the run to this file.')
+    parser.add_argument('--username', default='', help='OSM API username.')
+    parser.add_argument('--password', default='', help='OSM API password.')
+    return parser
+
+
+def _build_checkpoint_store(args):
+    if not args.cache_dir:
+        return None
+    # --cache-dir always names a directory, created when it does not exist yet
+    return CheckpointStore(path=os.path.join(args.cache_dir, ''))
+
+
+def _build_history_store(args):
+    backing_store = None
+    if args.history_dir:
+        backing_store = ArrowHistoryStore(path=args.history_dir)
+    elif args.cache_dir:
+        backing_store = _build_checkpoint_store(args)
+    return MemoryHistoryCache(backing_store=backing_store)
+
+
+def _build_archive(args):
+    if args.record:
+        return RequestArchive(path=args.record, mode='record')
+    if args.replay:
+        latency = args.replay_latency
+        if latency is not None and latency != 'recorded':
+            latency = float(latency)
+        return RequestArchive(path=args.replay, mode='replay', latency=latency)
+    return None
+
+
+def _build_client(args):
+    if args.executor != 'distributed':
+        return None
+    from distributed import Client, LocalCluster
+
+    if args.scheduler:
+        return Client(args.scheduler)
+    return Client(LocalCluster(n_workers=args.workers, threads_per_worker=1, dashboard_address=None))
+
+
+def _write_tile(writer, area, tile_id, polygon, measures):
+    writer.write(area=area, tile_id=tile_id, polygon=polygon, measures=measures)
+
+
+def run(args, out=None):
+    """
+    Score every area of the parsed arguments, printing one JSON summary line per area.
+
+    Returns:
+        list: The summary of each area.
+    """
+    out = out or sys.stdout
+    if args.osmnx_cache_dir:
+        ox.settings.use_cache = True
+        ox.settings.cache_folder = args.osmnx_cache_dir
+
+    statistics_store = ElementStatisticsStore(path=args.statistics) if args.statistics else None
+
+    osm_data_handler = OSMDataHandler(username=args.username, password=args.password,
+                                      history_store=_build_history_store(args), archive=_build_archive(args),
+                                      flight_store=FlightStore(path=args.flight_store) if args.flight_store else None)
+    client = _build_client(args)
+    writer = open_tile_writer(path=args.output, output_format=args.output_format) if args.output else None
+    summaries = []
+    element_scores = []
+    try:
+        with AreaAnalyzer(
+            osm_data_handler=osm_data_handler,
+            checkpoint_store=_build_checkpoint_store(args),
+            processes=args.workers,
+            client=client,
+            statistics_store=statistics_store,
+            tiling=args.tiling,
+            map_snapshot=args.map_snapshot,
+            sidewalk_source=args.sidewalk_source,
+            pipeline=args.executor == 'pipeline',
+            result_cache=ResultCache(path=args.result_cache) if args.result_cache else None,
+            snapshot_id=args.snapshot_id,
+            memory_budget=args.memory_budget * 2 ** 20 if args.memory_budget else None,
+            spill_dir=args.spill_dir,
+            element_scores=bool(args.element_index)
+        ) as area_analyzer:
+            for area in args.areas:
+                start_time = time.time()
+                on_tile = functools.partial(_write_tile, writer, area) if writer is not None else None
+                estimate = None
+                if args.time_budget is not None or args.precision is not None:
+                    estimate = area_analyzer.calculate_area_confidence_estimate(
+                        file_path=area, time_budget=args.time_budget, precision=args.precision, on_tile=on_tile
+                    )
+                    score = float(estimate.mean)
+                else:
+                    score = float(area_analyzer.calculate_area_confidence_score(file_path=area, on_tile=on_tile))
+                seconds = time.time() - start_time
+                tiles = 0 if area_analyzer.gdf is None else len(area_analyzer.gdf.index)
+                summary = {
+                    'area': area,
+                    'score': None if math.isnan(score) else score,
+                    'tiles': tiles,
+                    'seconds': round(seconds, 3),
+                    'tiles_per_second': round(tiles / seconds, 3) if seconds else None
+                }
+                if estimate is not None:
+                    summary.update({'lower': estimate.lower, 'upper': estimate.upper, 'tiles_scored': estimate.scored})
+                summaries.append(summary)
+                print(json.dumps(summary), file=out, flush=True)
+                if area_analyzer.element_scores is not None:
+                    element_scores.append(area_analyzer.element_scores)
+        if args.element_index:
+            ElementScoreIndex(element_scores=merge_element_scores(frames=element_scores)).save(args.element_index)
+    finally:
+        if writer is not None:
+            writer.close()
+        if client is not None:
+            # A LocalCluster started for the run is closed with it; a remote cluster is left running
+            cluster = client.cluster
+            client.close()
+            if cluster is not None:
+                cluster.close()
+    return summaries
+
+
+def _write_profile(path, profile, summaries):
+    stream = io.StringIO()
+    stream.write('Areas\n')
+    for summary in summaries:
+        stream.write(json.dumps(summary) + '\n')
+    stream.write('\nProfile of the coordinating process (cumulative time)\n')
+    pstats.Stats(profile, stream=stream).sort_stats('cumulative').print_stats(50)
+    with open(path, 'w') as f:
+        f.write(stream.getvalue())
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        run(args)
+        return 0
+
+    profile = cProfile.Profile()
+    summaries = profile.runcall(run, args)
+    _write_profile(path=args.profile, profile=profile, summaries=summaries)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# distributed_pool.py file
+
+import copy
+from shapely import wkb
+
+
+def _score_tile(trust_score, tile_id, geometry_wkb, date, dates=None, road_ids=None):
+    polygon = wkb.loads(geometry_wkb)
+    # The scattered analyzer is shared by the tasks of a worker, so the current as-of date is set on a copy
+    trust_score = copy.copy(trust_score)
+    trust_score.date = date
+    if dates is not None:
+        return tile_id, trust_score.get_measures_series_from_polygon(polygon=polygon, dates=dates, road_ids=road_ids)
+    return tile_id, trust_score.get_measures_from_polygon(polygon=polygon, road_ids=road_ids)
+
+
+class DistributedTilePool:
+    """
+    Scores tiles as tasks on a dask.distributed cluster, with the same interface as TileWorkerPool.
+
+    The TrustScoreAnalyzer is scattered to every worker once. Its deserialized copy stays in worker memory and is
+    reused by every tile scheduled there, so the in-memory history cache of its OSMDataHandler is shared by all of
+    the worker's tasks. Tasks only carry the tile id, the WKB of its geometry and the current as-of date of the
+    analyzer. The client is owned by the caller and is not closed by the pool.
+    """
+
+    def __init__(self, client, trust_score):
+        self.client = client
+        self.trust_score = trust_score
+        self._trust_score_future = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_trust_score_future(self):
+        if self._trust_score_future is None:
+            # Each task scores one tile, so the sidewalk edges of a tile are scored in the worker's own thread
+            trust_score = copy.copy(self.trust_score)
+            trust_score.scheduler = 'synchronous'
+            # A unique key, so releasing it never cancels the tasks of another pool holding an equal analyzer
+            self._trust_score_future = self.client.scatter(trust_score, broadcast=True, hash=False)
+        return self._trust_score_future
+
+    def submit(self, tile_id, polygon, dates=None, road_ids=None):
+        """
+        Returns:
+            distributed.Future: Resolves to a (tile_id, measures) tuple. When dates are given, the measures are a
+            dictionary of the measures as of each date.
+        """
+        return self.client.submit(
+            _score_tile, self._get_trust_score_future(), tile_id, polygon.wkb, self.trust_score.date,
+            None if dates is None else list(dates), road_ids, pure=False
+        )
+
+    def score_tiles(self, tiles, dates=None, road_ids=None):
+        """
+        Score tiles on the cluster.
+
+        Args:
+            tiles (iterable): (tile_id, polygon) pairs.
+            dates (list): Optional as-of dates to score every tile at, from a single fetch per tile.
+            road_ids (dict): Optional road id tables keyed by tile id; the roads of other tiles are queried.
+
+        Yields:
+            tuple: (tile_id, measures) pairs in completion order.
+        """
+        from distributed import as_completed
+
+        road_ids = road_ids or {}
+        futures = [
+            self.submit(tile_id=tile_id, polygon=polygon, dates=dates, road_ids=road_ids.get(tile_id))
+            for tile_id, polygon in tiles
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Tasks not finished yet are cancelled when the caller stops early
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        if self._trust_score_future is not None:
+            self._trust_score_future.release()
+            self._trust_score_future = None
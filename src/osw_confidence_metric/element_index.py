@@ -0,0 +1,144 @@
+# element_index.py file
+
+import numpy as np
+import pandas as pd
+import shapely
+import geopandas as gpd
+from shapely.geometry import box
+
+ELEMENT_SCORE_COLUMNS = ['osmid', 'direct_trust_score', 'time_trust_score', 'geometry']
+# The scored graph segments of a tile, before they are merged into ways
+ELEMENT_SEGMENT_COLUMNS = ['osmid', 'u', 'v', 'direct_trust_score', 'time_trust_score', 'geometry']
+
+
+def _merge_lines(parts):
+    if len(parts) == 1:
+        return parts.iloc[0]
+    return shapely.line_merge(shapely.union_all(list(parts)))
+
+
+def _element_rows(frame, columns):
+    rows = pd.DataFrame(frame[columns])
+    rows['osmid'] = rows['osmid'].astype('int64')
+    for col in ['direct_trust_score', 'time_trust_score']:
+        rows[col] = pd.to_numeric(rows[col], errors='coerce')
+    return rows
+
+
+def merge_element_scores(frames):
+    """
+    Merge scored sidewalk segments into one row per way.
+
+    Frames with u and v columns hold graph segments; a segment clipped into several tiles is counted once, with the
+    mean of its scores. The scores of a way are then the means over its rows, and its geometry the union of their
+    lines, so the segments of a graph, or a way scored by several tiles, become a single element.
+
+    Args:
+        frames (list): DataFrames with ELEMENT_SEGMENT_COLUMNS, as kept per tile, or ELEMENT_SCORE_COLUMNS, in
+            EPSG:4326.
+
+    Returns:
+        GeoDataFrame: ELEMENT_SCORE_COLUMNS with a row per way id.
+    """
+    frames = [frame for frame in frames if frame is not None and len(frame.index)]
+    if not frames:
+        return gpd.GeoDataFrame(columns=ELEMENT_SCORE_COLUMNS, geometry='geometry', crs='epsg:4326')
+
+    rows = [_element_rows(frame=frame, columns=ELEMENT_SCORE_COLUMNS) for frame in frames
+            if not {'u', 'v'}.issubset(frame.columns)]
+    segment_frames = [frame for frame in frames if {'u', 'v'}.issubset(frame.columns)]
+    if segment_frames:
+        segments = pd.concat([_element_rows(frame=frame, columns=ELEMENT_SEGMENT_COLUMNS)
+                              for frame in segment_frames], ignore_index=True)
+        grouped = segments.groupby(['osmid', 'u', 'v'], sort=False)
+        distinct = grouped[['direct_trust_score', 'time_trust_score']].mean()
+        distinct['geometry'] = grouped['geometry'].first()
+        rows.append(distinct.reset_index()[ELEMENT_SCORE_COLUMNS])
+
+    elements = pd.concat(rows, ignore_index=True)
+    grouped = elements.groupby('osmid')
+    scores = grouped[['direct_trust_score', 'time_trust_score']].mean()
+    scores['geometry'] = grouped['geometry'].agg(_merge_lines)
+    return gpd.GeoDataFrame(scores.reset_index(), geometry='geometry', crs='epsg:4326')[ELEMENT_SCORE_COLUMNS]
+
+
+class ElementScoreIndex:
+    """
+    Spatial index of per-way trust scores, answering point, line and bounding box lookups without any analysis.
+
+    The scores are kept in a GeoDataFrame with an STRtree over its geometries, projected to the local UTM zone of
+    the ways so that distances are in meters. save() writes the scores to a GeoParquet file; load() reads them back
+    and bulk-loads a new tree, which takes a fraction of a second even for a city, after which every lookup is a
+    tree query.
+    """
+
+    def __init__(self, element_scores):
+        """
+        Args:
+            element_scores (GeoDataFrame): ELEMENT_SCORE_COLUMNS in EPSG:4326, e.g. AreaAnalyzer.element_scores.
+        """
+        self.scores = element_scores.reset_index(drop=True)
+        # An empty index has no zone to estimate, and nothing to measure
+        self.crs = self.scores.estimate_utm_crs() if len(self.scores.index) else self.scores.crs
+        self._tree = shapely.STRtree(self.scores.geometry.to_crs(self.crs).values)
+
+    def __len__(self):
+        return len(self.scores.index)
+
+    def __getstate__(self):
+        # The tree is rebuilt from the geometries rather than pickled
+        return {'scores': self.scores}
+
+    def __setstate__(self, state):
+        self.__init__(element_scores=state['scores'])
+
+    def _project(self, geometry):
+        return gpd.GeoSeries([geometry], crs='epsg:4326').to_crs(self.crs).iloc[0]
+
+    def save(self, path):
+        """
+        Write the scores to a GeoParquet file.
+        """
+        self.scores.to_parquet(path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns:
+            ElementScoreIndex: The index of the scores saved at path.
+        """
+        return cls(element_scores=gpd.read_parquet(path))
+
+    def query(self, geometry, distance=0):
+        """
+        Look up the ways near a geometry.
+
+        Args:
+            geometry: A point, line or polygon, or a (minx, miny, maxx, maxy) bounding box, in EPSG:4326.
+            distance (float): Also return the ways within this distance, in meters.
+
+        Returns:
+            GeoDataFrame: The rows of the ways intersecting the geometry, or within distance of it.
+        """
+        if isinstance(geometry, (tuple, list)):
+            geometry = box(*geometry)
+        geometry = self._project(geometry=geometry)
+        if distance:
+            indices = self._tree.query(geometry, predicate='dwithin', distance=distance)
+        else:
+            indices = self._tree.query(geometry, predicate='intersects')
+        return self.scores.iloc[np.sort(indices)]
+
+    def nearest(self, point, max_distance=None):
+        """
+        Look up the way closest to a point, e.g. the segment a route is about to use.
+
+        Args:
+            point (Point): The point, in EPSG:4326.
+            max_distance (float): Only consider ways within this distance, in meters.
+
+        Returns:
+            GeoDataFrame: The closest way, or all ways tied for closest; empty when none is within max_distance.
+        """
+        indices = self._tree.query_nearest(self._project(geometry=point), max_distance=max_distance)
+        return self.scores.iloc[np.sort(indices)]
@@ -0,0 +1,165 @@
+# element_statistics.py file
+
+import sqlite3
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from .utils import calculate_direct_confirmations, count_tag_changes, check_for_rollbacks, \
+    calculate_number_users_edited, count_tags
+
+STATISTIC_COLUMNS = ['versions', 'direct_confirmations', 'changes_to_tags', 'rollbacks', 'user_count', 'tags',
+                     'last_edit']
+
+
+def compute_element_statistics(historical_info):
+    """
+    Calculate the date-independent statistics of an element from its (already date-filtered) history.
+
+    Args:
+        historical_info (dict): Historical information about an element.
+
+    Returns:
+        dict: The statistics keyed by STATISTIC_COLUMNS, or None for an empty history.
+    """
+    if not historical_info:
+        return None
+    return {
+        'versions': len(historical_info),
+        'direct_confirmations': calculate_direct_confirmations(historical_info=historical_info),
+        'changes_to_tags': count_tag_changes(historical_info=historical_info),
+        'rollbacks': int(check_for_rollbacks(historical_info=historical_info)),
+        'user_count': calculate_number_users_edited(historical_info=historical_info),
+        'tags': count_tags(historical_info),
+        'last_edit': max(edge['timestamp'] for edge in historical_info.values()),
+    }
+
+
+def statistics_as_of(statistics, date):
+    """
+    Returns:
+        dict: The statistics with the days since the last edit counted up to the date.
+    """
+    result = {col: statistics[col] for col in STATISTIC_COLUMNS if col != 'last_edit'}
+    result['days_since_last_edit'] = (date - statistics['last_edit']).days
+    return result
+
+
+class ElementStatisticsStore:
+    """
+    Materialized per-element statistics shared by every tile, area and run that meets the element.
+
+    Statistics are keyed by (element_type, osmid, max_version), where max_version is the latest version as of the
+    scoring date. Everything except the days since the last edit depends only on the versions up to max_version,
+    so one row serves every as-of date until the next edit; the days are derived from the stored last edit time
+    when the row is read. Like CheckpointStore, only the file path is pickled, so the store can be shipped to
+    worker processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._setup()
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS element_statistics (
+                    element_type TEXT, osmid INTEGER, max_version INTEGER, versions INTEGER,
+                    direct_confirmations INTEGER, changes_to_tags INTEGER, rollbacks INTEGER, user_count INTEGER,
+                    tags INTEGER, last_edit TEXT, PRIMARY KEY (element_type, osmid, max_version)
+                )
+            """)
+
+    def _setup(self):
+        self.hits = 0
+        self.misses = 0
+        self._statistics = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_statistics(self, keys):
+        """
+        Look up the stored statistics of many elements at once.
+
+        Args:
+            keys (iterable): (element_type, osmid, max_version) tuples.
+
+        Returns:
+            dict: The statistics of the keys that are stored, keyed like the input.
+        """
+        keys = [(element_type, int(osmid), int(max_version)) for element_type, osmid, max_version in keys]
+        with self._lock:
+            found = {key: self._statistics[key] for key in keys if key in self._statistics}
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+
+        if missing:
+            with self._connect() as connection:
+                for key in missing:
+                    row = connection.execute(
+                        'SELECT ' + ', '.join(STATISTIC_COLUMNS) + ' FROM element_statistics '
+                        'WHERE element_type = ? AND osmid = ? AND max_version = ?', key
+                    ).fetchone()
+                    if row is not None:
+                        statistics = dict(zip(STATISTIC_COLUMNS, row))
+                        statistics['last_edit'] = datetime.fromisoformat(statistics['last_edit'])
+                        found[key] = statistics
+
+        with self._lock:
+            self._statistics.update(found)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_statistics(self, statistics):
+        """
+        Args:
+            statistics (dict): Statistics keyed by (element_type, osmid, max_version).
+        """
+        rows = [
+            (element_type, int(osmid), int(max_version), *[values[col] for col in STATISTIC_COLUMNS[:-1]],
+             values['last_edit'].isoformat())
+            for (element_type, osmid, max_version), values in statistics.items()
+        ]
+        with self._connect() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO element_statistics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+            )
+        with self._lock:
+            self._statistics.update(
+                ((element_type, int(osmid), int(max_version)), values)
+                for (element_type, osmid, max_version), values in statistics.items()
+            )
+
+    def statistics(self, element_type, osmid, historical_info, date):
+        """
+        Read the statistics of an element from the table, computing and storing them on a miss.
+
+        Args:
+            element_type (string): OSM element type.
+            osmid (int): OSM id of the element.
+            historical_info (dict): The history of the element, already filtered to the as-of date.
+            date (datetime): The as-of date.
+
+        Returns:
+            dict: The statistics of the element as of the date, or None for an empty history.
+        """
+        if not historical_info:
+            return None
+        key = (element_type, int(osmid), int(max(historical_info)))
+        statistics = self.get_statistics([key]).get(key)
+        if statistics is None:
+            statistics = compute_element_statistics(historical_info=historical_info)
+            self.put_statistics({key: statistics})
+        return statistics_as_of(statistics=statistics, date=date)
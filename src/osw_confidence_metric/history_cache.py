@@ -0,0 +1,61 @@
+# history_cache.py file
+
+import threading
+from collections import OrderedDict
+
+
+class MemoryHistoryCache:
+    """
+    Bounded in-memory history store that keeps the most recently used histories and reads through to an
+    optional backing store (for example a CheckpointStore on local disk).
+    """
+
+    def __init__(self, max_items=100000, backing_store=None):
+        self.max_items = max_items
+        self.backing_store = backing_store
+        self.hits = 0
+        self.misses = 0
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Only the configuration travels to worker processes, each of which builds its own cache
+        state = self.__dict__.copy()
+        state['_histories'] = OrderedDict()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._histories)
+
+    def get_history(self, element_type, osmid):
+        key = (element_type, int(osmid))
+        with self._lock:
+            if key in self._histories:
+                self._histories.move_to_end(key)
+                self.hits += 1
+                return self._histories[key]
+            self.misses += 1
+
+        history = None
+        if self.backing_store is not None:
+            history = self.backing_store.get_history(element_type, osmid)
+            if history is not None:
+                self._remember(key, history)
+        return history
+
+    def put_history(self, element_type, osmid, history):
+        self._remember((element_type, int(osmid)), history)
+        if self.backing_store is not None:
+            self.backing_store.put_history(element_type, osmid, history)
+
+    def _remember(self, key, history):
+        with self._lock:
+            self._histories[key] = history
+            self._histories.move_to_end(key)
+            while len(self._histories) > self.max_items:
+                self._histories.popitem(last=False)
@@ -0,0 +1,72 @@
+# history_planner.py file
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HistoryRequestPlanner:
+    """
+    Collects the elements whose history is needed by every category of a tile, so that each history is
+    requested once and shared by all the categories that reference the element.
+    """
+
+    def __init__(self, osm_data_handler, max_workers=8):
+        self.osm_data_handler = osm_data_handler
+        self.max_workers = max_workers
+        self.requests = {}
+
+    def add(self, category, element_type, osmids):
+        """
+        Register the elements of a category.
+
+        Args:
+            category (string): Name of the category requesting the histories.
+            element_type (string): OSM element type (node, way or relation).
+            osmids (iterable): OSM ids of the elements.
+        """
+        keys = self.requests.setdefault(category, [])
+        keys.extend((element_type, int(osmid)) for osmid in osmids)
+
+    def add_feature_ids(self, category, feature_ids):
+        """
+        Register the elements of a feature id table.
+
+        Args:
+            category (string): Name of the category requesting the histories.
+            feature_ids (DataFrame): A table with element_type and osmid columns.
+        """
+        keys = self.requests.setdefault(category, [])
+        keys.extend(
+            (element_type, int(osmid))
+            for element_type, osmid in zip(feature_ids['element_type'], feature_ids['osmid'])
+        )
+
+    def keys(self):
+        """
+        Returns:
+            list: The union of the (element_type, osmid) pairs of all categories, in first-seen order.
+        """
+        return list(dict.fromkeys(key for keys in self.requests.values() for key in keys))
+
+    def fetch(self, histories=None):
+        """
+        Fetch the history of every planned element once.
+
+        Args:
+            histories (dict): Histories that are already known, keyed by (element_type, osmid).
+
+        Returns:
+            dict: Historical information keyed by (element_type, osmid).
+        """
+        histories = dict(histories or {})
+        missing = [key for key in self.keys() if key not in histories]
+        if not missing:
+            return histories
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            fetched = executor.map(self._fetch_history, missing)
+            histories.update(zip(missing, fetched))
+        return histories
+
+    def _fetch_history(self, key):
+        element_type, osmid = key
+        return self.osm_data_handler.get_item_history(item={'element_type': element_type, 'osmid': osmid})
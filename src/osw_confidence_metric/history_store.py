@@ -0,0 +1,196 @@
+# history_store.py file
+
+import os
+import json
+import uuid
+import threading
+import pyarrow as pa
+from multiprocessing.util import Finalize
+
+# One row per version of an element
+HISTORY_SCHEMA = pa.schema([
+    ('osmid', pa.int64()),
+    ('version', pa.int64()),
+    ('visible', pa.bool_()),
+    ('changeset', pa.int64()),
+    ('timestamp', pa.timestamp('s')),
+    ('user', pa.string()),
+    ('uid', pa.int64()),
+    ('tag', pa.map_(pa.string(), pa.string())),
+    ('nd', pa.list_(pa.int64())),
+    ('lat', pa.float64()),
+    ('lon', pa.float64()),
+    ('member', pa.string()),
+])
+
+
+def _history_to_rows(osmid, history):
+    rows = []
+    for version, edit in history.items():
+        member = edit.get('member')
+        rows.append({
+            'osmid': int(osmid),
+            'version': int(edit.get('version', version)),
+            'visible': edit.get('visible'),
+            'changeset': edit.get('changeset'),
+            'timestamp': edit.get('timestamp'),
+            'user': edit.get('user'),
+            'uid': edit.get('uid'),
+            'tag': list((edit.get('tag') or {}).items()),
+            'nd': edit.get('nd'),
+            'lat': edit.get('lat'),
+            'lon': edit.get('lon'),
+            'member': None if member is None else json.dumps(member),
+        })
+    return rows
+
+
+def _rows_to_history(rows):
+    history = {}
+    for row in sorted(rows, key=lambda row: row['version']):
+        edit = {
+            'id': row['osmid'],
+            'visible': row['visible'],
+            'version': row['version'],
+            'changeset': row['changeset'],
+            'timestamp': row['timestamp'],
+            'user': row['user'],
+            'uid': row['uid'],
+            'tag': dict(row['tag'] or []),
+        }
+        for key in ['nd', 'lat', 'lon']:
+            if row[key] is not None:
+                edit[key] = row[key]
+        if row['member'] is not None:
+            edit['member'] = json.loads(row['member'])
+        history[row['version']] = edit
+    return history
+
+
+def _write_parts(path, id_range, pending):
+    """
+    Write pending (element_type, rows) entries as one new Arrow file per partition.
+    """
+    partitions = {}
+    for element_type, rows in pending:
+        bucket = rows[0]['osmid'] // id_range
+        partitions.setdefault((element_type, bucket), []).extend(rows)
+    pending.clear()
+
+    for (element_type, bucket), rows in partitions.items():
+        directory = os.path.join(path, element_type, str(bucket))
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, f'part-{os.getpid()}-{uuid.uuid4().hex}.arrow')
+        table = pa.Table.from_pylist(rows, schema=HISTORY_SCHEMA)
+        # Readers only list finished files, so a part appears whole or not at all
+        with pa.OSFile(file_path + '.tmp', 'wb') as sink:
+            with pa.ipc.new_file(sink, HISTORY_SCHEMA) as writer:
+                writer.write_table(table)
+        os.replace(file_path + '.tmp', file_path)
+
+
+class ArrowHistoryStore:
+    """
+    Columnar on-disk history store shared by runs and processes.
+
+    Histories are kept as Arrow IPC files under `<path>/<element_type>/<osmid // id_range>/`, one row per
+    version. Readers memory-map the files, so every process reads the same pages from the OS cache without copying
+    or unpickling them. New histories are buffered and appended as new files of their partitions; files are never
+    rewritten. Buffered histories are written every `flush_size` histories, on flush() and when the process exits.
+    """
+
+    def __init__(self, path, id_range=1000000, flush_size=1000):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.id_range = id_range
+        self.flush_size = flush_size
+        self._setup()
+
+    def _setup(self):
+        self._pending = []
+        self._pending_histories = {}
+        self._partitions = {}
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        # Worker processes exit without running atexit handlers, but do run multiprocessing finalizers
+        self._finalizer = Finalize(self, _write_parts, args=(self.path, self.id_range, self._pending), exitpriority=10)
+
+    def __getstate__(self):
+        # Only the location and settings travel to other processes, which open the files themselves
+        return {'path': self.path, 'id_range': self.id_range, 'flush_size': self.flush_size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def get_history(self, element_type, osmid):
+        osmid = int(osmid)
+        with self._lock:
+            history = self._pending_histories.get((element_type, osmid))
+        if history is not None:
+            return history
+
+        key = (element_type, osmid // self.id_range)
+        with self._read_lock:
+            rows = self._find_rows(key=key, osmid=osmid)
+            if rows is None and self._refresh_partition(key=key):
+                # Another process appended to the partition since it was opened
+                rows = self._find_rows(key=key, osmid=osmid)
+        return None if rows is None else _rows_to_history(rows)
+
+    def put_history(self, element_type, osmid, history):
+        if not history:
+            return
+        with self._lock:
+            self._pending_histories[(element_type, int(osmid))] = history
+            self._pending.append((element_type, _history_to_rows(osmid=osmid, history=history)))
+            if len(self._pending) >= self.flush_size:
+                self._flush()
+
+    def flush(self):
+        """
+        Write the buffered histories to disk.
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            _write_parts(path=self.path, id_range=self.id_range, pending=self._pending)
+            self._pending_histories.clear()
+
+    def _find_rows(self, key, osmid):
+        if key not in self._partitions:
+            self._refresh_partition(key=key)
+
+        files, tables, index = self._partitions[key]
+        locations = index.get(osmid)
+        if not locations:
+            return None
+        rows = {}
+        for table_index, row_index in locations:
+            row = tables[table_index].slice(row_index, 1).to_pylist()[0]
+            # A later append of the same element carries all of its earlier versions too
+            rows[row['version']] = row
+        return list(rows.values())
+
+    def _refresh_partition(self, key):
+        """
+        Memory-map the files of a partition that are not open yet.
+
+        Returns:
+            bool: Whether any new file was opened.
+        """
+        files, tables, index = self._partitions.setdefault(key, (set(), [], {}))
+        directory = os.path.join(self.path, key[0], str(key[1]))
+        if not os.path.isdir(directory):
+            return False
+
+        new_files = sorted(name for name in os.listdir(directory) if name.endswith('.arrow') and name not in files)
+        for file_name in new_files:
+            table = pa.ipc.open_file(pa.memory_map(os.path.join(directory, file_name), 'r')).read_all()
+            for row_index, osmid in enumerate(table.column('osmid').to_numpy()):
+                index.setdefault(int(osmid), []).append((len(tables), row_index))
+            tables.append(table)
+            files.add(file_name)
+        return bool(new_files)
@@ -0,0 +1,62 @@
+# history_timeline.py file
+
+from bisect import bisect_right
+
+
+class ElementTimeline:
+    """
+    The versions of one element ordered by timestamp.
+
+    Cutting the history off at a date is a binary search over the sorted timestamps. Cutoffs that keep the same
+    number of versions share one filtered history, so scoring many dates does not copy a history per date.
+    """
+
+    def __init__(self, history):
+        self.history = history or {}
+        self.versions = sorted(self.history, key=lambda version: self.history[version]['timestamp'])
+        self.timestamps = [self.history[version]['timestamp'] for version in self.versions]
+        self._cutoffs = {}
+
+    def __len__(self):
+        return len(self.versions)
+
+    def count_as_of(self, date):
+        """
+        Returns:
+            int: The number of versions made on or before the date.
+        """
+        return bisect_right(self.timestamps, date)
+
+    def as_of(self, date):
+        """
+        Returns:
+            dict: The history filtered to the versions made on or before the date (empty if the element did not
+            exist yet).
+        """
+        count = self.count_as_of(date)
+        if count not in self._cutoffs:
+            self._cutoffs[count] = {version: self.history[version] for version in self.versions[:count]}
+        return self._cutoffs[count]
+
+
+def build_timelines(histories):
+    """
+    Index fetched histories by timestamp.
+
+    Args:
+        histories (dict): Histories keyed by (element_type, osmid).
+
+    Returns:
+        dict: An ElementTimeline per key. Keys whose history could not be fetched keep None, so that they are not
+        fetched again for every date.
+    """
+    return {key: None if history is None else ElementTimeline(history) for key, history in histories.items()}
+
+
+def histories_as_of(timelines, date):
+    """
+    Returns:
+        dict: The histories of every timeline cut off at the date, keyed like the timelines; None where the
+        history could not be fetched.
+    """
+    return {key: None if timeline is None else timeline.as_of(date) for key, timeline in timelines.items()}
@@ -1,14 +1,36 @@
 # osm_data_handler.py file
 
+from contextlib import nullcontext
 from osmapi import OsmApi
+from osmapi.errors import OsmApiError
+from .request_archive import ArchivedOsmApi
+from .single_flight import SingleFlight
 
 
 class OSMDataHandler:
-    def __init__(self, username="", password=""):
+    def __init__(self, username="", password="", history_store=None, archive=None, flight_store=None):
         self.api = OsmApi(username=username, password=password)
+        # Optional store with get_history/put_history, consulted before and filled after every API history call
+        self.history_store = history_store
+        # Optional RequestArchive recording or replaying the OSM API calls and the Overpass queries of osmnx
+        self.archive = archive
+        if archive is not None:
+            self.api = ArchivedOsmApi(api=self.api, archive=archive)
+        # Concurrent history requests for the same element share one call, across processes with a FlightStore
+        self.single_flight = SingleFlight(store=flight_store)
+
+    def overpass(self):
+        """
+        Returns:
+            context manager: Routes the Overpass requests osmnx makes in this thread inside the block through the
+            archive of the handler; does nothing without one.
+        """
+        if self.archive is None:
+            return nullcontext()
+        return self.archive.overpass()
 
     def get_way_history(self, osmid):
-        return self.api.WayHistory(osmid)
+        return self._get_history('way', osmid, self.api.WayHistory)
 
     def get_map_data(self, bounding_params):
         return self.api.Map(
@@ -18,6 +40,32 @@ class OSMDataHandler:
             max_lat=bounding_params[3]
         )
 
+    def get_snapshot_histories(self, bounding_params):
+        """
+        Take a map snapshot of a bounding box and derive the histories of its single-version elements.
+
+        The snapshot carries the current version of every element in the box, which is the whole history of an
+        element that was never edited after it was created.
+
+        Args:
+            bounding_params (tuple): (min_lon, min_lat, max_lon, max_lat).
+
+        Returns:
+            dict: The histories of the version-1 elements keyed by (element_type, osmid); empty when the API
+                rejects the box, e.g. for being too large.
+        """
+        try:
+            map_data = self.get_map_data(bounding_params=bounding_params)
+        except OsmApiError:
+            return {}
+
+        histories = {}
+        for element in map_data:
+            data = element['data']
+            if data.get('version') == 1:
+                histories[(element['type'], int(data['id']))] = {1: data}
+        return histories
+
     def get_item_history(self, item):
         if 'element_type' in item:
             item_type = item['element_type']
@@ -26,9 +74,26 @@ class OSMDataHandler:
         id = item.get('osmid')
 
         if item_type == 'node':
-            return self.api.NodeHistory(id)
+            return self._get_history('node', id, self.api.NodeHistory)
         elif item_type == 'way':
-            return self.api.WayHistory(id)
+            return self._get_history('way', id, self.api.WayHistory)
         elif item_type == 'relation':
-            return self.api.RelationHistory(id)
+            return self._get_history('relation', id, self.api.RelationHistory)
         return None
+
+    def _get_history(self, element_type, osmid, fetch):
+        if self.history_store is not None:
+            history = self.history_store.get_history(element_type, osmid)
+            if history is not None:
+                return history
+        # Only the API call is shared; local store hits never reach the flight store
+        return self.single_flight.do(
+            key=(element_type, osmid),
+            fetch=lambda: self._fetch_history(element_type=element_type, osmid=osmid, fetch=fetch)
+        )
+
+    def _fetch_history(self, element_type, osmid, fetch):
+        history = fetch(osmid)
+        if self.history_store is not None:
+            self.history_store.put_history(element_type, osmid, history)
+        return history
@@ -0,0 +1,139 @@
+# pipeline_pool.py file
+
+import copy
+import queue
+import threading
+
+# How often blocked stages check whether the run was stopped, in seconds
+_POLL_INTERVAL = 0.1
+
+
+def _put(target, item, stop):
+    """
+    Put an item on a bounded queue, waiting for room unless the run is stopped.
+    """
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class PipelinedTilePool:
+    """
+    Scores tiles in a staged pipeline within one process, so network waits and CPU work of different tiles overlap.
+
+    Feature discovery (the Overpass queries of a tile) and history fetches run on their own threads, while the
+    calling thread scores the tiles whose data has arrived. The stages are connected by queues of at most
+    `queue_size` tiles: when scoring falls behind, the fetch threads wait instead of piling up tile data in memory.
+    Every run works on a copy of the analyzer taken when it starts, which scores the sidewalk edges of a tile
+    in the calling thread.
+    """
+
+    def __init__(self, trust_score, discovery_workers=2, fetch_workers=4, queue_size=4):
+        """
+        Args:
+            trust_score (TrustScoreAnalyzer): The analyzer whose stages are run.
+            discovery_workers (int): Threads running the feature queries of tiles.
+            fetch_workers (int): Threads fetching the histories of discovered tiles.
+            queue_size (int): Tiles held between two stages before the earlier stage waits.
+        """
+        self.trust_score = trust_score
+        self.discovery_workers = discovery_workers
+        self.fetch_workers = fetch_workers
+        self.queue_size = queue_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _discover(self, trust_score, tiles, discovered, stop, road_ids):
+        while not stop.is_set():
+            try:
+                tile_id, polygon = tiles.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                tile_features = trust_score.discover_tile_features(polygon=polygon, road_ids=road_ids.get(tile_id))
+                result = (tile_id, polygon, tile_features, None)
+            except Exception as e:
+                result = (tile_id, polygon, None, e)
+            if not _put(discovered, result, stop):
+                return
+
+    def _fetch(self, trust_score, discovered, fetched, stop):
+        while not stop.is_set():
+            try:
+                tile_id, polygon, tile_features, error = discovered.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            tile_data = None
+            if error is None:
+                try:
+                    tile_data = trust_score.fetch_tile_histories(polygon=polygon, discovered=tile_features)
+                except Exception as e:
+                    error = e
+            if not _put(fetched, (tile_id, tile_data, error), stop):
+                return
+
+    def score_tiles(self, tiles, dates=None, road_ids=None):
+        """
+        Score tiles through the pipeline.
+
+        Args:
+            tiles (iterable): (tile_id, polygon) pairs.
+            dates (list): Optional as-of dates to score every tile at, from a single fetch per tile.
+            road_ids (dict): Optional road id tables keyed by tile id; the roads of other tiles are queried.
+
+        Yields:
+            tuple: (tile_id, measures) pairs in completion order.
+        """
+        pending = queue.Queue()
+        for tile in tiles:
+            pending.put(tile)
+        count = pending.qsize()
+        if not count:
+            return
+
+        # Forking a dask process pool per tile while the fetch threads run is both unsafe and slow
+        trust_score = copy.copy(self.trust_score)
+        trust_score.scheduler = 'synchronous'
+
+        discovered = queue.Queue(maxsize=self.queue_size)
+        fetched = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=self._discover, args=(trust_score, pending, discovered, stop, road_ids or {}),
+                             daemon=True)
+            for _ in range(self.discovery_workers)
+        ]
+        threads += [
+            threading.Thread(target=self._fetch, args=(trust_score, discovered, fetched, stop), daemon=True)
+            for _ in range(self.fetch_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for _ in range(count):
+                tile_id, tile_data, error = fetched.get()
+                if error is not None:
+                    raise error
+                if dates is not None:
+                    yield tile_id, trust_score.score_tile_data_series(tile_data=tile_data, dates=list(dates))
+                else:
+                    yield tile_id, trust_score.score_tile_data(tile_data=tile_data)
+        finally:
+            # Also stops the stages when the caller abandons the run early
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+    def close(self):
+        """
+        The pipeline threads only live for one score_tiles run, so there is nothing to release.
+        """
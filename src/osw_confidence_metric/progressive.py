@@ -0,0 +1,129 @@
+# progressive.py file
+
+import math
+import numpy as np
+from statistics import NormalDist
+
+
+def stratified_order(geometry, seed=None, tiles_per_stratum=8):
+    """
+    Random order of tiles that stays spatially balanced.
+
+    The cells of a grid over the tiles are the strata. Every stratum is shuffled and its tiles are spread evenly
+    over the order, so any prefix of the order holds about the same share of every cell and is a proportionally
+    allocated sample of the area.
+
+    Args:
+        geometry (GeoSeries): Geometry per tile id.
+        seed (int): Seed of the random order.
+        tiles_per_stratum (int): Average number of tiles per grid cell.
+
+    Returns:
+        list: The tile ids in the order to score them.
+    """
+    count = len(geometry.index)
+    if not count:
+        return []
+    rng = np.random.default_rng(seed)
+
+    points = geometry.representative_point()
+    x, y = points.x.to_numpy(dtype=float), points.y.to_numpy(dtype=float)
+    # Tiles without a geometry share the first cell
+    missing = ~(np.isfinite(x) & np.isfinite(y))
+    if missing.all():
+        x, y = np.zeros(count), np.zeros(count)
+    else:
+        x[missing], y[missing] = x[~missing].min(), y[~missing].min()
+    cells = max(1, math.ceil(math.sqrt(count / tiles_per_stratum)))
+    width, height = (x.max() - x.min()) or 1, (y.max() - y.min()) or 1
+    cell_x = np.clip(((x - x.min()) / width * cells).astype(int), 0, cells - 1)
+    cell_y = np.clip(((y - y.min()) / height * cells).astype(int), 0, cells - 1)
+    strata = cell_x * cells + cell_y
+
+    # The i-th of a stratum's n shuffled tiles is placed at (i + u) / n, with a random offset u per stratum
+    keys = np.empty(count)
+    for stratum in np.unique(strata):
+        members = rng.permutation(np.flatnonzero(strata == stratum))
+        keys[members] = (np.arange(len(members)) + rng.random()) / len(members)
+    order = np.lexsort((rng.random(count), keys))
+    return list(geometry.index[order])
+
+
+def estimate_area_mean(scores, tiles, confidence=0.95):
+    """
+    Estimate the mean trust score of an area from the scores of a random sample of its tiles.
+
+    The interval is the normal interval of the sample mean with the finite population correction, so it narrows to
+    the mean itself once every tile is scored. Trust scores lie between 0 and 1, and so do the bounds; the
+    half-width is that of the interval before clipping.
+
+    Args:
+        scores (Series): Trust scores of the scored tiles.
+        tiles (int): Number of tiles of the area.
+        confidence (float): Confidence level of the interval.
+
+    Returns:
+        tuple: (mean, lower, upper, half_width); the half-width is infinite below two scored tiles.
+    """
+    sampled = len(scores.index)
+    if not sampled:
+        return math.nan, 0.0, 1.0, math.inf
+    mean = float(scores.mean())
+    if sampled >= tiles:
+        return mean, mean, mean, 0.0
+    if sampled < 2:
+        return mean, 0.0, 1.0, math.inf
+    standard_error = float(scores.std(ddof=1)) / math.sqrt(sampled) * math.sqrt(1 - sampled / tiles)
+    half_width = NormalDist().inv_cdf(0.5 + confidence / 2) * standard_error
+    return mean, max(0.0, mean - half_width), min(1.0, mean + half_width), half_width
+
+
+class AreaEstimate:
+    """
+    Estimate of the confidence score of an area from the tiles scored so far.
+    """
+
+    def __init__(self, mean, lower, upper, scored, tiles, seconds, half_width=None):
+        """
+        Args:
+            mean (float): The estimated mean trust score.
+            lower (float): Lower bound of the confidence interval.
+            upper (float): Upper bound of the confidence interval.
+            scored (int): Number of tiles scored.
+            tiles (int): Number of tiles of the area.
+            seconds (float): Time spent since the run started.
+            half_width (float): Half-width of the interval before it was clipped to [0, 1]; half the distance
+                between the bounds when not given.
+        """
+        self.mean = mean
+        self.lower = lower
+        self.upper = upper
+        self.scored = scored
+        self.tiles = tiles
+        self.seconds = seconds
+        self._half_width = half_width
+
+    def __repr__(self):
+        return (f'AreaEstimate(mean={self.mean}, lower={self.lower}, upper={self.upper}, scored={self.scored}, '
+                f'tiles={self.tiles})')
+
+    @property
+    def complete(self):
+        """
+        Whether every tile was scored, making the estimate the score of the area.
+        """
+        return self.scored >= self.tiles
+
+    @property
+    def half_width(self):
+        """
+        Half-width of the confidence interval, unclipped, so that bounds cut off at 0 or 1 do not make the
+        estimate look more precise than it is.
+        """
+        if self._half_width is not None:
+            return self._half_width
+        return (self.upper - self.lower) / 2
+
+    def to_dict(self):
+        return {'mean': self.mean, 'lower': self.lower, 'upper': self.upper, 'scored': self.scored,
+                'tiles': self.tiles, 'seconds': self.seconds}
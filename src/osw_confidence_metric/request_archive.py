@@ -0,0 +1,192 @@
+# request_archive.py file
+
+import os
+import json
+import time
+import uuid
+import pickle
+import hashlib
+import numbers
+import threading
+import osmnx as ox
+from contextlib import contextmanager
+
+# The Overpass request function of osmnx, kept while archives route requests in its place
+_overpass_request = None
+# Open RequestArchive.overpass() blocks, across threads
+_overpass_blocks = 0
+_overpass_lock = threading.Lock()
+# The archive routing the Overpass requests of each thread, if any
+_active = threading.local()
+
+
+def _normalize(value):
+    # numpy scalars and tuples key the same request as Python numbers and lists
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return str(value)
+
+
+def _archived_overpass_request(data, pause=None, error_pause=60):
+    # The original function is restored once no block is open, so look it up again if it already was
+    request = _overpass_request or ox._overpass._overpass_request
+    archive = getattr(_active, 'archive', None)
+    if archive is None:
+        return request(data=data, pause=pause, error_pause=error_pause)
+    return archive.call(
+        service='overpass',
+        name='interpreter',
+        fetch=lambda: request(data=data, pause=pause, error_pause=error_pause),
+        kwargs={'data': data}
+    )
+
+
+def get_request_key(service, name, args=(), kwargs=None):
+    """
+    Returns:
+        string: A SHA-256 hex digest identifying a request to a service.
+    """
+    request = [service, name, _normalize(list(args)), _normalize(kwargs or {})]
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+
+class ArchiveMissError(LookupError):
+    """
+    Raised in replay mode for a request that was not recorded.
+    """
+
+
+class RequestArchive:
+    """
+    Local archive of the responses of the OSM API and Overpass, to profile and regression-test runs offline.
+
+    In 'record' mode every request goes to the network and its response (or error) and latency are written to
+    `<path>/<service>/<key>.pickle`. In 'replay' mode the responses are served from the archive without any network
+    call, after sleeping for the recorded latency (latency='recorded'), a fixed number of seconds, or not at all
+    (latency=None). Like the other stores, only the settings are pickled, so the archive can be shipped to workers.
+    """
+
+    def __init__(self, path, mode='replay', latency=None):
+        """
+        Args:
+            path (string): Directory of the archive.
+            mode (string): 'record' or 'replay'.
+            latency: None, 'recorded' or a number of seconds simulated per replayed request.
+        """
+        if mode not in ('record', 'replay'):
+            raise ValueError(f'Unknown archive mode: {mode}')
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+
+    def _file_path(self, service, key):
+        return os.path.join(self.path, service, f'{key}.pickle')
+
+    def call(self, service, name, fetch, args=(), kwargs=None):
+        """
+        Record or replay one request.
+
+        Args:
+            service (string): Name of the remote service, e.g. 'osm_api' or 'overpass'.
+            name (string): Name of the request within the service.
+            fetch (callable): Makes the request; only called in record mode.
+            args (tuple): Positional arguments identifying the request.
+            kwargs (dict): Keyword arguments identifying the request.
+
+        Returns:
+            The response of the request.
+        """
+        key = get_request_key(service=service, name=name, args=args, kwargs=kwargs)
+        file_path = self._file_path(service=service, key=key)
+        if self.mode == 'record':
+            return self._record(file_path=file_path, fetch=fetch)
+
+        try:
+            with open(file_path, 'rb') as f:
+                record = pickle.load(f)
+        except FileNotFoundError:
+            raise ArchiveMissError(f'No recorded response for {service} {name} {args} {kwargs or {}}') from None
+
+        delay = record['latency'] if self.latency == 'recorded' else self.latency
+        if delay:
+            time.sleep(delay)
+        if record['error'] is not None:
+            raise record['error']
+        return record['response']
+
+    def _record(self, file_path, fetch):
+        start_time = time.perf_counter()
+        response, error = None, None
+        try:
+            response = fetch()
+        except Exception as e:
+            error = e
+        record = {'response': response, 'error': error, 'latency': time.perf_counter() - start_time}
+
+        # Written whole and then moved in place, so concurrent workers never read a partial record
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f'{file_path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as f:
+            pickle.dump(record, f)
+        os.replace(temp_path, file_path)
+
+        if error is not None:
+            raise error
+        return response
+
+    @contextmanager
+    def overpass(self):
+        """
+        Route the Overpass requests osmnx makes in this thread through the archive for the duration of the block.
+
+        The osmnx request function is replaced while any block is open and restored once the last one is closed.
+        Requests of other threads outside a block go to the network as before.
+        """
+        global _overpass_request, _overpass_blocks
+        with _overpass_lock:
+            if not _overpass_blocks:
+                _overpass_request = ox._overpass._overpass_request
+                ox._overpass._overpass_request = _archived_overpass_request
+            _overpass_blocks += 1
+        previous = getattr(_active, 'archive', None)
+        _active.archive = self
+        try:
+            yield self
+        finally:
+            _active.archive = previous
+            with _overpass_lock:
+                _overpass_blocks -= 1
+                if not _overpass_blocks:
+                    ox._overpass._overpass_request = _overpass_request
+                    _overpass_request = None
+
+
+class ArchivedOsmApi:
+    """
+    Wraps an OsmApi so that every method call is recorded to or replayed from a RequestArchive.
+    """
+
+    def __init__(self, api, archive):
+        self.api = api
+        self.archive = archive
+
+    def __getattr__(self, name):
+        if name.startswith('_') or 'api' not in self.__dict__:
+            raise AttributeError(name)
+        method = getattr(self.api, name)
+
+        def archived_method(*args, **kwargs):
+            return self.archive.call(
+                service='osm_api', name=name, fetch=lambda: method(*args, **kwargs), args=args, kwargs=kwargs
+            )
+
+        return archived_method
@@ -0,0 +1,115 @@
+# result_cache.py file
+
+import json
+import math
+import hashlib
+import sqlite3
+import shapely
+from datetime import datetime
+from contextlib import contextmanager
+
+
+def canonical_shapes(geometries):
+    """
+    The geometries snapped to a 1e-7 degree grid (about 1 cm) and normalized, as sorted WKB hex strings, so that
+    reprojection noise, vertex order, ring start and feature order do not change them.
+
+    Args:
+        geometries (GeoSeries): Geometries in any CRS; they are compared in EPSG:4326.
+
+    Returns:
+        list: The WKB hex string of every geometry.
+    """
+    if geometries.crs is not None and not geometries.crs.equals('epsg:4326'):
+        geometries = geometries.to_crs('epsg:4326')
+    return sorted(
+        shapely.normalize(shapely.set_precision(geometry, grid_size=1e-7)).wkb_hex
+        for geometry in geometries if geometry is not None
+    )
+
+
+def get_result_key(geometries, date, sidewalk_filter, snapshot_id=None, settings=None):
+    """
+    Canonical hash of the inputs that determine the score of an area.
+
+    The geometries count by their canonical_shapes, so reprojection noise, vertex order, ring start and feature
+    order do not change the key. The as-of date counts by the day, the precision of
+    the days since the last edit, so analyzers created on the same day share results.
+
+    Args:
+        geometries (GeoSeries): The input geometries of the area, before tiling.
+        date (datetime): The as-of date.
+        sidewalk_filter (string): The sidewalk filter of the analyzer.
+        snapshot_id (string): Identifier of the state of the OSM data, e.g. a replication sequence number.
+        settings (dict): Other analyzer settings that change the score, e.g. supplied thresholds or the tiling.
+
+    Returns:
+        string: A SHA-256 hex digest.
+    """
+    key = json.dumps([canonical_shapes(geometries=geometries), date.date().isoformat(), sidewalk_filter, snapshot_id, settings or {}],
+                     sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Local SQLite store of whole-area scores, so that repeat requests for an area are answered without scoring it.
+
+    Results are keyed by get_result_key and tagged with the data snapshot they were computed from. When the data
+    source is refreshed, invalidate() drops the results of the old snapshot (or all of them). Like CheckpointStore,
+    only the file path is held on the instance.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    result_key TEXT PRIMARY KEY, snapshot_id TEXT, score REAL, created TEXT
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, result_key):
+        """
+        Returns:
+            float: The cached score, or None if there is none.
+        """
+        with self._connect() as connection:
+            row = connection.execute('SELECT score FROM results WHERE result_key = ?', (result_key,)).fetchone()
+        if row is None:
+            return None
+        # SQLite stores NaN as NULL
+        return math.nan if row[0] is None else row[0]
+
+    def put(self, result_key, score, snapshot_id=None):
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO results (result_key, snapshot_id, score, created) VALUES (?, ?, ?, ?)',
+                (result_key, snapshot_id, float(score), datetime.now().isoformat())
+            )
+
+    def invalidate(self, snapshot_id=None):
+        """
+        Drop cached results.
+
+        Args:
+            snapshot_id (string): Only drop the results computed from this data snapshot; all results when None.
+
+        Returns:
+            int: The number of results dropped.
+        """
+        with self._connect() as connection:
+            if snapshot_id is None:
+                cursor = connection.execute('DELETE FROM results')
+            else:
+                cursor = connection.execute('DELETE FROM results WHERE snapshot_id IS ?', (snapshot_id,))
+        return cursor.rowcount
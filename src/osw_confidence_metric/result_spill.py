@@ -0,0 +1,95 @@
+# result_spill.py file
+
+import os
+import shutil
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .utils import INDIRECT_VALUE_COLUMNS
+
+SPILL_COLUMNS = ['tile_id', 'direct_trust_score', 'time_trust_score'] + INDIRECT_VALUE_COLUMNS
+
+SPILL_SCHEMA = pa.schema(
+    [('tile_id', pa.int64())] + [(col, pa.float64()) for col in SPILL_COLUMNS[1:]]
+)
+
+# Buffered rows are kept as one Python float (24 bytes) plus its list slot (8 bytes) per column
+_ROW_BYTES = len(SPILL_COLUMNS) * 32
+
+
+def _measure_values(measures):
+    if measures is None:
+        return [float('nan')] * (len(SPILL_COLUMNS) - 1)
+    indirect_values = measures['indirect_values'] or {}
+    values = [measures['direct_trust_score'], measures['time_trust_score']]
+    values += [indirect_values.get(col) for col in INDIRECT_VALUE_COLUMNS]
+    return [float('nan') if value is None else float(value) for value in values]
+
+
+class TileResultSpill:
+    """
+    Tile measures held within a memory budget.
+
+    Rows are buffered in memory and written to a Parquet part file in a temporary directory whenever the buffer
+    reaches `memory_budget` bytes, so at most one budget's worth of tile results is in memory at any time. The
+    results are read back one part at a time by frames(), for aggregations that only need one chunk at once.
+    """
+
+    def __init__(self, memory_budget, directory=None):
+        """
+        Args:
+            memory_budget (int): Bytes of buffered tile results above which they are spilled to disk.
+            directory (string): Where to create the spill directory; the system temporary directory by default.
+        """
+        self.memory_budget = memory_budget
+        self.path = tempfile.mkdtemp(prefix='tile-results-', dir=directory)
+        self.parts = []
+        self._columns = {col: [] for col in SPILL_COLUMNS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return sum(pq.ParquetFile(part).metadata.num_rows for part in self.parts) + len(self._columns['tile_id'])
+
+    def add(self, tile_id, measures):
+        """
+        Record the measures of a tile; None records a tile without measures.
+        """
+        self._columns['tile_id'].append(int(tile_id))
+        for col, value in zip(SPILL_COLUMNS[1:], _measure_values(measures=measures)):
+            self._columns[col].append(value)
+        if len(self._columns['tile_id']) * _ROW_BYTES >= self.memory_budget:
+            self.spill()
+
+    def spill(self):
+        """
+        Write the buffered rows to a new part file.
+        """
+        if not self._columns['tile_id']:
+            return
+        path = os.path.join(self.path, f'part-{len(self.parts):05d}.parquet')
+        pq.write_table(pa.Table.from_pydict(self._columns, schema=SPILL_SCHEMA), path)
+        self.parts.append(path)
+        self._columns = {col: [] for col in SPILL_COLUMNS}
+
+    def frames(self):
+        """
+        Yield the recorded results as DataFrames indexed by tile id: one per spilled part, then the buffered rows.
+        """
+        for part in self.parts:
+            yield pq.read_table(part).to_pandas().set_index('tile_id')
+        if self._columns['tile_id']:
+            yield pd.DataFrame(self._columns).set_index('tile_id')
+
+    def close(self):
+        """
+        Delete the spilled part files.
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.parts = []
+        self._columns = {col: [] for col in SPILL_COLUMNS}
@@ -0,0 +1,118 @@
+# rollup.py file
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import box
+
+
+def _unit_aggregates(scores, units):
+    """
+    Merge the (count, total) mean aggregates of scores grouped by unit.
+
+    Args:
+        scores (DataFrame): count and total columns, one row per child.
+        units (Series): The parent unit of the children that have one, indexed like scores.
+
+    Returns:
+        DataFrame: count and total columns indexed by unit.
+    """
+    scores = scores.join(units.rename('unit'), how='inner')
+    return scores.groupby('unit')[['count', 'total']].sum().rename_axis(None)
+
+
+def _with_scores(frame, aggregates):
+    frame = frame.copy()
+    aggregates = aggregates.reindex(frame.index)
+    frame['tiles'] = aggregates['count'].fillna(0).astype(int)
+    frame['trust_score'] = aggregates['total'] / aggregates['count'].where(aggregates['count'] > 0)
+    return frame
+
+
+def _containing_unit(geometry, boundaries):
+    """
+    Returns:
+        Series: The index of the boundary containing the representative point of each geometry, for the
+            geometries inside a boundary.
+    """
+    points = gpd.GeoDataFrame(geometry=geometry.representative_point(), crs=geometry.crs)
+    if boundaries.crs is not None and points.crs is not None and boundaries.crs != points.crs:
+        boundaries = boundaries.to_crs(points.crs)
+    joined = gpd.sjoin(points, boundaries[[boundaries.geometry.name]], how='left', predicate='within')
+    units = joined.loc[~joined.index.duplicated(), 'index_right'].dropna()
+    return units.astype(boundaries.index.dtype)
+
+
+def _tile_aggregates(tile_scores):
+    scores = pd.to_numeric(tile_scores, errors='coerce')
+    return pd.DataFrame({'count': scores.notna().astype(int), 'total': scores.fillna(0)}, index=tile_scores.index)
+
+
+def roll_up_boundaries(tile_scores, tile_geometry, levels):
+    """
+    Roll tile scores up through a hierarchy of boundaries.
+
+    Tiles are assigned to the finest level's boundary that contains their representative point, and every
+    boundary to the next level's boundary containing its own representative point. The mean aggregate (count and
+    total) of each unit is merged into its parent, so every level costs one pass over the level below it.
+
+    Args:
+        tile_scores (Series): Trust score per tile id.
+        tile_geometry (GeoSeries): Geometry per tile id.
+        levels (dict): Boundary GeoDataFrames keyed by level name, from the finest to the coarsest.
+
+    Returns:
+        dict: A copy of each level's boundaries with tiles (the number of scored tiles) and trust_score (their
+            mean) columns, keyed by level name.
+    """
+    results = {}
+    aggregates = _tile_aggregates(tile_scores=tile_scores)
+    geometry = tile_geometry
+    for name, boundaries in levels.items():
+        units = _containing_unit(geometry=geometry.loc[aggregates.index], boundaries=boundaries)
+        aggregates = _unit_aggregates(scores=aggregates, units=units)
+        results[name] = _with_scores(frame=boundaries, aggregates=aggregates)
+        geometry = boundaries.geometry
+    return results
+
+
+def roll_up_quadtree(tile_scores, tile_geometry, depth=3):
+    """
+    Roll tile scores up through a quadtree over the bounds of the tiles.
+
+    Tiles are placed in the cell of the deepest level containing their representative point, and the mean
+    aggregates of every four sibling cells are merged into their parent, up to the single root cell.
+
+    Args:
+        tile_scores (Series): Trust score per tile id.
+        tile_geometry (GeoSeries): Geometry per tile id.
+        depth (int): Number of levels below the root cell.
+
+    Returns:
+        dict: A GeoDataFrame per level, keyed 'quadtree_<depth>' from the deepest level to 'quadtree_0', with x and
+            y cell coordinates, tiles, trust_score and the cell geometry. Only cells with tiles are listed.
+    """
+    geometry = tile_geometry.loc[tile_scores.index]
+    minx, miny, maxx, maxy = geometry.total_bounds
+    width, height = (maxx - minx) or 1, (maxy - miny) or 1
+    points = geometry.representative_point()
+    cells = 2 ** depth
+    aggregates = _tile_aggregates(tile_scores=tile_scores)
+    aggregates['x'] = np.clip(((points.x - minx) / width * cells).astype(int), 0, cells - 1).values
+    aggregates['y'] = np.clip(((points.y - miny) / height * cells).astype(int), 0, cells - 1).values
+
+    results = {}
+    for level in range(depth, -1, -1):
+        aggregates = aggregates.groupby(['x', 'y'], as_index=False)[['count', 'total']].sum()
+        size_x, size_y = width / 2 ** level, height / 2 ** level
+        frame = gpd.GeoDataFrame(
+            aggregates[['x', 'y']],
+            geometry=[
+                box(minx + x * size_x, miny + y * size_y, minx + (x + 1) * size_x, miny + (y + 1) * size_y)
+                for x, y in zip(aggregates['x'], aggregates['y'])
+            ],
+            crs=geometry.crs
+        )
+        results[f'quadtree_{level}'] = _with_scores(frame=frame, aggregates=aggregates)
+        aggregates = aggregates.assign(x=aggregates['x'] // 2, y=aggregates['y'] // 2)
+    return results
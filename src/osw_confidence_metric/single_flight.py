@@ -0,0 +1,219 @@
+# single_flight.py file
+
+import time
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# How often a process waiting on another process' request checks for its result, in seconds
+_POLL_INTERVAL = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class FlightStore:
+    """
+    Local SQLite store coordinating the requests of several processes, so that only one of them makes a request.
+
+    A process claims a request by inserting its key into the flights table and publishes the response in the
+    results table, where the other processes pick it up. A claim older than `lease` seconds is taken to belong to a
+    crashed process and can be claimed again; responses are handed out for `retention` seconds. Like the other
+    stores, only the settings are held on the instance.
+    """
+
+    def __init__(self, path, lease=300, retention=60):
+        """
+        Args:
+            path (string): Path of the SQLite file shared by the processes.
+            lease (float): Seconds after which an unfinished claim is given up.
+            retention (float): Seconds a published response is handed to processes asking for it.
+        """
+        self.path = path
+        self.lease = lease
+        self.retention = retention
+        with self._connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS flights (flight_key TEXT PRIMARY KEY, started REAL)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS results (flight_key TEXT PRIMARY KEY, response BLOB, finished REAL)'
+            )
+            connection.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)')
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _count(self, connection, name):
+        connection.execute(
+            'INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1',
+            (name,)
+        )
+
+    def claim(self, flight_key):
+        """
+        Returns:
+            bool: True when this process is to make the request, False when another process is making it or has
+            just published its response.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            # Checked and claimed in one write transaction, so a response published in between is not missed
+            connection.execute('BEGIN IMMEDIATE')
+            published = connection.execute('SELECT 1 FROM results WHERE flight_key = ? AND finished >= ?',
+                                           (flight_key, now - self.retention)).fetchone()
+            if published is not None:
+                return False
+            connection.execute('DELETE FROM flights WHERE flight_key = ? AND started < ?',
+                               (flight_key, now - self.lease))
+            cursor = connection.execute('INSERT OR IGNORE INTO flights (flight_key, started) VALUES (?, ?)',
+                                        (flight_key, now))
+        return cursor.rowcount == 1
+
+    def publish(self, flight_key, response):
+        """
+        Hand the response of a claimed request to the waiting processes and release the claim.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute('DELETE FROM results WHERE finished < ?', (now - self.retention,))
+            connection.execute('INSERT OR REPLACE INTO results (flight_key, response, finished) VALUES (?, ?, ?)',
+                               (flight_key, pickle.dumps(response), now))
+            connection.execute('DELETE FROM flights WHERE flight_key = ?', (flight_key,))
+            self._count(connection=connection, name='calls')
+
+    def release(self, flight_key):
+        """
+        Release a claim without a response, e.g. after the request failed, so another process can make it.
+        """
+        with self._connect() as connection:
+            connection.execute('DELETE FROM flights WHERE flight_key = ?', (flight_key,))
+
+    def response(self, flight_key):
+        """
+        Returns:
+            tuple: (True, response) when a recent response was published, else (False, None).
+        """
+        with self._connect() as connection:
+            row = connection.execute('SELECT response FROM results WHERE flight_key = ? AND finished >= ?',
+                                     (flight_key, time.time() - self.retention)).fetchone()
+            if row is not None:
+                self._count(connection=connection, name='coalesced')
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def stats(self):
+        """
+        Returns:
+            dict: The requests made ('calls') and those served from another process' request ('coalesced'), summed
+            over every process using the store.
+        """
+        with self._connect() as connection:
+            counts = dict(connection.execute('SELECT name, value FROM counters').fetchall())
+        return {'calls': counts.get('calls', 0), 'coalesced': counts.get('coalesced', 0)}
+
+
+class SingleFlight:
+    """
+    Merges concurrent requests for the same key into one call whose result is handed to every caller.
+
+    Within a process, the first thread asking for a key makes the call and the others wait for its result. With a
+    FlightStore, the process making the call also claims the key in the store, and other processes wait for the
+    response it publishes there instead of making the call themselves. Failed calls are not shared: the error is
+    raised to the waiting threads, and other processes make the call again.
+    """
+
+    def __init__(self, store=None):
+        """
+        Args:
+            store (FlightStore): Optional store shared with other processes.
+        """
+        self.store = store
+        self.calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def __getstate__(self):
+        # Calls in flight and counters stay with the process that made them
+        return {'store': self.store}
+
+    def __setstate__(self, state):
+        self.__init__(store=state['store'])
+
+    def stats(self):
+        """
+        Returns:
+            dict: The calls made by this process ('calls') and the requests it served from another thread's or
+            process' call ('coalesced').
+        """
+        with self._lock:
+            return {'calls': self.calls, 'coalesced': self.coalesced}
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def do(self, key, fetch):
+        """
+        Return the result of fetch(), sharing it with the concurrent requests for the same key.
+
+        Args:
+            key: Hashable key of the request, e.g. (element_type, osmid).
+            fetch (callable): Makes the request.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            self._count(name='coalesced')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.store is None:
+                call.result = fetch()
+                self._count(name='calls')
+            else:
+                call.result = self._do_shared(key=key, fetch=fetch)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _do_shared(self, key, fetch):
+        flight_key = '/'.join(str(part) for part in key) if isinstance(key, tuple) else str(key)
+        while True:
+            found, response = self.store.response(flight_key=flight_key)
+            if found:
+                self._count(name='coalesced')
+                return response
+            if self.store.claim(flight_key=flight_key):
+                try:
+                    response = fetch()
+                except Exception:
+                    self.store.release(flight_key=flight_key)
+                    raise
+                self.store.publish(flight_key=flight_key, response=response)
+                self._count(name='calls')
+                return response
+            time.sleep(_POLL_INTERVAL)
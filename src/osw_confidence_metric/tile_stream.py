@@ -0,0 +1,70 @@
+# tile_stream.py file
+
+import asyncio
+import threading
+
+# Returned by next() in place of StopIteration, which cannot cross into a coroutine
+_DONE = object()
+
+
+class TileScoreStream:
+    """
+    The tiles of an area as they are scored, in completion order.
+
+    Iterating yields (tile_id, polygon, measures) tuples, as passed to on_tile callbacks. `async for` runs every
+    step on the default executor of the event loop, so a server can stream tiles to its clients without blocking.
+    estimate() is the running AreaEstimate of the tiles done so far, and the score of the area once the stream is
+    exhausted.
+    """
+
+    def __init__(self, results, estimate):
+        """
+        Args:
+            results (generator): Yields (tile_id, polygon, measures) tuples as tiles are done.
+            estimate (callable): Returns the AreaEstimate of the tiles done so far.
+        """
+        self._results = results
+        self._estimate = estimate
+        # Held while the generator runs, so close() waits for a step still running on the executor, e.g. after
+        # the task awaiting it was cancelled
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._lock:
+            return next(self._results)
+
+    def _step(self):
+        with self._lock:
+            return next(self._results, _DONE)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        result = await asyncio.get_running_loop().run_in_executor(None, self._step)
+        if result is _DONE:
+            raise StopAsyncIteration
+        return result
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def estimate(self):
+        """
+        Returns:
+            AreaEstimate: The estimate of the area score from the tiles done so far; None before the area is tiled.
+        """
+        return self._estimate()
+
+    def close(self):
+        """
+        Stop the stream once the step in progress, if any, is done; tiles that were not started are not scored.
+        """
+        with self._lock:
+            self._results.close()
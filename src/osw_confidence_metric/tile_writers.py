@@ -0,0 +1,108 @@
+# tile_writers.py file
+
+import csv
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .utils import INDIRECT_VALUE_COLUMNS
+
+TILE_COLUMNS = ['area', 'tile_id', 'direct_trust_score', 'time_trust_score'] + INDIRECT_VALUE_COLUMNS
+
+
+def _tile_row(area, tile_id, measures):
+    indirect_values = measures['indirect_values'] or {}
+    row = {
+        'area': str(area),
+        'tile_id': int(tile_id),
+        'direct_trust_score': measures['direct_trust_score'],
+        'time_trust_score': measures['time_trust_score'],
+    }
+    for col in INDIRECT_VALUE_COLUMNS:
+        value = indirect_values.get(col)
+        row[col] = None if value is None else float(value)
+    return row
+
+
+class CsvTileWriter:
+    """
+    Streams the measures of each tile to a CSV file as one row, with the tile geometry as WKT.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, 'w', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=TILE_COLUMNS + ['geometry'])
+        self._writer.writeheader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, area, tile_id, polygon, measures):
+        row = _tile_row(area=area, tile_id=tile_id, measures=measures)
+        row['geometry'] = polygon.wkt
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class GeoParquetTileWriter:
+    """
+    Streams the measures of tiles to a GeoParquet file, writing a row group every `batch_size` tiles so finished
+    tiles do not wait in memory for the whole run.
+    """
+
+    def __init__(self, path, batch_size=64):
+        fields = [('area', pa.string()), ('tile_id', pa.int64())]
+        fields += [(col, pa.float64()) for col in TILE_COLUMNS[2:]]
+        fields += [('geometry', pa.binary())]
+        geo = {
+            'version': '1.0.0',
+            'primary_column': 'geometry',
+            'columns': {'geometry': {'encoding': 'WKB', 'geometry_types': []}},
+        }
+        self._schema = pa.schema(fields, metadata={'geo': json.dumps(geo)})
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self.batch_size = batch_size
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, area, tile_id, polygon, measures):
+        row = _tile_row(area=area, tile_id=tile_id, measures=measures)
+        row['geometry'] = polygon.wkb
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._rows:
+            self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+    def close(self):
+        self._flush()
+        self._writer.close()
+
+
+def open_tile_writer(path, output_format=None):
+    """
+    Open a per-tile writer for a path.
+
+    Args:
+        path (string): Output file path.
+        output_format (string): 'csv' or 'parquet'; taken from the file extension when omitted.
+    """
+    output_format = output_format or ('csv' if str(path).lower().endswith('.csv') else 'parquet')
+    if output_format == 'csv':
+        return CsvTileWriter(path=path)
+    if output_format == 'parquet':
+        return GeoParquetTileWriter(path=path)
+    raise ValueError(f'Unknown output format: {output_format}')
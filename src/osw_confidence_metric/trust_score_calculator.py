@@ -1,21 +1,31 @@
 # trust_score_calculator.py file
 
+import copy
 import osmnx as ox
 import pandas as pd
+import geopandas as gpd
 import dask_geopandas
 import geonetworkx as gnx
 
+from .aggregates import EDGE_THRESHOLD_COLUMNS, ThresholdAggregates
+from .element_index import ELEMENT_SEGMENT_COLUMNS
+from .history_planner import HistoryRequestPlanner
+from .history_timeline import build_timelines, histories_as_of
 from .utils import calculate_direct_confirmations, count_tag_changes, check_for_rollbacks, \
     calculate_user_interaction_stats, count_tags, calculate_feature_trust_scores, \
-    calculate_indirect_trust_components_from_polygon
+    extract_indirect_feature_ids_from_polygon, calculate_indirect_trust_components, current_version_key, \
+    extract_sidewalk_ways_from_polygon
 
 
-def _calculate_comprehensive_trust_scores(gdf):
+def _calculate_comprehensive_trust_scores(gdf, scheduler='multiprocessing', thresholds=None):
     """
     Calculate the total trust score for a GeoDataFrame.
 
     Args:
         gdf (GeoDataFrame): The GeoDataFrame for which to calculate trust scores.
+        scheduler (string): The dask scheduler used to score the edges.
+        thresholds (dict): Optional thresholds keyed by EDGE_THRESHOLD_COLUMNS, for example the means of merged
+            aggregates over a whole area. Thresholds that are not supplied are the means of this GeoDataFrame.
 
     Returns:
         tuple: A tuple containing the mean direct trust score and the mean time trust score.
@@ -23,6 +33,23 @@ def _calculate_comprehensive_trust_scores(gdf):
     if gdf.empty:
         return 0, 0
 
+    output = _calculate_edge_trust_scores(gdf=gdf, scheduler=scheduler, thresholds=thresholds)
+    return output['direct_trust_score'].mean(), output['time_trust_score'].mean()
+
+
+def _calculate_edge_trust_scores(gdf, scheduler='multiprocessing', thresholds=None):
+    """
+    Calculate the trust scores of every edge of a non-empty GeoDataFrame.
+
+    Args:
+        gdf (GeoDataFrame): The edges with their statistics.
+        scheduler (string): The dask scheduler used to score the edges.
+        thresholds (dict): Optional thresholds keyed by EDGE_THRESHOLD_COLUMNS, as for
+            _calculate_comprehensive_trust_scores.
+
+    Returns:
+        DataFrame: The edges with direct_trust_score and time_trust_score columns.
+    """
     # Convert columns to numeric if they are not already.
     numeric_columns = ['versions', 'direct_confirmations', 'tags', 'user_count', 'days_since_last_edit']
     for col in numeric_columns:
@@ -31,18 +58,22 @@ def _calculate_comprehensive_trust_scores(gdf):
     gdf_dask = dask_geopandas.from_geopandas(gdf, npartitions=30)
 
     # Calculate thresholds for trust score calculation
-    versions_threshold = gdf_dask['versions'].mean()
-    direct_confirm_threshold = gdf_dask['direct_confirmations'].mean()
+    thresholds = dict(thresholds or {})
+    missing = [col for col in EDGE_THRESHOLD_COLUMNS if col not in thresholds]
+    if missing:
+        thresholds.update(ThresholdAggregates.from_frame(frame=gdf, columns=missing).thresholds())
+    versions_threshold = thresholds['versions']
+    direct_confirm_threshold = thresholds['direct_confirmations']
     changes_to_tags_threshold = 2
     rollbacks_threshold = 1
-    tags_threshold = gdf_dask['tags'].mean()
-    user_count_threshold = gdf_dask['user_count'].mean()
+    tags_threshold = thresholds['tags']
+    user_count_threshold = thresholds['user_count']
 
     gdf_dask['direct_trust_score'] = None
     gdf_dask['time_trust_score'] = None
 
     # calculations for time trust
-    days_since_last_edit_threshold = gdf_dask['days_since_last_edit'].mean()
+    days_since_last_edit_threshold = thresholds['days_since_last_edit']
 
     meta = [
         ('u', 'int64'), ('v', 'int64'), ('osmid', 'int64'), ('geometry', 'geometry'),
@@ -63,9 +94,8 @@ def _calculate_comprehensive_trust_scores(gdf):
         ),
         axis=1,
         meta=meta
-    ).compute(scheduler='multiprocessing')
-
-    return output['direct_trust_score'].mean(), output['time_trust_score'].mean()
+    ).compute(scheduler=scheduler)
+    return output
 
 
 def _initialize_gdf_columns(gdf):
@@ -86,55 +116,278 @@ def _prepare_dask_dataframe(gdf):
        'user_count', 'days_since_last_edit']]
 
 
+def _existing_feature_ids(feature_ids, histories):
+    """
+    Keep the features that had a version in the cut-off histories, and those whose history was not fetched, e.g.
+    because their statistics are stored. Features whose history could not be fetched are left out.
+    """
+    return {
+        category: ids.loc[[
+            bool(histories.get((element_type, osmid), True))
+            for element_type, osmid in zip(ids['element_type'], ids['osmid'])
+        ]]
+        for category, ids in feature_ids.items()
+    }
+
+
+def _unstored_feature_ids(ids, date, statistics_store):
+    """
+    Drop the features whose statistics can be joined from the statistics table without their history.
+    """
+    keys = [current_version_key(item=item, date=date) for item in ids.to_dict(orient='records')]
+    stored = statistics_store.get_statistics([key for key in keys if key])
+    return ids.loc[[key not in stored for key in keys]]
+
+
+def _empty_measures():
+    return {
+        'direct_trust_score': None,
+        'time_trust_score': None,
+        'indirect_values': None
+    }
+
+
 class TrustScoreAnalyzer:
 
-    def __init__(self, sidewalk, osm_data_handler, date, proj='epsg:26910'):
+    def __init__(self, sidewalk, osm_data_handler, date, scheduler='multiprocessing', edge_thresholds=None,
+                 statistics_store=None, map_snapshot=False, sidewalk_source='graph', element_scores=False):
         self.SIDEWALK = sidewalk
         self.osm_data_handler = osm_data_handler
         self.date = date
-        self.proj = proj
-
-    def get_measures_from_polygon(self, polygon):
+        self.scheduler = scheduler
+        # Supplied sidewalk edge thresholds; when None each tile uses the means of its own edges
+        self.edge_thresholds = edge_thresholds
+        # Optional ElementStatisticsStore read before element histories are crunched
+        self.statistics_store = statistics_store
+        # Whether version-1 histories are taken from a map snapshot of each tile instead of history calls
+        self.map_snapshot = map_snapshot
+        # 'graph' scores the edges of the osmnx sidewalk graph; 'ways' scores the sidewalk ways as queried
+        self.sidewalk_source = sidewalk_source
+        # Whether the measures of a tile also hold the scores of each of its sidewalk ways
+        self.element_scores = element_scores
+
+    def get_measures_from_polygon(self, polygon, road_ids=None):
         """
         Calculate trust scores and indirect values for a given polygon.
 
         Args:
             polygon (Polygon): A polygon for which to calculate the measures.
+            road_ids (DataFrame): The road id table of the polygon when it is already known; queried when None.
 
         Returns:
             dict: A dictionary containing direct trust score, time trust score, and indirect values.
         """
-        try:
-            graph = ox.graph.graph_from_polygon(
-                polygon,
-                custom_filter=self.SIDEWALK,
-                truncate_by_edge=True,
-                simplify=False,
-                retain_all=True
-            )
-        except ValueError:
-            return {
-                'direct_trust_score': None,
-                'time_trust_score': None,
-                'indirect_values': None
-            }
+        return self.score_tile_data(tile_data=self._fetch_tile_data(polygon=polygon, road_ids=road_ids))
+
+    def score_tile_data(self, tile_data):
+        """
+        Calculate the measures of a tile from its fetched data, without any network call for known histories.
+
+        Args:
+            tile_data (tuple): (sidewalks, feature_ids, histories) as returned by fetch_tile_histories, or None.
 
-        direct_trust_score, time_trust_score = self._analyze_sidewalk_features(graph=graph)
-        indirect_values = calculate_indirect_trust_components_from_polygon(
-            polygon=polygon,
-            proj=self.proj,
+        Returns:
+            dict: A dictionary containing direct trust score, time trust score, and indirect values. With
+            element_scores set, it also holds the scores of every sidewalk way under 'element_scores'.
+        """
+        if tile_data is None:
+            return _empty_measures()
+        sidewalks, feature_ids, histories = tile_data
+
+        element_scores = None
+        if self.element_scores:
+            direct_trust_score, time_trust_score, element_scores = self._score_sidewalk_elements(
+                gdf=sidewalks, histories=histories
+            )
+        else:
+            direct_trust_score, time_trust_score = self._score_sidewalk_edges(gdf=sidewalks, histories=histories)
+        indirect_values = calculate_indirect_trust_components(
+            feature_ids=feature_ids,
             date=self.date,
-            osm_data_handler=self.osm_data_handler
+            osm_data_handler=self.osm_data_handler,
+            histories=histories,
+            statistics_store=self.statistics_store
         )
 
-        return {
+        measures = {
             'direct_trust_score': direct_trust_score,
             'time_trust_score': time_trust_score,
             'indirect_values': indirect_values
         }
+        if element_scores is not None:
+            measures['element_scores'] = element_scores
+        return measures
+
+    def get_measures_series_from_polygon(self, polygon, dates, road_ids=None):
+        """
+        Calculate the measures of a polygon as of each of several dates.
+
+        The sidewalks, the indirect features and their histories are fetched once. Each date then scores the
+        elements against their history cut off at that date; elements without a version by the date are left out.
+
+        Args:
+            polygon (Polygon): A polygon for which to calculate the measures.
+            dates (list): The as-of dates (datetime).
+            road_ids (DataFrame): The road id table of the polygon when it is already known; queried when None.
+
+        Returns:
+            dict: The measures dictionary of each date, keyed by date.
+        """
+        return self.score_tile_data_series(
+            tile_data=self._fetch_tile_data(polygon=polygon, road_ids=road_ids), dates=dates
+        )
+
+    def score_tile_data_series(self, tile_data, dates):
+        """
+        Calculate the measures of a tile as of each of several dates from its fetched data.
+
+        Args:
+            tile_data (tuple): (sidewalks, feature_ids, histories) as returned by fetch_tile_histories, or None.
+            dates (list): The as-of dates (datetime).
+
+        Returns:
+            dict: The measures dictionary of each date, keyed by date.
+        """
+        if tile_data is None:
+            return {date: _empty_measures() for date in dates}
+        edges, feature_ids, histories = tile_data
+
+        timelines = build_timelines(histories=histories)
+
+        series = {}
+        for date in dates:
+            histories_at_date = histories_as_of(timelines=timelines, date=date)
+            analyzer = copy.copy(self)
+            analyzer.date = date
+
+            # Sidewalks whose way had no version yet did not exist at the date
+            existing = [bool(histories_at_date.get(('way', osmid), True)) for osmid in edges['osmid']]
+            edges_at_date = edges.loc[existing].copy()
+            if edges_at_date.empty:
+                direct_trust_score, time_trust_score = 0, 0
+            else:
+                direct_trust_score, time_trust_score = analyzer._score_sidewalk_edges(
+                    gdf=edges_at_date, histories=histories_at_date
+                )
+
+            series[date] = {
+                'direct_trust_score': direct_trust_score,
+                'time_trust_score': time_trust_score,
+                'indirect_values': calculate_indirect_trust_components(
+                    feature_ids=_existing_feature_ids(feature_ids=feature_ids, histories=histories_at_date),
+                    date=date,
+                    osm_data_handler=self.osm_data_handler,
+                    histories=histories_at_date,
+                    statistics_store=self.statistics_store
+                )
+            }
+        return series
+
+    def _fetch_tile_data(self, polygon, road_ids=None):
+        """
+        Fetch the sidewalks, the indirect feature ids and the histories of both for a polygon.
+
+        Returns:
+            tuple: (sidewalks, feature_ids, histories), or None when the polygon has no sidewalks. sidewalks is a
+            GeoDataFrame with one row per graph edge, or per way when sidewalk_source is 'ways'.
+        """
+        return self.fetch_tile_histories(
+            polygon=polygon, discovered=self.discover_tile_features(polygon=polygon, road_ids=road_ids)
+        )
 
-    def _analyze_sidewalk_features(self, graph):
+    def discover_tile_features(self, polygon, road_ids=None):
+        """
+        Query the sidewalks and the indirect feature ids of a polygon, and plan the histories they need.
+
+        Args:
+            polygon (Polygon): The tile.
+            road_ids (DataFrame): The road id table of the tile when it is already known; queried when None.
+
+        Returns:
+            tuple: (sidewalks, feature_ids, planner), or None when the polygon has no sidewalks.
+        """
+        # The Overpass queries of the tile are recorded or replayed by the archive of the handler, if any
+        with self.osm_data_handler.overpass():
+            if self.sidewalk_source == 'ways':
+                # The ways come straight from Overpass, without a node per vertex and an edge per segment
+                sidewalks = extract_sidewalk_ways_from_polygon(polygon=polygon, sidewalk_filter=self.SIDEWALK)
+                if sidewalks.empty:
+                    return None
+            else:
+                try:
+                    graph = ox.graph.graph_from_polygon(
+                        polygon,
+                        custom_filter=self.SIDEWALK,
+                        truncate_by_edge=True,
+                        simplify=False,
+                        retain_all=True
+                    )
+                except ValueError:
+                    return None
+                sidewalks = gnx.graph_edges_to_gdf(graph)
+
+            feature_ids = extract_indirect_feature_ids_from_polygon(polygon=polygon, road_ids=road_ids)
+
+            # Plan the histories of every category together so shared elements are fetched once
+            planner = HistoryRequestPlanner(osm_data_handler=self.osm_data_handler)
+            planner.add(category='sidewalk', element_type='way', osmids=sidewalks['osmid'])
+            for category, ids in feature_ids.items():
+                if self.statistics_store is not None:
+                    ids = _unstored_feature_ids(ids=ids, date=self.date, statistics_store=self.statistics_store)
+                planner.add_feature_ids(category=category, feature_ids=ids)
+            return sidewalks, feature_ids, planner
+
+    def fetch_tile_histories(self, polygon, discovered):
+        """
+        Fetch the planned histories of a tile.
+
+        Args:
+            polygon (Polygon): The tile, whose bounds are used for a map snapshot.
+            discovered (tuple): (sidewalks, feature_ids, planner) as returned by discover_tile_features, or None.
+
+        Returns:
+            tuple: (sidewalks, feature_ids, histories), or None when the tile has no sidewalks.
+        """
+        if discovered is None:
+            return None
+        sidewalks, feature_ids, planner = discovered
+
+        known_histories = None
+        if self.map_snapshot:
+            # Only elements with more than one version still need a history call
+            snapshot = self.osm_data_handler.get_snapshot_histories(bounding_params=polygon.bounds)
+            known_histories = {key: snapshot[key] for key in planner.keys() if key in snapshot}
+        return sidewalks, feature_ids, planner.fetch(histories=known_histories)
+
+    def _analyze_sidewalk_features(self, graph, histories=None):
         gdf = gnx.graph_edges_to_gdf(graph)
+        return self._score_sidewalk_edges(gdf=gdf, histories=histories)
+
+    def _score_sidewalk_edges(self, gdf, histories=None):
+        output = self._compute_sidewalk_statistics(gdf=gdf, histories=histories)
+        return _calculate_comprehensive_trust_scores(
+            gdf=output, scheduler=self.scheduler, thresholds=self.edge_thresholds
+        )
+
+    def _score_sidewalk_elements(self, gdf, histories=None):
+        """
+        Score the sidewalk edges and keep the scores of every segment.
+
+        The segments are merged into ways by merge_element_scores once every tile is scored, so that a segment
+        clipped into several tiles is counted once.
+
+        Returns:
+            tuple: The mean direct trust score, the mean time trust score and a GeoDataFrame of
+            ELEMENT_SEGMENT_COLUMNS with a row per segment.
+        """
+        output = self._compute_sidewalk_statistics(gdf=gdf, histories=histories)
+        if output.empty:
+            return 0, 0, gpd.GeoDataFrame(columns=ELEMENT_SEGMENT_COLUMNS, geometry='geometry', crs='epsg:4326')
+        output = _calculate_edge_trust_scores(gdf=output, scheduler=self.scheduler, thresholds=self.edge_thresholds)
+        return (output['direct_trust_score'].mean(), output['time_trust_score'].mean(),
+                gpd.GeoDataFrame(output[ELEMENT_SEGMENT_COLUMNS], geometry='geometry', crs='epsg:4326'))
+
+    def _compute_sidewalk_statistics(self, gdf, histories=None):
         gdf = _initialize_gdf_columns(gdf=gdf)
 
         df_dask = _prepare_dask_dataframe(gdf=gdf)
@@ -143,35 +396,43 @@ class TrustScoreAnalyzer:
         output = df_dask.apply(
             self._compute_edge_statistics,
             axis=1,
+            args=(histories,),
             meta=[
                 ('u', 'int64'), ('v', 'int64'), ('osmid', 'int64'), ('geometry', 'geometry'),
                 ('versions', 'object'), ('direct_confirmations', 'object'), ('changes_to_tags', 'object'),
                 ('rollbacks', 'object'), ('tags', 'object'), ('user_count', 'object'),
                 ('days_since_last_edit', 'object')
             ]
-        ).compute(scheduler='multiprocessing')
+        ).compute(scheduler=self.scheduler)
+        return output
 
-        return _calculate_comprehensive_trust_scores(gdf=output)
-
-    def _compute_edge_statistics(self, feature):
+    def _compute_edge_statistics(self, feature, histories=None):
         """
         Update the feature with statistical information based on historical edge data.
 
         Args:
             feature (GeoDataFrame row): A row from a GeoDataFrame representing a geographic feature.
+            histories (dict): Already fetched histories keyed by (element_type, osmid).
 
         Returns:
             GeoDataFrame row: The input feature row updated with statistical information.
         """
         osmid = feature['osmid']
-        # Get historical information for the feature
-        historical_info = self.osm_data_handler.get_way_history(osmid=osmid)
+        # Get historical information for the feature, reusing the planned fetch when available
+        historical_info = histories.get(('way', osmid)) if histories else None
+        if historical_info is None:
+            historical_info = self.osm_data_handler.get_way_history(osmid=osmid)
 
         # Filter historical data by date
         filtered_info = self._filter_historical_data_by_date(historical_info=historical_info)
 
-        # Calculate edge statistics
-        edge_statistics = self._calculate_statistics_for_edge(historical_info=filtered_info)
+        # Calculate edge statistics, or read them from the statistics table
+        if self.statistics_store is not None and filtered_info:
+            edge_statistics = self.statistics_store.statistics(
+                element_type='way', osmid=osmid, historical_info=filtered_info, date=self.date
+            )
+        else:
+            edge_statistics = self._calculate_statistics_for_edge(historical_info=filtered_info)
 
         # Update feature values
         feature.version = edge_statistics['versions']
@@ -1,9 +1,20 @@
 # utils.py file
 
+import warnings
 import osmnx as ox
+import pandas as pd
 import geopandas as gpd
 import geonetworkx as gnx
 from statistics import mean
+from shapely.geometry import LineString
+from .history_planner import HistoryRequestPlanner
+
+FEATURE_ID_COLUMNS = ['element_type', 'osmid', 'version', 'timestamp']
+SIDEWALK_WAY_COLUMNS = ['osmid', 'u', 'v', 'way_tags', 'geometry']
+INDIRECT_VALUE_COLUMNS = ['poi_count', 'bldg_count', 'road_count', 'poi_users', 'road_users', 'bldg_users', 'poi_time',
+                          'road_time', 'bldg_time']
+INDIRECT_TRUST_ITEMS = ['road_users', 'road_time', 'poi_count', 'poi_users', 'poi_time', 'bldg_count', 'bldg_users',
+                        'bldg_time']
 
 
 def compute_feature_indirect_trust(feature, thresholds):
@@ -18,9 +29,7 @@ def compute_feature_indirect_trust(feature, thresholds):
         int: 1 if the indirect trust score is above the threshold, 0 otherwise.
     """
     indirect_trust_score = 0
-    item_name_array = ['road_users', 'road_time', 'poi_count', 'poi_users', 'poi_time', 'bldg_count', 'bldg_users',
-                       'bldg_time']
-    for item_name in item_name_array:
+    for item_name in INDIRECT_TRUST_ITEMS:
         if feature.indirect_values is not None and feature.indirect_values[item_name] is not None and \
           feature.indirect_values[item_name] >= thresholds[item_name]:
             indirect_trust_score += 1
@@ -45,22 +54,108 @@ def calculate_overall_trust_score(feature):
     return (direct_trust_score * 0.5) + (indirect_trust_score * 0.25) + (time_trust_score * 0.25)
 
 
-def calculate_indirect_trust_components_from_polygon(polygon, proj, date, osm_data_handler):
+def compute_indirect_trust_scores(gdf, thresholds):
+    """
+    Calculate the indirect trust score of every feature with column operations.
+
+    Equivalent to applying compute_feature_indirect_trust to each row: missing (NaN) values never reach their
+    threshold.
+
+    Args:
+        gdf (DataFrame): A frame with one numeric column per indirect value.
+        thresholds (dict): A dictionary of threshold values for different feature items.
+
+    Returns:
+        Series: 1 where more than two indirect values reach their threshold, 0 otherwise.
+    """
+    above_threshold = sum(
+        (gdf[item_name] >= thresholds[item_name]).astype(int) for item_name in INDIRECT_TRUST_ITEMS
+    )
+    return (above_threshold > 2).astype(int)
+
+
+def calculate_overall_trust_scores(gdf):
+    """
+    Calculate the overall trust score of every feature with column operations.
+
+    Equivalent to applying calculate_overall_trust_score to each row: missing scores count as 0.
+
+    Args:
+        gdf (DataFrame): A frame with direct_trust_score, indirect_trust_score and time_trust_score columns.
+
+    Returns:
+        Series: The overall trust scores.
+    """
+    def score(col):
+        if col not in gdf:
+            return 0
+        return pd.to_numeric(gdf[col], errors='coerce').fillna(0)
+
+    return (score('direct_trust_score') * 0.5) + (score('indirect_trust_score') * 0.25) + \
+        (score('time_trust_score') * 0.25)
+
+
+def calculate_indirect_trust_components_from_polygon(polygon, date, osm_data_handler):
     """
     Calculate indirect trust score components from a given polygon.
 
     Args:
         polygon (Polygon): The polygon to analyze.
-        proj (string): to_crs.
         date (string): date
         osm_data_handler (object): OSM Handler
     Returns:
         dict: A dictionary containing calculated components for indirect trust score.
     """
+    feature_ids = extract_indirect_feature_ids_from_polygon(polygon=polygon)
+
+    # Fetch each element's history once, even when it belongs to several categories
+    planner = HistoryRequestPlanner(osm_data_handler=osm_data_handler)
+    for category, ids in feature_ids.items():
+        planner.add_feature_ids(category=category, feature_ids=ids)
+
+    return calculate_indirect_trust_components(
+        feature_ids=feature_ids,
+        date=date,
+        osm_data_handler=osm_data_handler,
+        histories=planner.fetch()
+    )
 
-    gdf_pois = extract_features_from_polygon(polygon=polygon, tags={'amenity': True}, proj=proj)
-    gdf_bldgs = extract_features_from_polygon(polygon=polygon, tags={'building': True}, proj=proj)
-    gdf_roads = extract_road_features_from_polygon(polygon=polygon, proj=proj)
+
+def extract_indirect_feature_ids_from_polygon(polygon, road_ids=None):
+    """
+    Extract the POI, building and road id tables used by the indirect trust components.
+
+    Args:
+        polygon (Polygon): The polygon to analyze.
+        road_ids (DataFrame): The road id table of the polygon when it is already known, e.g. clipped from the
+            road network of the whole area by extract_tile_road_ids; queried when None.
+
+    Returns:
+        dict: The feature id tables keyed by category (poi, bldg, road).
+    """
+    return {
+        'poi': extract_feature_ids_from_polygon(polygon=polygon, tags={'amenity': True}),
+        'bldg': extract_feature_ids_from_polygon(polygon=polygon, tags={'building': True}),
+        'road': extract_road_ids_from_polygon(polygon=polygon) if road_ids is None else road_ids,
+    }
+
+
+def calculate_indirect_trust_components(feature_ids, date, osm_data_handler, histories=None, statistics_store=None):
+    """
+    Calculate indirect trust score components from the feature id tables of a polygon.
+
+    Args:
+        feature_ids (dict): The feature id tables keyed by category (poi, bldg, road).
+        date (datetime): date
+        osm_data_handler (object): OSM Handler
+        histories (dict): Already fetched histories keyed by (element_type, osmid).
+        statistics_store (ElementStatisticsStore): Optional table of per-element statistics.
+    Returns:
+        dict: A dictionary containing calculated components for indirect trust score.
+    """
+    gdf_pois = feature_ids['poi']
+    gdf_bldgs = feature_ids['bldg']
+    gdf_roads = feature_ids['road']
 
     # Initialize values dict with counts
     values_dict = {
@@ -76,54 +171,218 @@ def calculate_indirect_trust_components_from_polygon(polygon, proj, date, osm_da
     }
 
     # Calculate stats for each feature type
-    values_dict['poi_users'], values_dict['poi_time'] = aggregate_feature_statistics(gdf=gdf_pois, date=date,
-                                                                                     osm_data_handler=osm_data_handler)
-    values_dict['road_users'], values_dict['road_time'] = aggregate_feature_statistics(gdf=gdf_roads, date=date,
-                                                                                       osm_data_handler=osm_data_handler)
-    values_dict['bldg_users'], values_dict['bldg_time'] = aggregate_feature_statistics(gdf=gdf_bldgs, date=date,
-                                                                                       osm_data_handler=osm_data_handler)
+    values_dict['poi_users'], values_dict['poi_time'] = aggregate_feature_statistics(
+        gdf=gdf_pois, date=date, osm_data_handler=osm_data_handler, histories=histories,
+        statistics_store=statistics_store
+    )
+    values_dict['road_users'], values_dict['road_time'] = aggregate_feature_statistics(
+        gdf=gdf_roads, date=date, osm_data_handler=osm_data_handler, histories=histories,
+        statistics_store=statistics_store
+    )
+    values_dict['bldg_users'], values_dict['bldg_time'] = aggregate_feature_statistics(
+        gdf=gdf_bldgs, date=date, osm_data_handler=osm_data_handler, histories=histories,
+        statistics_store=statistics_store
+    )
 
     return values_dict
 
 
-def extract_features_from_polygon(polygon, tags, proj):
+def extract_features_from_polygon(polygon, tags, proj=None):
     """
     Extract features from a polygon based on specified tags.
 
+    Deprecated: the indirect trust components use extract_feature_ids_from_polygon, which does not build geometries.
+
     Args:
         polygon (Polygon): The polygon to analyze.
         tags (dict): Tags to filter features.
-        proj (string): to_crs.
+        proj (string): Optional CRS to project the features to, only needed when their geometry is measured.
 
     Returns:
         GeoDataFrame: A GeoDataFrame of extracted features.
     """
+    warnings.warn('extract_features_from_polygon is deprecated, use extract_feature_ids_from_polygon',
+                  DeprecationWarning, stacklevel=2)
     try:
-        gdf_features = ox.features.features_from_polygon(polygon, tags=tags).to_crs(proj)
+        gdf_features = ox.features.features_from_polygon(polygon, tags=tags)
+        if proj is not None:
+            gdf_features = gdf_features.to_crs(proj)
     except ValueError:
         gdf_features = gpd.GeoDataFrame(columns=list(tags.keys()) + ['geometry'], geometry='geometry')
     return gdf_features
 
 
-def extract_road_features_from_polygon(polygon, proj):
+def extract_road_features_from_polygon(polygon, proj=None):
     """
     Extract road features from a polygon.
 
+    Deprecated: the indirect trust components use extract_road_ids_from_polygon, which does not build a graph.
+
     Args:
         polygon (Polygon): The polygon to analyze.
-        proj (string): to_crs.
+        proj (string): Optional CRS to project the roads to, only needed when their geometry is measured.
     Returns:
         GeoDataFrame: A GeoDataFrame of road features.
     """
+    warnings.warn('extract_road_features_from_polygon is deprecated, use extract_road_ids_from_polygon',
+                  DeprecationWarning, stacklevel=2)
     try:
         G_roads = ox.graph.graph_from_polygon(polygon, network_type='drive', simplify=False, retain_all=True)
-        gdf_roads = gnx.graph_edges_to_gdf(G_roads).to_crs(proj)
+        gdf_roads = gnx.graph_edges_to_gdf(G_roads)
+        if proj is not None:
+            gdf_roads = gdf_roads.to_crs(proj)
     except ValueError:
         gdf_roads = gpd.GeoDataFrame(columns=['u', 'v', 'osmid', 'highway', 'geometry'], geometry='geometry')
     return gdf_roads
 
 
-def aggregate_feature_statistics(gdf, date, osm_data_handler):
+def extract_feature_ids_from_polygon(polygon, tags):
+    """
+    Extract the ids of the features inside a polygon matching the specified tags, without building geometries.
+
+    Args:
+        polygon (Polygon): The polygon to analyze.
+        tags (dict): Tags to filter features.
+
+    Returns:
+        DataFrame: A DataFrame with element_type, osmid, version and timestamp columns.
+    """
+    selectors = []
+    for key, value in tags.items():
+        values = [value] if isinstance(value, (bool, str)) else value
+        for item in values:
+            selectors.append(f'[{key!r}]' if isinstance(item, bool) else f'[{key!r}={item!r}]')
+
+    def build_query(polygon_coord_str):
+        components = ''.join(
+            f'{kind}{selector}(poly:{polygon_coord_str!r});'
+            for selector in selectors
+            for kind in ('node', 'way', 'relation')
+        )
+        return f'({components});'
+
+    return _query_element_ids(polygon=polygon, build_query=build_query)
+
+
+def extract_road_ids_from_polygon(polygon):
+    """
+    Extract the ids of the drivable road ways inside a polygon, without building a graph.
+
+    Args:
+        polygon (Polygon): The polygon to analyze.
+
+    Returns:
+        DataFrame: A DataFrame with element_type, osmid, version and timestamp columns.
+    """
+    osm_filter = ox._overpass._get_osm_filter('drive')
+    return _query_element_ids(
+        polygon=polygon,
+        build_query=lambda polygon_coord_str: f'way{osm_filter}(poly:{polygon_coord_str!r});'
+    )
+
+
+def extract_tile_road_ids(tiles, roads, road_ids):
+    """
+    Clip the road network of an area to its tiles.
+
+    Args:
+        tiles (GeoDataFrame): The tiles of the area.
+        roads (GeoDataFrame): The unsimplified road edges of the area, with an osmid column.
+        road_ids (DataFrame): The road id table of the area, as returned by extract_road_ids_from_polygon.
+
+    Returns:
+        dict: The road id table of the ways crossing each tile, keyed by tile id.
+    """
+    if roads.crs is not None and tiles.crs is not None and roads.crs != tiles.crs:
+        roads = roads.to_crs(tiles.crs)
+    roads = gpd.GeoDataFrame({'osmid': roads['osmid'].values}, geometry=roads.geometry.values, crs=tiles.crs)
+    crossings = gpd.sjoin(roads, tiles[[tiles.geometry.name]], how='inner', predicate='intersects')
+    crossings = crossings[['index_right', 'osmid']].drop_duplicates()
+
+    # Ways missing from the id table keep their id without a version
+    columns = road_ids.drop(columns=['element_type']).drop_duplicates(subset=['osmid'])
+    columns['osmid'] = columns['osmid'].astype('int64')
+    tile_ids = {tile_id: pd.DataFrame(columns=FEATURE_ID_COLUMNS) for tile_id in tiles.index}
+    for tile_id, ways in crossings.groupby('index_right'):
+        ways = ways[['osmid']].merge(columns, on='osmid', how='left')
+        ways.insert(0, 'element_type', 'way')
+        tile_ids[tile_id] = ways[FEATURE_ID_COLUMNS].reset_index(drop=True)
+    return tile_ids
+
+
+def extract_sidewalk_ways_from_polygon(polygon, sidewalk_filter):
+    """
+    Extract the sidewalk ways inside a polygon as a table, without building a graph.
+
+    Args:
+        polygon (Polygon): The polygon to analyze.
+        sidewalk_filter (string): Overpass tag filter of the sidewalk ways, e.g. '["highway"~"footway"]'.
+
+    Returns:
+        GeoDataFrame: One row per way in EPSG:4326, with its osmid, its first (u) and last (v) node, its tags
+            (way_tags) and its full line geometry.
+    """
+    records = []
+    try:
+        overpass_settings = ox._overpass._make_overpass_settings()
+        for polygon_coord_str in ox._overpass._make_overpass_polygon_coord_strs(polygon):
+            query_str = f'{overpass_settings};way{sidewalk_filter}(poly:{polygon_coord_str!r});out geom;'
+            response_json = ox._overpass._overpass_request(data={'data': query_str})
+            for element in response_json.get('elements', []):
+                coords = [(point['lon'], point['lat']) for point in element.get('geometry', [])]
+                if element['type'] != 'way' or len(coords) < 2:
+                    continue
+                records.append({
+                    'osmid': element['id'],
+                    'u': element['nodes'][0],
+                    'v': element['nodes'][-1],
+                    'way_tags': element.get('tags', {}),
+                    'geometry': LineString(coords)
+                })
+    except ValueError:
+        records = []
+
+    gdf = gpd.GeoDataFrame(records, columns=SIDEWALK_WAY_COLUMNS, geometry='geometry', crs='epsg:4326')
+    return gdf.drop_duplicates(subset=['osmid'], ignore_index=True)
+
+
+def _query_element_ids(polygon, build_query):
+    """
+    Run an Overpass query for each sub-polygon and collect the matching elements' metadata.
+
+    Only the matched elements are returned: their member nodes are not recursed into, so no geometry
+    is downloaded or built.
+
+    Args:
+        polygon (Polygon): The polygon to analyze.
+        build_query (callable): Returns the query statements for a polygon coordinate string.
+
+    Returns:
+        DataFrame: A DataFrame with element_type, osmid, version and timestamp columns.
+    """
+    try:
+        overpass_settings = ox._overpass._make_overpass_settings()
+        records = []
+        for polygon_coord_str in ox._overpass._make_overpass_polygon_coord_strs(polygon):
+            query_str = f'{overpass_settings};{build_query(polygon_coord_str)}out meta;'
+            response_json = ox._overpass._overpass_request(data={'data': query_str})
+            for element in response_json.get('elements', []):
+                records.append({
+                    'element_type': element['type'],
+                    'osmid': element['id'],
+                    'version': element.get('version'),
+                    'timestamp': element.get('timestamp')
+                })
+    except ValueError:
+        records = []
+
+    df = pd.DataFrame(records, columns=FEATURE_ID_COLUMNS)
+    df = df.drop_duplicates(subset=['element_type', 'osmid'], ignore_index=True)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y-%m-%dT%H:%M:%SZ')
+    return df
+
+
+def aggregate_feature_statistics(gdf, date, osm_data_handler, histories=None, statistics_store=None):
     """
     Aggregate user count and days since last edit statistics from a GeoDataFrame.
 
@@ -131,27 +390,72 @@ def aggregate_feature_statistics(gdf, date, osm_data_handler):
         gdf (GeoDataFrame): The GeoDataFrame to analyze.
         date (string): date
         osm_data_handler (OSMDataHandler): OSMDataHandler class object
+        histories (dict): Already fetched histories keyed by (element_type, osmid), used before the handler.
+        statistics_store (ElementStatisticsStore): Optional table of per-element statistics, read before the
+            histories are crunched.
     Returns:
         tuple: Mean user count and mean days since last edit.
     """
     user_counts = []
     days_since_last_edits = []
 
-    for row in gdf.itertuples(index=False):
-        historical_information = osm_data_handler.get_item_history(item=row)
+    records = gdf.to_dict(orient='records')
+    keys = [None] * len(records)
+    stored = {}
+    if statistics_store is not None:
+        # Features whose current version predates the date are joined on that version, without their history
+        keys = [current_version_key(item=item, date=date) for item in records]
+        stored = statistics_store.get_statistics([key for key in keys if key])
+
+    for item, key in zip(records, keys):
+        statistics = stored.get(key)
+        if statistics is not None:
+            user_counts.append(statistics['user_count'])
+            days_since_last_edits.append((date - statistics['last_edit']).days)
+            continue
+
+        historical_information = _lookup_history(item=item, osm_data_handler=osm_data_handler, histories=histories)
         if historical_information:
-            user_count, days_since_last_edit = calculate_user_interaction_stats(
-                historical_info=historical_information,
-                date=date
-            )
+            if statistics_store is not None:
+                statistics = statistics_store.statistics(
+                    element_type=item['element_type'], osmid=item['osmid'],
+                    historical_info=historical_information, date=date
+                )
+                user_count, days_since_last_edit = statistics['user_count'], statistics['days_since_last_edit']
+            else:
+                user_count, days_since_last_edit = calculate_user_interaction_stats(
+                    historical_info=historical_information,
+                    date=date
+                )
             user_counts.append(user_count)
             days_since_last_edits.append(days_since_last_edit)
 
     mean_user_count = mean(user_counts) if user_counts else 0
-    mean_days_since_last_edit = mean(filter(None, days_since_last_edits)) if days_since_last_edits else None
+    days_since_last_edits = list(filter(None, days_since_last_edits))
+    mean_days_since_last_edit = mean(days_since_last_edits) if days_since_last_edits else None
     return mean_user_count, mean_days_since_last_edit
 
 
+def current_version_key(item, date):
+    """
+    Returns:
+        tuple: The (element_type, osmid, version) statistics key of a feature id record whose current version was
+        made on or before the date, or None when the record cannot be joined without its history.
+    """
+    version = item.get('version')
+    timestamp = item.get('timestamp')
+    if 'element_type' not in item or pd.isna(version) or pd.isna(timestamp) or timestamp > date:
+        return None
+    return item['element_type'], int(item['osmid']), int(version)
+
+
+def _lookup_history(item, osm_data_handler, histories):
+    key = (item.get('element_type'), item.get('osmid'))
+    if histories is not None and key in histories:
+        return histories[key]
+    return osm_data_handler.get_item_history(item=item)
+
+
 def calculate_user_interaction_stats(historical_info, date):
     user_count = calculate_number_users_edited(historical_info=historical_info)
     days_since_last_edit = calculate_days_since_last_edit(historical_info=historical_info, date=date)
@@ -0,0 +1,108 @@
+# worker_pool.py file
+
+import os
+import importlib
+from shapely import wkb
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Heavy modules imported once by every worker when it starts, instead of on the first tile it scores
+PRELOADED_MODULES = ['pandas', 'geopandas', 'shapely', 'osmnx', 'networkx', 'geonetworkx', 'dask', 'dask_geopandas']
+
+# Per-worker analyzer, set once by the pool initializer and reused by every tile the worker scores
+_worker_trust_score = None
+
+
+def _init_worker(trust_score, preload_modules):
+    global _worker_trust_score
+    for module in preload_modules:
+        importlib.import_module(module)
+
+    # The pool already runs one tile per process, so a worker scores its sidewalk edges in-process
+    trust_score.scheduler = 'synchronous'
+    _worker_trust_score = trust_score
+
+
+def _score_tile(tile_id, geometry_wkb, date, road_ids=None):
+    polygon = wkb.loads(geometry_wkb)
+    # The as-of date can change after the worker started, e.g. when a checkpointed run is resumed
+    _worker_trust_score.date = date
+    return tile_id, _worker_trust_score.get_measures_from_polygon(polygon=polygon, road_ids=road_ids)
+
+
+def _score_tile_series(tile_id, geometry_wkb, date, dates, road_ids=None):
+    polygon = wkb.loads(geometry_wkb)
+    _worker_trust_score.date = date
+    return tile_id, _worker_trust_score.get_measures_series_from_polygon(polygon=polygon, dates=dates,
+                                                                         road_ids=road_ids)
+
+
+class TileWorkerPool:
+    """
+    Long-lived process pool that scores tiles.
+
+    The TrustScoreAnalyzer, together with its OSMDataHandler and API session, is shipped to each worker once
+    when the worker starts. Tasks only carry the tile id, the WKB of its geometry, the current as-of date of the
+    analyzer and, when the roads of the area were fetched once, the road id table of the tile.
+    """
+
+    def __init__(self, trust_score, processes=None, preload_modules=None):
+        self.trust_score = trust_score
+        self.processes = processes or os.cpu_count()
+        self.preload_modules = PRELOADED_MODULES if preload_modules is None else preload_modules
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                initializer=_init_worker,
+                initargs=(self.trust_score, self.preload_modules)
+            )
+        return self._executor
+
+    def submit(self, tile_id, polygon, dates=None, road_ids=None):
+        """
+        Returns:
+            Future: Resolves to a (tile_id, measures) tuple. When dates are given, the measures are a dictionary
+            of the measures as of each date.
+        """
+        date = self.trust_score.date
+        if dates is not None:
+            return self._get_executor().submit(_score_tile_series, tile_id, polygon.wkb, date, list(dates), road_ids)
+        return self._get_executor().submit(_score_tile, tile_id, polygon.wkb, date, road_ids)
+
+    def score_tiles(self, tiles, dates=None, road_ids=None):
+        """
+        Score tiles on the pool.
+
+        Args:
+            tiles (iterable): (tile_id, polygon) pairs.
+            dates (list): Optional as-of dates to score every tile at, from a single fetch per tile.
+            road_ids (dict): Optional road id tables keyed by tile id; the roads of other tiles are queried.
+
+        Yields:
+            tuple: (tile_id, measures) pairs in completion order.
+        """
+        road_ids = road_ids or {}
+        futures = [
+            self.submit(tile_id=tile_id, polygon=polygon, dates=dates, road_ids=road_ids.get(tile_id))
+            for tile_id, polygon in tiles
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Tiles not started yet are dropped when the caller stops early
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,64 @@
+import os
+import math
+import tempfile
+import unittest
+import pandas as pd
+from src.osw_confidence_metric.aggregates import MeanAggregate, ThresholdAggregates
+
+
+class TestMeanAggregate(unittest.TestCase):
+
+    def test_add_skips_missing_values(self):
+        aggregate = MeanAggregate().add(pd.Series([1, None, 3]))
+
+        self.assertEqual((aggregate.count, aggregate.total), (2, 4.0))
+        self.assertEqual(aggregate.mean, 2.0)
+
+    def test_merge_matches_mean_of_all_chunks(self):
+        values = pd.Series([1.0, 2.0, 6.0, None, 11.0])
+        merged = MeanAggregate().add(values[:2]) + MeanAggregate().add(values[2:])
+
+        self.assertEqual(merged, MeanAggregate().add(values))
+        self.assertAlmostEqual(merged.mean, values.mean())
+
+    def test_empty_mean_is_nan(self):
+        self.assertTrue(math.isnan(MeanAggregate().mean))
+
+
+class TestThresholdAggregates(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = pd.DataFrame({'poi_count': [1, 2, 3, 4], 'road_time': [10, None, 30, 50]})
+
+    def test_chunks_merge_to_the_whole_frame(self):
+        columns = ['poi_count', 'road_time', 'bldg_time']
+        first = ThresholdAggregates.from_frame(frame=self.frame.iloc[:1], columns=columns)
+        second = ThresholdAggregates.from_frame(frame=self.frame.iloc[1:], columns=columns)
+
+        merged = first.merge(second)
+
+        self.assertEqual(merged, ThresholdAggregates.from_frame(frame=self.frame, columns=columns))
+        thresholds = merged.thresholds()
+        self.assertEqual(thresholds['poi_count'], 2.5)
+        self.assertEqual(thresholds['road_time'], 30)
+        self.assertTrue(math.isnan(thresholds['bldg_time']))
+
+    def test_merge_keeps_columns_of_both(self):
+        merged = ThresholdAggregates.from_frame(frame=self.frame, columns=['poi_count']).merge(
+            ThresholdAggregates.from_frame(frame=self.frame, columns=['road_time'])
+        )
+
+        self.assertEqual(merged.columns, ['poi_count', 'road_time'])
+        self.assertEqual(merged.aggregates['road_time'].count, 3)
+
+    def test_save_and_load(self):
+        aggregates = ThresholdAggregates.from_frame(frame=self.frame, columns=['poi_count', 'road_time'])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'thresholds.json')
+            aggregates.save(path)
+
+            self.assertEqual(ThresholdAggregates.load(path), aggregates)
+
+
+if __name__ == '__main__':
+    unittest.main()
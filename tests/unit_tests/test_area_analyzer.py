@@ -1,13 +1,23 @@
 import os
 import math
+import asyncio
+import shutil
+import tempfile
 import unittest
+import threading
 import pandas as pd
 import geopandas as gpd
 from datetime import datetime
-from shapely.geometry import Polygon, MultiPolygon, Point
-from unittest.mock import patch, MagicMock
+from shapely.geometry import Polygon, MultiPolygon, Point, LineString
+from unittest.mock import patch, call, MagicMock
+from src.osw_confidence_metric.aggregates import ThresholdAggregates
+from src.osw_confidence_metric.checkpoint_store import CheckpointStore
+from src.osw_confidence_metric.pipeline_pool import PipelinedTilePool
+from src.osw_confidence_metric.result_cache import ResultCache
 from src.osw_confidence_metric.trust_score_calculator import TrustScoreAnalyzer
-from src.osw_confidence_metric.area_analyzer import AreaAnalyzer, _initialize_columns, _get_threshold_values
+from src.osw_confidence_metric.utils import INDIRECT_VALUE_COLUMNS
+from src.osw_confidence_metric.area_analyzer import AreaAnalyzer, _initialize_columns, _get_threshold_values, \
+    _get_run_key
 
 sample_data = {'geometry': [Point(0, 0), Point(1, 1), Point(2, 2)]}
 sample_gdf = gpd.GeoDataFrame(sample_data)
@@ -20,6 +30,31 @@ parent_dir = os.path.dirname(current_dir)
 TEST_FILE = os.path.join(parent_dir, 'src/assets/caphill_mini.geojson')
 
 
+def _mock_pool(measures, reverse=False):
+    """
+    A worker pool mock that scores every tile at once.
+
+    Args:
+        measures: The measures of each tile keyed by tile id, or a callable measures(tile_id, polygon).
+        reverse (bool): Complete the tiles in the reverse of their submission order.
+    """
+    if not callable(measures):
+        table = measures
+        measures = lambda tile_id, polygon: table[tile_id]
+
+    def score_tiles(tiles, dates=None, road_ids=None):
+        tiles = list(reversed(tiles)) if reverse else tiles
+        return iter([(tile_id, measures(tile_id, polygon)) for tile_id, polygon in tiles])
+
+    def submit(tile_id, polygon, dates=None, road_ids=None):
+        return MagicMock(result=MagicMock(return_value=(tile_id, measures(tile_id, polygon))))
+
+    mock_pool = MagicMock()
+    mock_pool.score_tiles.side_effect = score_tiles
+    mock_pool.submit.side_effect = submit
+    return mock_pool
+
+
 class TestAreaAnalyzer(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -31,11 +66,9 @@ class TestAreaAnalyzer(unittest.TestCase):
         self.mock_osm_data_handler = MagicMock()
         self.mock_trust_score_handler = MagicMock()
         self.area_analyzer = AreaAnalyzer(osm_data_handler=self.mock_osm_data_handler)
-        self.PROJ = 'epsg:26910'
 
     def test_initialization(self):
         self.assertIsInstance(self.area_analyzer.osm_data_handler, MagicMock)
-        self.assertEqual(self.area_analyzer.PROJ, 'epsg:26910')
         self.assertEqual(self.area_analyzer.DATE.date(), datetime.now().date())
 
     @patch('geonetworkx.graph_edges_to_gdf')
@@ -67,19 +100,23 @@ class TestAreaAnalyzer(unittest.TestCase):
         mock_clip.assert_called_once()
         self.assertIsInstance(result, gpd.GeoDataFrame)
 
+    @patch('src.osw_confidence_metric.area_analyzer.extract_tile_road_ids')
+    @patch('src.osw_confidence_metric.area_analyzer.extract_road_ids_from_polygon')
+    @patch('geonetworkx.graph_edges_to_gdf')
     @patch('osmnx.graph.graph_from_polygon')
     @patch.object(AreaAnalyzer, '_create_voronoi_diagram')
-    def test_create_tiling_if_needed(self, mock_create_voronoi_diagram, mock_graph_from_polygon):
+    def test_create_tiling_if_needed(self, mock_create_voronoi_diagram, mock_graph_from_polygon,
+                                     mock_graph_edges_to_gdf, mock_extract_road_ids, mock_extract_tile_road_ids):
         # Set up mock data
         mock_gdf = gpd.GeoDataFrame({'geometry': [Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])]})  # Example GeoDataFrame
-        mock_gdf_edges = MagicMock()  # Example graph_from_polygon result
-        mock_bounds = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])  # Example bounds
+        mock_simplified, mock_roads = MagicMock(), MagicMock()  # Example graph_from_polygon results
 
-        # Mock the return value of osmnx.graph_from_polygon
-        mock_graph_from_polygon.return_value = mock_gdf_edges
+        # Mock the return values of osmnx.graph_from_polygon
+        mock_graph_from_polygon.side_effect = [mock_simplified, mock_roads]
 
         # Mock the return value of _create_voronoi_diagram
         mock_create_voronoi_diagram.return_value = MagicMock()  # Example Voronoi diagram GeoDataFrame
+        mock_extract_tile_road_ids.return_value = {0: pd.DataFrame()}
 
         # Set the GeoDataFrame in the area_analyzer
         self.area_analyzer.gdf = mock_gdf
@@ -87,51 +124,26 @@ class TestAreaAnalyzer(unittest.TestCase):
         # Call the method
         self.area_analyzer._create_tiling_if_needed()
 
-        # Assert calls and results
-        mock_graph_from_polygon.assert_called_once_with(
-            mock_gdf.geometry.loc[0], network_type='drive', simplify=True, retain_all=True
-        )
-        mock_create_voronoi_diagram.assert_called_once_with(
-            gdf_edges=mock_gdf_edges, bounds=mock_gdf.geometry.loc[0]
-        )
+        # The tiles are built from the simplified network, and the edge-truncated one is clipped for the tile roads
+        polygon = mock_gdf.geometry.loc[0]
+        self.assertEqual(mock_graph_from_polygon.call_args_list, [
+            call(polygon, network_type='drive', simplify=True, retain_all=True),
+            call(polygon, network_type='drive', simplify=False, retain_all=True, truncate_by_edge=True),
+        ])
+        mock_create_voronoi_diagram.assert_called_once_with(gdf_edges=mock_simplified, bounds=polygon)
+        mock_graph_edges_to_gdf.assert_called_once_with(mock_roads)
+        self.assertIs(mock_extract_tile_road_ids.call_args.kwargs['road_ids'], mock_extract_road_ids.return_value)
         self.assertIsNotNone(self.area_analyzer.gdf)
-
-    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon',
-                  return_value={'direct_trust_score': 0.5, 'time_trust_score': 0.7,
-                                'indirect_values': {'some_key': 'some_value'}})
-    def test_process_feature(self, mock_get_measures_from_polygon):
-        # Create a valid GeoDataFrame with Polygon geometries for testing
-        coords = [
-            (-122.32020611852897, 47.6195210148756),
-            (-122.32021005772235, 47.620102439817686),
-            (-122.3192147446495, 47.62007823266089),
-            (-122.31924141598212, 47.61904150994083),
-            (-122.32020611852897, 47.6195210148756)
-        ]
-        poly = Polygon(coords)
-        data = {
-            'geometry': [poly],
-            'direct_confirmations': None,
-            'direct_trust_score': None,
-            'time_trust_score': None,
-            'indirect_values': None
-        }
-        gdf = gpd.GeoDataFrame(data, crs=self.PROJ)
-
-        # Test the method
-        result = self.area_analyzer._process_feature(gdf.iloc[0])
-
-        # Assert calls and results
-        mock_get_measures_from_polygon.assert_called_once_with(polygon=poly)
+        self.assertIs(self.area_analyzer._road_ids, mock_extract_tile_road_ids.return_value)
 
     @patch('geopandas.read_file')
     @patch.object(AreaAnalyzer, '_create_tiling_if_needed')
-    @patch('dask_geopandas.from_geopandas')
-    @patch('src.osw_confidence_metric.area_analyzer._get_threshold_values')
-    @patch('src.osw_confidence_metric.area_analyzer.compute_feature_indirect_trust')
-    @patch('src.osw_confidence_metric.area_analyzer.calculate_overall_trust_score')
+    @patch.object(AreaAnalyzer, '_process_tiles')
+    @patch('src.osw_confidence_metric.area_analyzer._get_threshold_aggregates')
+    @patch('src.osw_confidence_metric.area_analyzer.compute_indirect_trust_scores')
+    @patch('src.osw_confidence_metric.area_analyzer.calculate_overall_trust_scores')
     def test_calculate_area_confidence_score(
-            self, mock_calc_overall, mock_compute_indirect, mock_get_threshold, mock_dask_gdf, mock_tiling,
+            self, mock_calc_overall, mock_compute_indirect, mock_get_aggregates, mock_process_tiles, mock_tiling,
             mock_read_file
     ):
         # Mock GeoDataFrame
@@ -139,14 +151,14 @@ class TestAreaAnalyzer(unittest.TestCase):
             'geometry': [Point(1, 1)],
             'direct_trust_score': [0.5],
             'time_trust_score': [0.7],
-            'indirect_values': [{'some_key': 'some_value'}],
+            'poi_count': [3.0],
             'trust_score': [0.9]
         })
         mock_read_file.return_value = mock_gdf
-        mock_get_threshold.return_value = {"poi_count": 1.0}
-        mock_compute_indirect.side_effect = lambda feature, thresholds: 0.8
-        mock_calc_overall.side_effect = lambda feature: 0.9
-        mock_dask_gdf.return_value.apply.return_value.compute.return_value = mock_gdf
+        mock_get_aggregates.return_value.thresholds.return_value = {"poi_count": 1.0}
+        mock_compute_indirect.side_effect = lambda gdf, thresholds: pd.Series([1], index=gdf.index)
+        mock_calc_overall.side_effect = lambda gdf: pd.Series([0.9], index=gdf.index)
+        mock_process_tiles.return_value = mock_gdf
 
         # Call the method
         result = self.area_analyzer.calculate_area_confidence_score('mock_file.geojson')
@@ -154,25 +166,320 @@ class TestAreaAnalyzer(unittest.TestCase):
         # Assertions
         mock_read_file.assert_called_once_with('mock_file.geojson')
         mock_tiling.assert_called_once()
-        mock_get_threshold.assert_called_once()
-        mock_compute_indirect.assert_called()
-        mock_calc_overall.assert_called()
+        mock_get_aggregates.assert_called_once()
+        mock_get_aggregates.return_value.thresholds.assert_called_once()
+        mock_compute_indirect.assert_called_once()
+        self.assertEqual(mock_compute_indirect.call_args.kwargs['thresholds'], {"poi_count": 1.0})
+        mock_calc_overall.assert_called_once()
         self.assertAlmostEqual(result, 0.9, places=2)
 
-    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', return_value={})
-    def test_process_feature_invalid_geometry(self, mock_get_measures_from_polygon):
-        # Create a mock feature with invalid geometry
-        invalid_feature = MagicMock()
-        invalid_feature.geometry = "InvalidGeometry"  # Mimic the invalid geometry scenario
-
-        # Call the method
-        result = self.area_analyzer._process_feature(invalid_feature)
+    def test_process_tiles_on_worker_pool(self):
+        polygon = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+        gdf = _initialize_columns(gpd.GeoDataFrame({'geometry': [polygon, Point(0, 0)]}))
+        mock_pool = MagicMock()
+        mock_pool.score_tiles.return_value = iter([(0, self.mock_measures)])
+        self.area_analyzer._worker_pool = mock_pool
+
+        output = self.area_analyzer._process_tiles(gdf=gdf)
+
+        mock_pool.score_tiles.assert_called_once_with(tiles=[(0, polygon)], road_ids=None)
+        self.assertEqual(output.at[0, 'direct_trust_score'], 0.75)
+        self.assertEqual(output.at[0, 'poi_count'], 5)
+        self.assertEqual(output.at[0, 'road_count'], 10)
+        self.assertTrue(math.isnan(output.at[0, 'bldg_time']))
+        self.assertTrue(math.isnan(output.at[1, 'direct_trust_score']))
+
+        self.area_analyzer.close()
+        mock_pool.close.assert_called_once()
+        self.assertIsNone(self.area_analyzer._worker_pool)
+
+    def test_repeat_request_served_from_result_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        result_cache = ResultCache(os.path.join(cache_dir, 'results.sqlite'))
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(i, 0), (i + 1, 0), (i + 1, 1), (i, 1)]) for i in range(2)]},
+                                 crs='epsg:4326')
+
+        def make_analyzer(snapshot_id, **kwargs):
+            # Analyzers created at different times of the same day share results
+            analyzer = AreaAnalyzer(osm_data_handler=self.mock_osm_data_handler, result_cache=result_cache,
+                                    snapshot_id=snapshot_id, **kwargs)
+            analyzer._worker_pool = _mock_pool(measures=lambda tile_id, polygon: self.mock_measures)
+            return analyzer
+
+        first = make_analyzer(snapshot_id='s1')
+        score = first.calculate_area_confidence_score(file_path=tiles)
+        second = make_analyzer(snapshot_id='s1')
+        second.gdf = tiles.iloc[:1]
+        self.assertEqual(second.calculate_area_confidence_score(file_path=tiles.iloc[::-1]), score)
+        second._worker_pool.score_tiles.assert_not_called()
+        self.assertIsNone(second.gdf)
+
+        # Settings that change the score are part of the key
+        other = make_analyzer(snapshot_id='s1', thresholds={'poi_count': 0.0})
+        other.calculate_area_confidence_score(file_path=tiles)
+        other._worker_pool.score_tiles.assert_called_once()
+
+        # A refreshed data source is scored again
+        result_cache.invalidate(snapshot_id='s1')
+        third = make_analyzer(snapshot_id='s1')
+        self.assertEqual(third.calculate_area_confidence_score(file_path=tiles), score)
+        third._worker_pool.score_tiles.assert_called_once()
+
+    def test_roll_up_scores(self):
+        with self.assertRaises(ValueError):
+            self.area_analyzer.roll_up_scores()
+
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(i, 0), (i + 1, 0), (i + 1, 1), (i, 1)]) for i in range(4)]})
+        measures = {tile_id: {'direct_trust_score': tile_id / 4, 'time_trust_score': 0, 'indirect_values': None}
+                    for tile_id in range(4)}
+        mock_pool = _mock_pool(measures=measures)
+        self.area_analyzer._worker_pool = mock_pool
+        score = self.area_analyzer.calculate_area_confidence_score(file_path=tiles)
+
+        rollup = self.area_analyzer.roll_up_scores(quadtree_depth=1)
+        self.assertEqual(list(rollup['quadtree_1']['tiles']), [2, 2])
+        self.assertAlmostEqual(rollup['quadtree_0'].at[0, 'trust_score'], score)
+
+        halves = gpd.GeoDataFrame(geometry=[Polygon([(0, 0), (2, 0), (2, 1), (0, 1)]),
+                                            Polygon([(2, 0), (4, 0), (4, 1), (2, 1)])])
+        rollup = self.area_analyzer.roll_up_scores(levels={'half': halves})
+        self.assertEqual(list(rollup['half']['trust_score']), [0.0625, 0.3125])
+
+    def test_progressive_estimate(self):
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(i % 10, i // 10), (i % 10 + 1, i // 10),
+                                                        (i % 10 + 1, i // 10 + 1), (i % 10, i // 10 + 1)])
+                                               for i in range(100)]})
+        measures = {tile_id: {'direct_trust_score': (tile_id % 7) / 7, 'time_trust_score': tile_id % 2,
+                              'indirect_values': {'poi_count': tile_id % 5}} for tile_id in range(100)}
+        mock_pool = _mock_pool(measures=measures)
+        self.area_analyzer._worker_pool = mock_pool
+        score = self.area_analyzer.calculate_area_confidence_score(file_path=tiles)
+
+        estimates = []
+        estimate = self.area_analyzer.calculate_area_confidence_estimate(file_path=tiles, batch_size=30, seed=1,
+                                                                         on_estimate=estimates.append)
+
+        self.assertEqual([e.scored for e in estimates], [30, 60, 90, 100])
+        self.assertTrue(all(e.lower <= e.mean <= e.upper for e in estimates))
+        self.assertGreater(estimates[0].half_width, estimates[2].half_width)
+        self.assertIs(estimate, estimates[-1])
+        self.assertTrue(estimate.complete)
+        self.assertAlmostEqual(estimate.mean, score)
+        self.assertEqual((estimate.lower, estimate.upper), (estimate.mean, estimate.mean))
+        self.assertEqual(len(self.area_analyzer.tile_scores), 100)
+
+        # Every tile of a batch is scored once, and the batches cover different tiles
+        scored = [tile_id for call in mock_pool.score_tiles.call_args_list[1:] for tile_id, _ in call.kwargs['tiles']]
+        self.assertEqual(sorted(scored), list(range(100)))
+
+        estimate = self.area_analyzer.calculate_area_confidence_estimate(file_path=tiles, batch_size=10,
+                                                                         precision=0.5, min_tiles=20)
+        self.assertEqual(estimate.scored, 20)
+        self.assertFalse(estimate.complete)
+        self.assertEqual(len(self.area_analyzer.tile_scores), 20)
+
+        estimate = self.area_analyzer.calculate_area_confidence_estimate(file_path=tiles, batch_size=10, time_budget=0)
+        self.assertEqual(estimate.scored, 10)
+
+    def test_per_tile_api(self):
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(i, 0), (i + 1, 0), (i + 1, 1), (i, 1)]) for i in range(3)]})
+        mock_pool = _mock_pool(measures=lambda tile_id, polygon: _tile_measures(polygon))
+        self.area_analyzer._worker_pool = mock_pool
+        score = self.area_analyzer.calculate_area_confidence_score(file_path=tiles.copy())
+
+        loaded, road_ids = self.area_analyzer.load_tiles(area=tiles.copy())
+        self.assertEqual(road_ids, {})
+        measures = dict(self.area_analyzer.submit_tile(tile_id=tile_id, polygon=polygon).result()
+                        for tile_id, polygon in loaded.geometry.items())
+
+        self.assertAlmostEqual(self.area_analyzer.summarize_tiles(tiles=loaded, measures=measures), score)
+        self.assertNotIn('trust_score', loaded.columns)
+
+    def test_stream_tile_scores(self):
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(i, 0), (i + 1, 0), (i + 1, 1), (i, 1)]) for i in range(9)]
+                                  + [None]})
+        measures = {tile_id: {'direct_trust_score': tile_id / 10, 'time_trust_score': 0.5,
+                              'indirect_values': {'poi_count': tile_id}} for tile_id in range(9)}
+        # Completion order differs from submission order
+        mock_pool = _mock_pool(measures=measures, reverse=True)
+        self.area_analyzer._worker_pool = mock_pool
+        score = self.area_analyzer.calculate_area_confidence_score(file_path=tiles)
+
+        stream = self.area_analyzer.stream_tile_scores(file_path=tiles, seed=1)
+        self.assertIsNone(stream.estimate())
+        tile_id, polygon, tile_measures = next(stream)
+        submitted = [tile_id for tile_id, _ in mock_pool.score_tiles.call_args.kwargs['tiles']]
+        self.assertEqual(tile_id, submitted[-1])
+        self.assertTrue(polygon.equals(tiles.geometry[tile_id]))
+        self.assertIs(tile_measures, measures[tile_id])
+        # The tile without a polygon counts as soon as the area is tiled
+        self.assertEqual(stream.estimate().scored, 2)
+
+        rest = [tile_id for tile_id, _, _ in stream]
+        self.assertEqual([tile_id] + rest, list(reversed(submitted)))
+        self.assertEqual(sorted(submitted), list(range(9)))
+        estimate = stream.estimate()
+        self.assertTrue(estimate.complete)
+        self.assertAlmostEqual(estimate.mean, score)
+        self.assertEqual(len(self.area_analyzer.tile_scores), 10)
+
+        async def collect():
+            return [tile_id async for tile_id, _, _ in self.area_analyzer.stream_tile_scores(file_path=tiles)]
+
+        self.assertEqual(sorted(asyncio.run(collect())), list(range(9)))
+
+        with self.area_analyzer.stream_tile_scores(file_path=tiles) as stream:
+            next(stream)
+        self.assertEqual(list(stream), [])
+
+    def test_stream_closed_while_step_runs(self):
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(i, 0), (i + 1, 0), (i + 1, 1), (i, 1)]) for i in range(3)]})
+        release = threading.Event()
+
+        def score_tiles(tiles, road_ids=None):
+            for position, (tile_id, _) in enumerate(tiles):
+                if position:
+                    release.wait(timeout=5)
+                yield tile_id, {'direct_trust_score': 0.5, 'time_trust_score': 0.5, 'indirect_values': None}
+
+        mock_pool = MagicMock()
+        mock_pool.score_tiles.side_effect = score_tiles
+        self.area_analyzer._worker_pool = mock_pool
+
+        async def consume(stream):
+            async for _ in stream:
+                break
+            # The next step is left running on the executor once its await is cancelled
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(stream.__anext__(), timeout=0.05)
+            threading.Timer(0.1, release.set).start()
+            stream.close()
+
+        stream = self.area_analyzer.stream_tile_scores(file_path=tiles)
+        asyncio.run(consume(stream))
+        self.assertTrue(release.is_set())
+        self.assertEqual(list(stream), [])
+
+    def test_element_scores_merged_across_tiles(self):
+        with self.assertRaises(ValueError):
+            self.area_analyzer.element_index()
+
+        def element_measures(tile_id, polygon):
+            lines = tile_lines[tile_id]
+            element_scores = gpd.GeoDataFrame({
+                'osmid': [osmid for osmid, _, _ in lines], 'direct_trust_score': [score for _, score, _ in lines],
+                'time_trust_score': [1.0] * len(lines), 'geometry': [line for _, _, line in lines]
+            }, crs='epsg:4326')
+            return {'direct_trust_score': 0.5, 'time_trust_score': 1, 'indirect_values': None,
+                    'element_scores': element_scores}
+
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(i, 0), (i + 1, 0), (i + 1, 1), (i, 1)]) for i in range(2)]})
+        tile_lines = {
+            0: [(10, 0.2, LineString([(0.5, 0.5), (1, 0.5)]))],
+            1: [(10, 0.4, LineString([(1, 0.5), (1.5, 0.5)])), (11, 0.8, LineString([(1.5, 0), (1.5, 1)]))],
+        }
+        mock_pool = _mock_pool(measures=element_measures)
+        analyzer = AreaAnalyzer(osm_data_handler=self.mock_osm_data_handler, element_scores=True)
+        analyzer._worker_pool = mock_pool
+
+        analyzer.calculate_area_confidence_score(file_path=tiles)
+
+        self.assertTrue(analyzer.trust_score.element_scores)
+        self.assertEqual(list(analyzer.element_scores['osmid']), [10, 11])
+        self.assertAlmostEqual(analyzer.element_scores['direct_trust_score'].iloc[0], 0.3)
+        self.assertAlmostEqual(analyzer.element_scores.geometry.iloc[0].length, 1)
+        index = analyzer.element_index()
+        self.assertEqual(list(index.nearest(Point(1.4, 0.9))['osmid']), [11])
+
+        # An estimate stopped early keeps the ways of the tiles it scored
+        analyzer.calculate_area_confidence_estimate(file_path=tiles, batch_size=1, time_budget=0, seed=1)
+        scored = mock_pool.score_tiles.call_args.kwargs['tiles'][0][0]
+        self.assertEqual(list(analyzer.element_scores['osmid']), sorted({osmid for osmid, _, _ in tile_lines[scored]}))
+
+    def test_pipeline_worker_pool(self):
+        analyzer = AreaAnalyzer(osm_data_handler=self.mock_osm_data_handler, pipeline=True)
+
+        pool = analyzer._get_worker_pool()
+
+        self.assertIsInstance(pool, PipelinedTilePool)
+        self.assertIs(pool.trust_score, analyzer.trust_score)
+        analyzer.close()
+
+    def test_spilled_score_matches_in_memory_score(self):
+        polygons = [Polygon([(i, 0), (i + 1, 0), (i + 1, 1), (i, 1)]) for i in range(5)]
+        tiles = gpd.GeoDataFrame({'geometry': polygons + [Point(0, 0)]})
+        measures = {
+            tile_id: {
+                'direct_trust_score': tile_id / 5,
+                'time_trust_score': tile_id % 2,
+                'indirect_values': {col: float(tile_id * (i + 1) % 4) for i, col in enumerate(INDIRECT_VALUE_COLUMNS)}
+            }
+            for tile_id in range(5)
+        }
+        mock_pool = _mock_pool(measures=measures)
+        self.area_analyzer._worker_pool = mock_pool
+        expected = self.area_analyzer.calculate_area_confidence_score(file_path=tiles.copy())
+
+        spill_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, spill_dir)
+        on_tile = MagicMock()
+        analyzer = AreaAnalyzer(osm_data_handler=self.mock_osm_data_handler, tiling='none', memory_budget=1,
+                                spill_dir=spill_dir)
+        analyzer._worker_pool = mock_pool
+        with patch('src.osw_confidence_metric.result_spill.TileResultSpill.close', autospec=True) as mock_close:
+            result = analyzer.calculate_area_confidence_score(file_path=tiles.copy(), on_tile=on_tile)
+
+        self.assertAlmostEqual(result, expected)
+        self.assertEqual(on_tile.call_count, 5)
+        spilled, = mock_close.call_args.args
+        self.assertEqual(len(spilled.parts), 6)
+        self.assertEqual(analyzer.threshold_aggregates, self.area_analyzer.threshold_aggregates)
+
+    def test_summarize_scores_with_supplied_thresholds(self):
+        output = _initialize_columns(gpd.GeoDataFrame({'geometry': [Point(0, 0), Point(1, 1)]}))
+        for col in ['poi_count', 'poi_users', 'poi_time']:
+            output[col] = [1.0, 4.0]
+        thresholds = {col: 0.0 for col in INDIRECT_VALUE_COLUMNS}
+        analyzer = AreaAnalyzer(osm_data_handler=self.mock_osm_data_handler, thresholds=thresholds)
+
+        with patch.object(ThresholdAggregates, 'thresholds') as mock_thresholds:
+            result = analyzer._summarize_scores(output=output.copy())
+
+        mock_thresholds.assert_not_called()
+        self.assertEqual(result, 0.25)
+        self.assertEqual(analyzer.threshold_aggregates.aggregates['poi_count'].count, 2)
+
+        # Without supplied thresholds only the tile above the mean is trusted
+        self.assertEqual(self.area_analyzer._summarize_scores(output=output.copy()), 0.125)
+        self.assertEqual(analyzer.threshold_aggregates, self.area_analyzer.threshold_aggregates)
+
+    def test_calculate_area_confidence_series(self):
+        polygons = [Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]), Polygon([(1, 0), (2, 0), (2, 1), (1, 1)])]
+        dates = [datetime(2023, 1, 1), datetime(2021, 1, 1)]
+        earlier = {'direct_trust_score': 0.2, 'time_trust_score': 0, 'indirect_values': None}
+        mock_pool = MagicMock()
+        mock_pool.score_tiles.return_value = iter([
+            (1, {dates[0]: self.mock_measures, dates[1]: earlier}),
+            (0, {dates[0]: self.mock_measures, dates[1]: earlier}),
+        ])
+        self.area_analyzer._worker_pool = mock_pool
+
+        tile_scores, area_scores = self.area_analyzer.calculate_area_confidence_series(
+            area=gpd.GeoDataFrame({'geometry': polygons}, crs='epsg:4326'), dates=dates
+        )
 
-        # Verify that get_measures_from_polygon was not called
-        mock_get_measures_from_polygon.assert_not_called()
+        self.assertEqual(mock_pool.score_tiles.call_args.kwargs['dates'], sorted(dates))
+        self.assertEqual(list(tile_scores.columns), sorted(dates))
+        self.assertEqual(list(area_scores.index), sorted(dates))
+        self.assertAlmostEqual(tile_scores.at[0, dates[1]], 0.1)
+        self.assertAlmostEqual(area_scores[dates[1]], 0.1)
+        self.assertAlmostEqual(area_scores[dates[0]], 0.75 * 0.5 + 0.9 * 0.25)
 
-        # Assert that the result is the same as the input feature
-        self.assertEqual(result, invalid_feature)
+    @patch.object(AreaAnalyzer, '_load_tiles', return_value=None)
+    def test_calculate_area_confidence_series_untiled(self, mock_load_tiles):
+        self.assertEqual(self.area_analyzer.calculate_area_confidence_series(area=mock_file_path, dates=[]),
+                         (None, None))
 
     @patch('geopandas.read_file')
     @patch.object(AreaAnalyzer, '_create_tiling_if_needed')
@@ -195,19 +502,155 @@ class TestAreaAnalyzer(unittest.TestCase):
         self.assertEqual(result, 0, "The method should return 0 when gdf is None.")
 
 
+def _tile_measures(polygon):
+    x = polygon.bounds[0]
+    return {
+        'direct_trust_score': 0.1 * (x + 1),
+        'time_trust_score': x % 2,
+        'indirect_values': {'poi_count': x, 'bldg_count': 2 * x, 'road_count': 3, 'poi_users': x, 'road_users': 1,
+                            'bldg_users': x, 'poi_time': 10 * x, 'road_time': 5, 'bldg_time': None}
+    }
+
+
+class _SerialPool:
+    """
+    Scores tiles one after the other in the test process, so that mocks see every call.
+    """
+
+    def __init__(self, trust_score):
+        self.trust_score = trust_score
+
+    def score_tiles(self, tiles, dates=None, road_ids=None):
+        for tile_id, polygon in tiles:
+            yield tile_id, self.trust_score.get_measures_from_polygon(polygon=polygon)
+
+    def close(self):
+        pass
+
+
+class TestAreaAnalyzerCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.tiles = gpd.GeoDataFrame({
+            'geometry': [Polygon([(x, 0), (x + 1, 0), (x + 1, 1), (x, 1)]) for x in range(4)]
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _score(self, store, get_measures):
+        analyzer = AreaAnalyzer(osm_data_handler=MagicMock(), checkpoint_store=store)
+        analyzer._worker_pool = _SerialPool(trust_score=analyzer.trust_score)
+        with patch('geopandas.read_file', return_value=self.tiles.copy()), \
+                patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', side_effect=get_measures) as mock:
+            return analyzer.calculate_area_confidence_score('area.geojson'), mock, analyzer
+
+    def test_resume_skips_completed_tiles(self):
+        store = CheckpointStore(path=self.directory)
+
+        def failing_measures(polygon):
+            if polygon.bounds[0] == 2:
+                raise ConnectionError('API throttled')
+            return _tile_measures(polygon)
+
+        with self.assertRaises(ConnectionError):
+            self._score(store=store, get_measures=failing_measures)
+        first_date = store.load_run(run_key=next(iter(_run_keys(store))))[0]
+
+        resumed_score, mock_measures, analyzer = self._score(
+            store=CheckpointStore(path=self.directory),
+            get_measures=lambda polygon: _tile_measures(polygon)
+        )
+
+        scored = [call.kwargs['polygon'].bounds[0] for call in mock_measures.call_args_list]
+        self.assertEqual(scored, [2, 3])
+        self.assertNotEqual(analyzer.DATE, first_date)
+        self.assertEqual(analyzer.trust_score.date, analyzer.DATE)
+        # The finished run is dropped, so the area is scored anew next time
+        self.assertEqual(_run_keys(store), [])
+
+        uninterrupted_directory = tempfile.mkdtemp()
+        try:
+            uninterrupted_score, _, _ = self._score(
+                store=CheckpointStore(path=uninterrupted_directory),
+                get_measures=lambda polygon: _tile_measures(polygon)
+            )
+        finally:
+            shutil.rmtree(uninterrupted_directory)
+        self.assertEqual(resumed_score, uninterrupted_score)
+
+    def test_resume_in_memory_area(self):
+        def failing_measures(polygon):
+            if polygon.bounds[0] == 2:
+                raise ConnectionError('API throttled')
+            return _tile_measures(polygon)
+
+        scored = []
+        for get_measures in [failing_measures, _tile_measures]:
+            analyzer = AreaAnalyzer(osm_data_handler=MagicMock(), checkpoint_store=CheckpointStore(self.directory),
+                                    tiling='none')
+            analyzer._worker_pool = _SerialPool(trust_score=analyzer.trust_score)
+            with patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', side_effect=get_measures) as mock:
+                try:
+                    # The same area read again, with its features in another order
+                    analyzer.calculate_area_confidence_score(self.tiles.iloc[::-1] if scored else self.tiles.copy())
+                except ConnectionError:
+                    pass
+            scored.append([call.kwargs['polygon'].bounds[0] for call in mock.call_args_list])
+
+        self.assertEqual(scored, [[0, 1, 2], [2, 3]])
+
+    def test_resumed_date_kept_to_its_run(self):
+        store = CheckpointStore(path=self.directory)
+        analyzer = AreaAnalyzer(osm_data_handler=MagicMock(), checkpoint_store=store)
+        # An interrupted run of the first area, as of an earlier date
+        first_date = datetime(2020, 1, 1)
+        store.save_run(run_key=_get_run_key(file_path='area.geojson', sidewalk_filter=analyzer.SIDEWALK_FILTER),
+                       date=first_date, tiles=self.tiles.copy())
+        analyzer._worker_pool = _SerialPool(trust_score=analyzer.trust_score)
+        dates = []
+
+        def measures(polygon):
+            dates.append(analyzer.trust_score.date)
+            return _tile_measures(polygon)
+
+        with patch('geopandas.read_file', return_value=self.tiles.copy()), \
+                patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', side_effect=measures):
+            analyzer.calculate_area_confidence_score('area.geojson')
+            # A fresh area scored by the same analyzer is scored as of the analyzer's date
+            analyzer.calculate_area_confidence_score('other.geojson')
+
+        self.assertEqual(dates, [first_date] * 4 + [analyzer.DATE] * 4)
+        self.assertEqual(analyzer.trust_score.date, analyzer.DATE)
+
+    def test_histories_checkpointed_through_handler(self):
+        osm_data_handler = MagicMock()
+        osm_data_handler.history_store = None
+        store = CheckpointStore(path=self.directory)
+
+        analyzer = AreaAnalyzer(osm_data_handler=osm_data_handler, checkpoint_store=store)
+
+        self.assertIs(analyzer.osm_data_handler.history_store, store)
+        self.assertIs(analyzer.trust_score.osm_data_handler, analyzer.osm_data_handler)
+        # The caller's handler is left as it was
+        self.assertIsNone(osm_data_handler.history_store)
+
+
+def _run_keys(store):
+    with store._connect() as connection:
+        return [row[0] for row in connection.execute('SELECT run_key FROM runs')]
+
+
 class TestGetThresholdValues(unittest.TestCase):
 
     def test_get_threshold_values(self):
-        # Create a sample GeoDataFrame with indirect_values
-        sample_data = {
-            'indirect_values': [
-                {'poi_count': 10, 'bldg_count': 20, 'road_count': 30, 'poi_users': 40, 'road_users': 50,
-                 'bldg_users': 60, 'poi_time': 70, 'road_time': 80, 'bldg_time': 90},
-                {'poi_count': 15, 'bldg_count': 25, 'road_count': 35, 'poi_users': 45, 'road_users': 55,
-                 'bldg_users': 65, 'poi_time': 75, 'road_time': 85, 'bldg_time': 95},
-            ]
-        }
-        sample_gdf = pd.DataFrame(sample_data)
+        # Create a sample GeoDataFrame with one typed column per indirect value
+        sample_gdf = pd.DataFrame({
+            'poi_count': [10, 15], 'bldg_count': [20, 25], 'road_count': [30, 35], 'poi_users': [40, 45],
+            'road_users': [50, 55], 'bldg_users': [60, 65], 'poi_time': [70, 75], 'road_time': [80, 85],
+            'bldg_time': [90, 95],
+        })
 
         # Call the _get_threshold_values function
         threshold_values = _get_threshold_values(sample_gdf)
@@ -228,14 +671,20 @@ class TestGetThresholdValues(unittest.TestCase):
         # Assert that the computed threshold values match the expected values
         self.assertEqual(threshold_values, expected_threshold_values)
 
+    def test_get_threshold_values_skips_missing(self):
+        sample_gdf = _initialize_columns(gpd.GeoDataFrame({'geometry': [Point(0, 0), Point(1, 1)]}))
+        sample_gdf.at[0, 'poi_time'] = 12
+
+        threshold_values = _get_threshold_values(sample_gdf)
+
+        self.assertEqual(threshold_values['poi_time'], 12)
+        self.assertTrue(math.isnan(threshold_values['road_time']))
+
     def test_empty_gdf(self):
-        # Create an empty DataFrame with the correct schema and structure for 'indirect_values'
+        # Create a frame whose indirect values are all missing
         empty_gdf = pd.DataFrame({
-            'indirect_values': [
-                {'poi_count': None, 'bldg_count': None, 'road_count': None,
-                 'poi_users': None, 'road_users': None, 'bldg_users': None,
-                 'poi_time': None, 'road_time': None, 'bldg_time': None}
-            ]  # A placeholder structure with None values
+            'poi_count': [None], 'bldg_count': [None], 'road_count': [None], 'poi_users': [None],
+            'road_users': [None], 'bldg_users': [None], 'poi_time': [None], 'road_time': [None], 'bldg_time': [None]
         })
 
         # Call the function
@@ -264,7 +713,9 @@ class TestInitializeColumns(unittest.TestCase):
     def test_initialize_columns_empty_gdf(self):
         empty_gdf = gpd.GeoDataFrame({'geometry': []})
         initialized_gdf = _initialize_columns(empty_gdf)
-        expected_columns = ['direct_confirmations', 'direct_trust_score', 'time_trust_score', 'indirect_values']
+        expected_columns = ['direct_confirmations', 'direct_trust_score', 'time_trust_score', 'poi_count',
+                            'bldg_count', 'road_count', 'poi_users', 'road_users', 'bldg_users', 'poi_time',
+                            'road_time', 'bldg_time']
         for col in expected_columns:
             self.assertIn(col, initialized_gdf.columns)
             self.assertTrue(initialized_gdf[col].isna().all())
@@ -281,7 +732,9 @@ class TestInitializeColumns(unittest.TestCase):
         initialized_gdf = _initialize_columns(sample_gdf)
 
         # Check if the required columns are added and initialized to None
-        expected_columns = ['direct_confirmations', 'direct_trust_score', 'time_trust_score', 'indirect_values']
+        expected_columns = ['direct_confirmations', 'direct_trust_score', 'time_trust_score', 'poi_count',
+                            'bldg_count', 'road_count', 'poi_users', 'road_users', 'bldg_users', 'poi_time',
+                            'road_time', 'bldg_time']
         for col in expected_columns:
             self.assertTrue(col in initialized_gdf.columns)  # Check if column exists
             self.assertTrue(initialized_gdf[col].isna().all())  # Check if all values are None
@@ -294,7 +747,9 @@ class TestInitializeColumns(unittest.TestCase):
         initialized_gdf = _initialize_columns(sample_gdf)
 
         # Check that the columns are added and initialized to None
-        expected_columns = ['direct_confirmations', 'direct_trust_score', 'time_trust_score', 'indirect_values']
+        expected_columns = ['direct_confirmations', 'direct_trust_score', 'time_trust_score', 'poi_count',
+                            'bldg_count', 'road_count', 'poi_users', 'road_users', 'bldg_users', 'poi_time',
+                            'road_time', 'bldg_time']
         for col in expected_columns:
             self.assertIn(col, initialized_gdf.columns, f"Column {col} should exist in the DataFrame")
             self.assertTrue(initialized_gdf[col].isna().all(), f"Column {col} should be initialized to None")
@@ -341,6 +796,25 @@ class TestAreaAnalyzerExceptions(unittest.TestCase):
         # Assert: gdf should be set to None due to the exception
         self.assertIsNone(self.area_analyzer.gdf)
 
+    @patch('src.osw_confidence_metric.area_analyzer.extract_road_ids_from_polygon')
+    @patch.object(AreaAnalyzer, '_create_voronoi_diagram')
+    @patch('osmnx.graph.graph_from_polygon')
+    def test_create_tiling_if_needed_road_ids_exception(self, mock_graph_from_polygon, mock_create_voronoi_diagram,
+                                                        mock_extract_road_ids):
+        # Setup: the tiling succeeds, but the area has no roads to query
+        mock_graph_from_polygon.return_value = MagicMock()
+        mock_extract_road_ids.side_effect = ValueError('No roads')
+        self.area_analyzer.gdf = gpd.GeoDataFrame({
+            'geometry': [Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])]
+        })
+
+        # Call the method
+        self.area_analyzer._create_tiling_if_needed()
+
+        # Assert: the area degrades as for a failed tiling
+        self.assertIsNone(self.area_analyzer.gdf)
+        self.assertIsNone(self.area_analyzer._road_ids)
+
     def test_create_tiling_if_needed_no_geometry(self):
         # Setup: Mock gdf with no geometry
         self.area_analyzer.gdf = gpd.GeoDataFrame({'geometry': []})
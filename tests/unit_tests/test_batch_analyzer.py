@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+import unittest
+import geopandas as gpd
+from unittest.mock import patch, MagicMock
+from shapely.geometry import Polygon
+from src.osw_confidence_metric.area_analyzer import AreaAnalyzer
+from src.osw_confidence_metric.batch_analyzer import BatchAreaAnalyzer
+from src.osw_confidence_metric.checkpoint_store import CheckpointStore
+from src.osw_confidence_metric.history_cache import MemoryHistoryCache
+from src.osw_confidence_metric.osm_data_handler import OSMDataHandler
+from src.osw_confidence_metric.trust_score_calculator import TrustScoreAnalyzer
+
+
+def _fake_measures(self, polygon, road_ids=None):
+    x = polygon.bounds[0]
+    return {
+        'direct_trust_score': 0.2 * x,
+        'time_trust_score': 1,
+        'indirect_values': {'poi_count': x, 'bldg_count': x, 'road_count': x, 'poi_users': x, 'road_users': x,
+                            'bldg_users': x, 'poi_time': x, 'road_time': x, 'bldg_time': x}
+    }
+
+
+def _area(*xs):
+    return gpd.GeoDataFrame({'geometry': [Polygon([(x, 0), (x + 1, 0), (x + 1, 1), (x, 1)]) for x in xs]})
+
+
+class TestBatchAreaAnalyzer(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_caches_configured(self):
+        osm_data_handler = OSMDataHandler()
+        batch = BatchAreaAnalyzer(osm_data_handler=osm_data_handler, processes=1, cache_dir=self.directory)
+
+        batch_handler = batch.area_analyzer.trust_score.osm_data_handler
+        self.assertIsInstance(batch_handler.history_store, MemoryHistoryCache)
+        self.assertIsInstance(batch_handler.history_store.backing_store, CheckpointStore)
+        # The caller's handler is left as it was
+        self.assertIsNot(batch_handler, osm_data_handler)
+        self.assertIsNone(osm_data_handler.history_store)
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', new=_fake_measures)
+    def test_scores_every_area_on_one_pool(self):
+        areas = [_area(0, 1), _area(2, 3, 4)]
+        expected = []
+        for area in areas:
+            with AreaAnalyzer(osm_data_handler=OSMDataHandler(), processes=1) as analyzer:
+                expected.append(analyzer.calculate_area_confidence_score(area.copy()))
+
+        with BatchAreaAnalyzer(osm_data_handler=OSMDataHandler(), processes=2) as batch:
+            scores = batch.calculate_area_confidence_scores(areas)
+            worker_pool = batch.area_analyzer._worker_pool
+            batch.calculate_area_confidence_scores(areas[:1])
+            self.assertIs(batch.area_analyzer._worker_pool, worker_pool)
+
+        self.assertIsNone(batch.area_analyzer._worker_pool)
+        self.assertEqual(len(scores), 2)
+        for score, expected_score in zip(scores, expected):
+            self.assertAlmostEqual(score, expected_score)
+
+    def test_tiles_submitted_with_road_ids_of_their_area(self):
+        areas = [_area(0, 1), _area(2)]
+        area_road_ids = iter([{0: 'roads 0', 1: 'roads 1'}, {0: 'roads 2'}])
+
+        def submit_tile(tile_id, polygon, road_ids=None):
+            return MagicMock(result=MagicMock(return_value=(tile_id, _fake_measures(None, polygon))))
+
+        with patch.object(AreaAnalyzer, 'load_tiles', side_effect=lambda area: (area, next(area_road_ids))), \
+                patch.object(AreaAnalyzer, 'submit_tile', side_effect=submit_tile) as mock_submit_tile:
+            with BatchAreaAnalyzer(osm_data_handler=OSMDataHandler(), processes=1) as batch:
+                batch.calculate_area_confidence_scores(areas)
+
+        self.assertEqual([call.kwargs['road_ids'] for call in mock_submit_tile.call_args_list],
+                         ['roads 0', 'roads 1', 'roads 2'])
+
+    @patch.object(AreaAnalyzer, 'load_tiles', return_value=(None, {}))
+    def test_untiled_area_scores_zero(self, mock_load_tiles):
+        with BatchAreaAnalyzer(osm_data_handler=OSMDataHandler(), processes=1) as batch:
+            self.assertEqual(batch.calculate_area_confidence_scores(['a.geojson', 'b.geojson']), [0, 0])
+
+if __name__ == '__main__':
+    unittest.main()
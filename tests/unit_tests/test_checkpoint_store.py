@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+import geopandas as gpd
+from datetime import datetime
+from shapely.geometry import Polygon
+from src.osw_confidence_metric.checkpoint_store import CheckpointStore
+
+
+class TestCheckpointStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = CheckpointStore(path=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_store_created_in_directory(self):
+        self.assertEqual(self.store.path, os.path.join(self.directory, 'checkpoint.sqlite'))
+        self.assertTrue(os.path.isfile(self.store.path))
+
+    def test_run_round_trip(self):
+        tiles = gpd.GeoDataFrame({'geometry': [Polygon([(0, 0), (1, 0), (1, 1)])]})
+        date = datetime(2024, 1, 16, 10, 30)
+
+        self.store.save_run(run_key='run', date=date, tiles=tiles)
+        loaded_date, loaded_tiles = self.store.load_run(run_key='run')
+
+        self.assertEqual(loaded_date, date)
+        self.assertTrue(loaded_tiles.geometry.equals(tiles.geometry))
+        self.assertIsNone(self.store.load_run(run_key='other'))
+
+    def test_tile_results_round_trip(self):
+        measures = {'direct_trust_score': 0.5, 'time_trust_score': 1, 'indirect_values': {'poi_count': 3}}
+        self.store.save_tile_result(run_key='run', tile_id=4, measures=measures)
+        self.store.save_tile_result(run_key='other', tile_id=1, measures=measures)
+
+        self.assertEqual(self.store.load_tile_results(run_key='run'), {4: measures})
+
+    def test_clear_run(self):
+        self.store.save_run(run_key='run', date=datetime(2024, 1, 16), tiles=gpd.GeoDataFrame({'geometry': []}))
+        self.store.save_tile_result(run_key='run', tile_id=0, measures={})
+
+        self.store.save_run(run_key='other', date=datetime(2024, 1, 16), tiles=gpd.GeoDataFrame({'geometry': []}))
+        self.store.put_history('way', 10, {1: {'user': 'user1'}})
+
+        self.store.clear_run(run_key='run')
+
+        self.assertIsNone(self.store.load_run(run_key='run'))
+        self.assertEqual(self.store.load_tile_results(run_key='run'), {})
+        # Histories are kept while another run may resume
+        self.assertIsNotNone(self.store.get_history('way', 10))
+        self.store.clear_run(run_key='other')
+        self.assertIsNone(self.store.get_history('way', 10))
+
+    def test_store_created_in_new_directory(self):
+        directory = os.path.join(self.directory, 'cache', '')
+
+        store = CheckpointStore(path=directory)
+
+        self.assertEqual(store.path, os.path.join(directory, 'checkpoint.sqlite'))
+        self.assertTrue(os.path.isfile(store.path))
+
+    def test_history_round_trip(self):
+        history = {1: {'user': 'user1', 'timestamp': datetime(2024, 1, 1)}}
+        self.store.put_history('way', 10, history)
+
+        self.assertEqual(self.store.get_history('way', 10), history)
+        self.assertIsNone(self.store.get_history('node', 10))
+
+    def test_store_shared_between_instances(self):
+        self.store.put_history('node', 1, {1: {'user': 'user1'}})
+
+        other = CheckpointStore(path=self.store.path)
+
+        self.assertEqual(other.get_history('node', 1), {1: {'user': 'user1'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
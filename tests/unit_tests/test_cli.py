@@ -0,0 +1,109 @@
+import os
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+import geopandas as gpd
+from unittest.mock import patch
+from shapely.geometry import Polygon
+from src.osw_confidence_metric import cli
+from src.osw_confidence_metric.trust_score_calculator import TrustScoreAnalyzer
+
+
+def _fake_measures(self, polygon, road_ids=None):
+    return {'direct_trust_score': polygon.bounds[0] / 10, 'time_trust_score': 1,
+            'indirect_values': {'poi_count': polygon.bounds[0], 'road_count': None}}
+
+
+def _square(x):
+    return Polygon([(x, 0), (x + 1, 0), (x + 1, 1), (x, 1)])
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.area = os.path.join(self.directory, 'area.geojson')
+        gpd.GeoDataFrame({'geometry': [_square(1), _square(2), _square(3)]}, crs='epsg:4326').to_file(self.area)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_parser_defaults(self):
+        args = cli.build_parser().parse_args(['a.geojson', 'b.geojson', '--workers', '4'])
+
+        self.assertEqual(args.areas, ['a.geojson', 'b.geojson'])
+        self.assertEqual(args.workers, 4)
+        self.assertEqual((args.executor, args.tiling, args.output), ('process', 'auto', None))
+        self.assertFalse(args.map_snapshot)
+        self.assertIsNone(args.element_index)
+        self.assertIsNone(args.flight_store)
+
+    def test_archive_options(self):
+        parser = cli.build_parser()
+        self.assertIsNone(cli._build_archive(parser.parse_args(['a.geojson'])))
+
+        archive = cli._build_archive(parser.parse_args(['a.geojson', '--record', self.directory]))
+        self.assertEqual((archive.mode, archive.latency), ('record', None))
+
+        archive = cli._build_archive(
+            parser.parse_args(['a.geojson', '--replay', self.directory, '--replay-latency', '0.25'])
+        )
+        self.assertEqual((archive.mode, archive.latency), ('replay', 0.25))
+        archive = cli._build_archive(
+            parser.parse_args(['a.geojson', '--replay', self.directory, '--replay-latency', 'recorded'])
+        )
+        self.assertEqual(archive.latency, 'recorded')
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', new=_fake_measures)
+    def test_streams_tiles_to_csv(self):
+        output = os.path.join(self.directory, 'tiles.csv')
+        out = io.StringIO()
+
+        summaries = cli.run(cli.build_parser().parse_args(
+            [self.area, '--workers', '1', '--tiling', 'none', '--output', output]
+        ), out=out)
+
+        tiles = pd.read_csv(output).sort_values('tile_id')
+        self.assertEqual(list(tiles['tile_id']), [0, 1, 2])
+        self.assertEqual(list(tiles['poi_count']), [1.0, 2.0, 3.0])
+        self.assertTrue(tiles['road_count'].isna().all())
+        self.assertTrue(tiles['geometry'].iloc[0].startswith('POLYGON'))
+        self.assertEqual(summaries[0]['tiles'], 3)
+        self.assertEqual(json.loads(out.getvalue())['area'], self.area)
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', new=_fake_measures)
+    def test_progressive_estimate_within_time_budget(self):
+        summaries = cli.run(cli.build_parser().parse_args(
+            [self.area, '--workers', '1', '--tiling', 'none', '--time-budget', '60']
+        ), out=io.StringIO())
+
+        summary = summaries[0]
+        self.assertEqual((summary['tiles'], summary['tiles_scored']), (3, 3))
+        self.assertEqual(summary['lower'], summary['score'])
+        self.assertEqual(summary['upper'], summary['score'])
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', new=_fake_measures)
+    def test_streams_tiles_to_geoparquet_with_profile(self):
+        output = os.path.join(self.directory, 'tiles.parquet')
+        profile = os.path.join(self.directory, 'profile.txt')
+        cache_dir = os.path.join(self.directory, 'cache')
+        os.makedirs(cache_dir)
+
+        with patch('sys.stdout', new=io.StringIO()):
+            cli.main([self.area, self.area, '--workers', '1', '--tiling', 'none', '--output', output,
+                      '--profile', profile, '--cache-dir', cache_dir])
+
+        tiles = gpd.read_parquet(output)
+        self.assertEqual(len(tiles), 6)
+        self.assertTrue(tiles.geometry.iloc[0].equals(_square(int(tiles['tile_id'].iloc[0]) + 1)))
+        with open(profile) as f:
+            report = f.read()
+        self.assertIn('cumulative', report)
+        self.assertIn('"tiles": 3', report)
+
+
+if __name__ == '__main__':
+    unittest.main()
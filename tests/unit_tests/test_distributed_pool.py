@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from distributed import Client, LocalCluster
+from shapely.geometry import Polygon, Point
+import geopandas as gpd
+from src.osw_confidence_metric.area_analyzer import AreaAnalyzer, _initialize_columns
+from src.osw_confidence_metric.distributed_pool import DistributedTilePool
+from src.osw_confidence_metric.osm_data_handler import OSMDataHandler
+from src.osw_confidence_metric.trust_score_calculator import TrustScoreAnalyzer
+
+
+def _fake_measures(self, polygon, road_ids=None):
+    return {'direct_trust_score': polygon.bounds[0], 'time_trust_score': 1, 'scheduler': self.scheduler,
+            'indirect_values': {'poi_count': polygon.bounds[0]}, 'date': self.date}
+
+
+def _fake_series(self, polygon, dates, road_ids=None):
+    return {date: {'direct_trust_score': polygon.bounds[0], 'time_trust_score': date.year, 'indirect_values': None}
+            for date in dates}
+
+
+def _square(x):
+    return Polygon([(x, 0), (x + 1, 0), (x + 1, 1), (x, 1)])
+
+
+class TestDistributedTilePool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cluster = LocalCluster(n_workers=2, threads_per_worker=1, processes=False, dashboard_address=None)
+        cls.client = Client(cls.cluster)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.cluster.close()
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', new=_fake_measures)
+    def test_score_tiles_on_cluster(self):
+        trust_score = TrustScoreAnalyzer('["highway"]', OSMDataHandler(), datetime(2024, 1, 16))
+
+        with DistributedTilePool(client=self.client, trust_score=trust_score) as pool:
+            results = dict(pool.score_tiles(tiles=[(i, _square(i)) for i in range(5)]))
+            # The analyzer is scattered once and reused by later batches
+            scattered = pool._trust_score_future
+            trust_score.date = datetime(2023, 5, 1)
+            results.update(pool.score_tiles(tiles=[(5, _square(5))]))
+            self.assertIs(pool._trust_score_future, scattered)
+
+        self.assertIsNone(pool._trust_score_future)
+        self.assertEqual(sorted(results), list(range(6)))
+        self.assertEqual(results[4]['direct_trust_score'], 4)
+        # The date set after the analyzer was scattered is the one the later tiles are scored at
+        self.assertEqual(results[4]['date'], datetime(2024, 1, 16))
+        self.assertEqual(results[5]['date'], datetime(2023, 5, 1))
+        self.assertTrue(all(measures['scheduler'] == 'synchronous' for measures in results.values()))
+        self.assertEqual(trust_score.scheduler, 'multiprocessing')
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_series_from_polygon', new=_fake_series)
+    def test_score_tiles_at_several_dates(self):
+        trust_score = TrustScoreAnalyzer('["highway"]', OSMDataHandler(), datetime(2024, 1, 16))
+        dates = [datetime(2022, 1, 1), datetime(2023, 1, 1)]
+
+        with DistributedTilePool(client=self.client, trust_score=trust_score) as pool:
+            results = dict(pool.score_tiles(tiles=[(0, _square(2))], dates=dates))
+
+        self.assertEqual(results[0][dates[1]]['time_trust_score'], 2023)
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', new=_fake_measures)
+    def test_area_analyzer_with_client(self):
+        gdf = _initialize_columns(gpd.GeoDataFrame({'geometry': [_square(1), _square(2), Point(0, 0)]}))
+
+        with AreaAnalyzer(osm_data_handler=OSMDataHandler(), client=self.client) as area_analyzer:
+            output = area_analyzer._process_tiles(gdf=gdf)
+            self.assertIsInstance(area_analyzer._worker_pool, DistributedTilePool)
+
+        self.assertEqual(list(output['direct_trust_score'][:2]), [1, 2])
+        self.assertEqual(output.at[1, 'poi_count'], 2)
+        self.assertEqual(self.client.status, 'running')
+
+
+if __name__ == '__main__':
+    unittest.main()
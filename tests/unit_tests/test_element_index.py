@@ -0,0 +1,93 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from shapely.geometry import LineString, Point
+from src.osw_confidence_metric.element_index import ELEMENT_SCORE_COLUMNS, ElementScoreIndex, merge_element_scores
+
+
+def _segments(osmid, score, *lines):
+    return pd.DataFrame({
+        'osmid': [osmid] * len(lines), 'direct_trust_score': [score] * len(lines),
+        'time_trust_score': [1.0] * len(lines), 'geometry': [LineString(line) for line in lines]
+    })
+
+
+class TestMergeElementScores(unittest.TestCase):
+
+    def test_merges_segments_per_way(self):
+        elements = merge_element_scores(frames=[
+            _segments(10, 0.2, [(0, 0), (1, 0)], [(1, 0), (2, 0)]),
+            _segments(11, 0.6, [(0, 1), (1, 1)]),
+                # The same way scored by a second tile
+            _segments(10, 0.4, [(1, 0), (2, 0)]),
+        ])
+
+        self.assertEqual(list(elements.columns), ELEMENT_SCORE_COLUMNS)
+        self.assertEqual(list(elements['osmid']), [10, 11])
+        self.assertAlmostEqual(elements['direct_trust_score'].iloc[0], (0.2 + 0.2 + 0.4) / 3)
+        self.assertTrue(elements.geometry.iloc[0].equals(LineString([(0, 0), (2, 0)])))
+        self.assertEqual(elements.crs, 'epsg:4326')
+
+    def test_counts_segments_shared_by_tiles_once(self):
+        first_tile = _segments(10, 0.2, [(0, 0), (1, 0)], [(1, 0), (2, 0)]).assign(u=[1, 2], v=[2, 3])
+        # The second tile clips the same segment, which it scores a little differently
+        second_tile = _segments(10, 0.4, [(1, 0), (2, 0)]).assign(u=[2], v=[3])
+
+        elements = merge_element_scores(frames=[first_tile, second_tile])
+
+        self.assertEqual(list(elements.columns), ELEMENT_SCORE_COLUMNS)
+        self.assertAlmostEqual(elements['direct_trust_score'].iloc[0], (0.2 + (0.2 + 0.4) / 2) / 2)
+        self.assertTrue(elements.geometry.iloc[0].equals(LineString([(0, 0), (2, 0)])))
+
+    def test_no_frames(self):
+        elements = merge_element_scores(frames=[None, _segments(10, 0.2)])
+
+        self.assertTrue(elements.empty)
+        self.assertEqual(list(elements.columns), ELEMENT_SCORE_COLUMNS)
+        self.assertEqual(len(ElementScoreIndex(element_scores=elements).query((0, 0, 1, 1))), 0)
+
+
+class TestElementScoreIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = ElementScoreIndex(element_scores=merge_element_scores(frames=[
+            _segments(10, 0.2, [(0, 0), (1, 0)]),
+            _segments(11, 0.6, [(0, 1), (1, 1)]),
+            _segments(12, 0.8, [(5, 5), (6, 6)]),
+        ]))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_query(self):
+        self.assertEqual(list(self.index.query((-1, -1, 2, 0.5))['osmid']), [10])
+        self.assertEqual(list(self.index.query(LineString([(0.5, -1), (0.5, 2)]))['osmid']), [10, 11])
+        self.assertEqual(len(self.index.query(Point(0.5, 0.5))), 0)
+        # Half a degree of latitude is about 55 km from either way
+        self.assertEqual(list(self.index.query(Point(0.5, 0.5), distance=60000)['osmid']), [10, 11])
+        self.assertEqual(len(self.index.query(Point(0.5, 0.5), distance=50000)), 0)
+
+    def test_nearest(self):
+        self.assertEqual(list(self.index.nearest(Point(0.5, 0.8))['direct_trust_score']), [0.6])
+        self.assertEqual(list(self.index.nearest(Point(0.5, 0.2))['osmid']), [10])
+        self.assertEqual(len(self.index.nearest(Point(3, 3), max_distance=100000)), 0)
+        self.assertEqual(list(self.index.nearest(Point(5.5, 5.5005), max_distance=100)['osmid']), [12])
+
+    def test_save_and_load(self):
+        path = os.path.join(self.directory, 'elements.parquet')
+        self.index.save(path)
+
+        loaded = ElementScoreIndex.load(path)
+
+        self.assertEqual(len(loaded), 3)
+        self.assertEqual(list(loaded.query((4, 4, 7, 7))['osmid']), [12])
+        unpickled = pickle.loads(pickle.dumps(loaded))
+        self.assertEqual(list(unpickled.nearest(Point(0, 0.1))['osmid']), [10])
+
+
+if __name__ == '__main__':
+    unittest.main()
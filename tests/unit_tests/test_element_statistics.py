@@ -0,0 +1,70 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from datetime import datetime
+from unittest.mock import MagicMock
+from src.osw_confidence_metric.element_statistics import ElementStatisticsStore, compute_element_statistics, \
+    statistics_as_of
+from src.osw_confidence_metric.trust_score_calculator import TrustScoreAnalyzer
+from src.osw_confidence_metric.utils import aggregate_feature_statistics
+
+HISTORY = {
+    1: {'user': 'user1', 'timestamp': datetime(2020, 1, 1), 'tag': {'highway': 'footway'}, 'nd': [1, 2]},
+    2: {'user': 'user2', 'timestamp': datetime(2023, 1, 1), 'tag': {'highway': 'footway'}, 'nd': [1, 2],
+        'visible': True},
+}
+
+
+class TestElementStatistics(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = ElementStatisticsStore(path=os.path.join(self.directory, 'statistics.sqlite'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_matches_edge_statistics(self):
+        date = datetime(2024, 1, 16)
+        analyzer = TrustScoreAnalyzer(lambda x: True, MagicMock(), date)
+
+        statistics = self.store.statistics(element_type='way', osmid=10, historical_info=HISTORY, date=date)
+
+        self.assertEqual(statistics, analyzer._calculate_statistics_for_edge(historical_info=HISTORY))
+        self.assertIsNone(self.store.statistics(element_type='way', osmid=11, historical_info={}, date=date))
+
+    def test_rows_are_shared_across_dates_and_instances(self):
+        self.store.put_statistics({('way', 10, 2): compute_element_statistics(historical_info=HISTORY)})
+
+        reader = pickle.loads(pickle.dumps(self.store))
+        stored = reader.get_statistics([('way', 10, 2), ('way', 10, 1)])
+
+        self.assertEqual(list(stored), [('way', 10, 2)])
+        self.assertEqual((reader.hits, reader.misses), (1, 1))
+        self.assertEqual(statistics_as_of(stored[('way', 10, 2)], datetime(2023, 1, 11))['days_since_last_edit'], 10)
+        self.assertEqual(statistics_as_of(stored[('way', 10, 2)], datetime(2023, 1, 21))['days_since_last_edit'], 20)
+
+    def test_aggregate_joins_stored_features_without_history(self):
+        self.store.put_statistics({('node', 1, 2): compute_element_statistics(historical_info=HISTORY)})
+        gdf = pd.DataFrame({
+            'element_type': ['node', 'node'], 'osmid': [1, 2], 'version': [2, 1],
+            'timestamp': pd.to_datetime(['2023-01-01', '2020-01-01']),
+        })
+        osm_data_handler = MagicMock()
+        osm_data_handler.get_item_history.return_value = {1: HISTORY[1]}
+        date = datetime(2023, 1, 31)
+
+        result = aggregate_feature_statistics(gdf=gdf, date=date, osm_data_handler=osm_data_handler,
+                                              statistics_store=self.store)
+
+        self.assertEqual(result, aggregate_feature_statistics(gdf=gdf, date=date, osm_data_handler=MagicMock(
+            get_item_history=lambda item: HISTORY if item['osmid'] == 1 else {1: HISTORY[1]})))
+        osm_data_handler.get_item_history.assert_called_once()
+        self.assertIsNotNone(self.store.get_statistics([('node', 2, 1)]).get(('node', 2, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
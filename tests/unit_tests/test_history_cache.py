@@ -0,0 +1,58 @@
+import pickle
+import unittest
+from unittest.mock import MagicMock
+from src.osw_confidence_metric.history_cache import MemoryHistoryCache
+
+
+class TestMemoryHistoryCache(unittest.TestCase):
+
+    def test_put_and_get(self):
+        cache = MemoryHistoryCache()
+        cache.put_history('way', 1, {1: {'user': 'user1'}})
+
+        self.assertEqual(cache.get_history('way', 1), {1: {'user': 'user1'}})
+        self.assertIsNone(cache.get_history('way', 2))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = MemoryHistoryCache(max_items=2)
+        cache.put_history('way', 1, 'one')
+        cache.put_history('way', 2, 'two')
+        cache.get_history('way', 1)
+        cache.put_history('way', 3, 'three')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get_history('way', 2))
+        self.assertEqual(cache.get_history('way', 1), 'one')
+
+    def test_reads_through_to_backing_store(self):
+        backing_store = MagicMock()
+        backing_store.get_history.return_value = 'stored'
+        cache = MemoryHistoryCache(backing_store=backing_store)
+
+        self.assertEqual(cache.get_history('node', 5), 'stored')
+        self.assertEqual(cache.get_history('node', 5), 'stored')
+        backing_store.get_history.assert_called_once_with('node', 5)
+
+    def test_writes_through_to_backing_store(self):
+        backing_store = MagicMock()
+        cache = MemoryHistoryCache(backing_store=backing_store)
+
+        cache.put_history('relation', 7, 'history')
+
+        backing_store.put_history.assert_called_once_with('relation', 7, 'history')
+
+    def test_pickle_keeps_configuration_only(self):
+        cache = MemoryHistoryCache(max_items=5)
+        cache.put_history('way', 1, 'one')
+
+        restored = pickle.loads(pickle.dumps(cache))
+
+        self.assertEqual(restored.max_items, 5)
+        self.assertEqual(len(restored), 0)
+        restored.put_history('way', 2, 'two')
+        self.assertEqual(restored.get_history('way', 2), 'two')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import pandas as pd
+from unittest.mock import MagicMock
+from src.osw_confidence_metric.history_planner import HistoryRequestPlanner
+
+
+class TestHistoryRequestPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.osm_data_handler = MagicMock()
+        self.osm_data_handler.get_item_history.side_effect = \
+            lambda item: {1: {'user': 'user1', 'id': item['osmid']}}
+        self.planner = HistoryRequestPlanner(osm_data_handler=self.osm_data_handler)
+
+    def test_keys_union_across_categories(self):
+        self.planner.add(category='sidewalk', element_type='way', osmids=[1, 2, 2])
+        self.planner.add_feature_ids(category='bldg', feature_ids=pd.DataFrame(
+            {'element_type': ['way', 'node'], 'osmid': [2, 3]}
+        ))
+        self.planner.add_feature_ids(category='poi', feature_ids=pd.DataFrame(
+            {'element_type': ['way'], 'osmid': [2]}
+        ))
+
+        self.assertEqual(self.planner.keys(), [('way', 1), ('way', 2), ('node', 3)])
+
+    def test_fetch_requests_each_element_once(self):
+        self.planner.add(category='sidewalk', element_type='way', osmids=[1, 2])
+        self.planner.add(category='bldg', element_type='way', osmids=[2])
+        self.planner.add(category='poi', element_type='way', osmids=[2])
+
+        histories = self.planner.fetch()
+
+        self.assertEqual(self.osm_data_handler.get_item_history.call_count, 2)
+        self.assertEqual(set(histories), {('way', 1), ('way', 2)})
+        self.assertEqual(histories[('way', 2)][1]['id'], 2)
+
+    def test_fetch_skips_known_histories(self):
+        self.planner.add(category='road', element_type='way', osmids=[1, 2])
+        known = {('way', 1): {1: {'user': 'cached'}}}
+
+        histories = self.planner.fetch(histories=known)
+
+        self.osm_data_handler.get_item_history.assert_called_once_with(item={'element_type': 'way', 'osmid': 2})
+        self.assertEqual(histories[('way', 1)], {1: {'user': 'cached'}})
+
+    def test_fetch_empty_plan(self):
+        self.assertEqual(self.planner.fetch(), {})
+        self.osm_data_handler.get_item_history.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from src.osw_confidence_metric.history_store import ArrowHistoryStore
+from src.osw_confidence_metric.osm_data_handler import OSMDataHandler
+
+WAY_HISTORY = {
+    1: {'id': 10, 'visible': True, 'version': 1, 'changeset': 100, 'timestamp': datetime(2020, 1, 1),
+        'user': 'user1', 'uid': 1, 'tag': {'highway': 'footway'}, 'nd': [1, 2]},
+    2: {'id': 10, 'visible': False, 'version': 2, 'changeset': 101, 'timestamp': datetime(2021, 1, 1),
+        'user': 'user2', 'uid': 2, 'tag': {}, 'nd': []},
+}
+NODE_HISTORY = {
+    1: {'id': 2000001, 'visible': True, 'version': 1, 'changeset': 5, 'timestamp': datetime(2019, 5, 1),
+        'user': 'user3', 'uid': 3, 'tag': {'amenity': 'cafe'}, 'lat': 47.6, 'lon': -122.3},
+}
+
+
+def _put_in_worker(store):
+    store.put_history('way', 10, WAY_HISTORY)
+    return os.getpid()
+
+
+class TestArrowHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_round_trip_through_partitioned_files(self):
+        store = ArrowHistoryStore(path=self.path, id_range=1000000)
+        store.put_history('way', 10, WAY_HISTORY)
+        store.put_history('node', 2000001, NODE_HISTORY)
+        self.assertEqual(store.get_history('way', 10), WAY_HISTORY)
+        store.flush()
+
+        self.assertTrue(os.listdir(os.path.join(self.path, 'way', '0')))
+        self.assertTrue(os.listdir(os.path.join(self.path, 'node', '2')))
+        reader = ArrowHistoryStore(path=self.path, id_range=1000000)
+        self.assertEqual(reader.get_history('way', 10), WAY_HISTORY)
+        self.assertEqual(reader.get_history('node', 2000001), NODE_HISTORY)
+        self.assertIsNone(reader.get_history('way', 12))
+
+    def test_reader_sees_appends_of_other_stores(self):
+        reader = ArrowHistoryStore(path=self.path)
+        self.assertIsNone(reader.get_history('way', 10))
+
+        writer = ArrowHistoryStore(path=self.path, flush_size=1)
+        writer.put_history('way', 10, {1: WAY_HISTORY[1]})
+        self.assertEqual(reader.get_history('way', 10), {1: WAY_HISTORY[1]})
+
+        writer.put_history('way', 10, WAY_HISTORY)
+        self.assertEqual(ArrowHistoryStore(path=self.path).get_history('way', 10), WAY_HISTORY)
+
+    def test_worker_processes_write_on_exit(self):
+        store = ArrowHistoryStore(path=self.path)
+        self.assertEqual(pickle.loads(pickle.dumps(store)).path, self.path)
+
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            worker_pid = executor.submit(_put_in_worker, store).result()
+
+        self.assertNotEqual(worker_pid, os.getpid())
+        self.assertEqual(store.get_history('way', 10), WAY_HISTORY)
+
+    def test_used_as_handler_history_store(self):
+        osm_data_handler = OSMDataHandler(history_store=ArrowHistoryStore(path=self.path))
+        osm_data_handler.history_store.put_history('way', 10, WAY_HISTORY)
+        osm_data_handler.history_store.flush()
+
+        self.assertEqual(OSMDataHandler(history_store=ArrowHistoryStore(path=self.path)).get_way_history(10),
+                         WAY_HISTORY)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+from src.osw_confidence_metric.history_timeline import ElementTimeline, build_timelines, histories_as_of
+from src.osw_confidence_metric.utils import _lookup_history
+
+HISTORY = {
+    1: {'user': 'user1', 'timestamp': datetime(2020, 1, 1)},
+    3: {'user': 'user3', 'timestamp': datetime(2023, 1, 1)},
+    2: {'user': 'user2', 'timestamp': datetime(2022, 1, 1)},
+}
+
+
+class TestElementTimeline(unittest.TestCase):
+
+    def test_as_of_cuts_off_by_timestamp(self):
+        timeline = ElementTimeline(HISTORY)
+
+        self.assertEqual(timeline.versions, [1, 2, 3])
+        self.assertEqual(timeline.as_of(datetime(2019, 1, 1)), {})
+        self.assertEqual(set(timeline.as_of(datetime(2022, 6, 1))), {1, 2})
+        self.assertEqual(set(timeline.as_of(datetime(2023, 1, 1))), {1, 2, 3})
+
+    def test_as_of_shares_cutoffs_with_the_same_versions(self):
+        timeline = ElementTimeline(HISTORY)
+
+        self.assertIs(timeline.as_of(datetime(2022, 2, 1)), timeline.as_of(datetime(2022, 12, 1)))
+        self.assertEqual(timeline.count_as_of(datetime(2022, 12, 1)), 2)
+
+    def test_build_timelines_keeps_missing_histories(self):
+        timelines = build_timelines({('way', 1): HISTORY, ('node', 2): None})
+
+        self.assertEqual(len(timelines[('way', 1)]), 3)
+        self.assertIsNone(timelines[('node', 2)])
+        histories = histories_as_of(timelines, datetime(2020, 6, 1))
+        self.assertEqual(histories, {('way', 1): {1: HISTORY[1]}, ('node', 2): None})
+
+        # The missing history is known to be missing, so it is not fetched again
+        osm_data_handler = MagicMock()
+        item = {'element_type': 'node', 'osmid': 2}
+        self.assertIsNone(_lookup_history(item=item, osm_data_handler=osm_data_handler, histories=histories))
+        osm_data_handler.get_item_history.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
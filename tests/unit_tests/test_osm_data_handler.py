@@ -1,5 +1,10 @@
+import time
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from unittest.mock import patch, MagicMock
+from osmapi.errors import ApiError
 from src.osw_confidence_metric.osm_data_handler import OSMDataHandler
 
 
@@ -29,6 +34,35 @@ class TestOSMDataHandler(unittest.TestCase):
         self.mock_osm_api.WayHistory.assert_called_once_with(osmid)
         self.assertEqual(result, 'Mocked Way History')
 
+    def test_concurrent_history_requests_coalesced(self):
+        handler = OSMDataHandler()
+        release = threading.Event()
+        self.mock_osm_api.WayHistory.side_effect = lambda osmid: release.wait(timeout=5) and {1: {'id': osmid}}
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(handler.get_item_history, {'element_type': 'way', 'osmid': 12345})
+                       for _ in range(3)]
+            time.sleep(0.1)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, [{1: {'id': 12345}}] * 3)
+        self.mock_osm_api.WayHistory.assert_called_once_with(12345)
+        self.assertEqual(handler.single_flight.stats(), {'calls': 1, 'coalesced': 2})
+
+    def test_history_store_hits_skip_single_flight(self):
+        history_store = MagicMock()
+        history_store.get_history.side_effect = lambda element_type, osmid: {1: {'id': osmid}} if osmid == 1 else None
+        handler = OSMDataHandler(history_store=history_store)
+
+        self.assertEqual(handler.get_way_history(1), {1: {'id': 1}})
+        self.assertEqual(handler.single_flight.stats(), {'calls': 0, 'coalesced': 0})
+        self.mock_osm_api.WayHistory.assert_not_called()
+
+        self.assertEqual(handler.get_way_history(2), 'Mocked Way History')
+        self.assertEqual(handler.single_flight.stats(), {'calls': 1, 'coalesced': 0})
+        history_store.put_history.assert_called_once_with('way', 2, 'Mocked Way History')
+
     def test_get_way_history(self):
         osmid = 12345
         handler = OSMDataHandler()
@@ -43,6 +77,26 @@ class TestOSMDataHandler(unittest.TestCase):
         self.mock_osm_api.Map.assert_called_once()
         self.assertEqual(result, 'Mocked Map Data')
 
+    def test_get_snapshot_histories(self):
+        timestamp = datetime(2020, 1, 1)
+        self.mock_osm_api.Map.return_value = [
+            {'type': 'node', 'data': {'id': 1, 'version': 1, 'timestamp': timestamp}},
+            {'type': 'node', 'data': {'id': 2, 'version': 3, 'timestamp': timestamp}},
+            {'type': 'way', 'data': {'id': 3, 'version': 1, 'timestamp': timestamp, 'nd': [1, 2]}},
+        ]
+        handler = OSMDataHandler()
+        result = handler.get_snapshot_histories(bounding_params=(0, 1, 2, 3))
+        self.mock_osm_api.Map.assert_called_once_with(min_lon=0, min_lat=1, max_lon=2, max_lat=3)
+        self.assertEqual(result, {
+            ('node', 1): {1: {'id': 1, 'version': 1, 'timestamp': timestamp}},
+            ('way', 3): {1: {'id': 3, 'version': 1, 'timestamp': timestamp, 'nd': [1, 2]}},
+        })
+
+    def test_get_snapshot_histories_rejected_box(self):
+        self.mock_osm_api.Map.side_effect = ApiError(400, 'Bad Request', 'too many nodes')
+        handler = OSMDataHandler()
+        self.assertEqual(handler.get_snapshot_histories(bounding_params=(0, 1, 2, 3)), {})
+
     def test_get_item_history_node(self):
         osmid = 12345
         item = {'element_type': 'node', 'osmid': osmid}
@@ -74,6 +128,24 @@ class TestOSMDataHandler(unittest.TestCase):
         result = handler.get_item_history(item=item)
         self.assertIsNone(result)
 
+    def test_get_item_history_from_history_store(self):
+        history_store = MagicMock()
+        history_store.get_history.return_value = 'Stored Node History'
+        handler = OSMDataHandler(history_store=history_store)
+        result = handler.get_item_history(item={'element_type': 'node', 'osmid': 12345})
+        history_store.get_history.assert_called_once_with('node', 12345)
+        self.mock_osm_api.NodeHistory.assert_not_called()
+        self.assertEqual(result, 'Stored Node History')
+
+    def test_get_way_history_saved_to_history_store(self):
+        history_store = MagicMock()
+        history_store.get_history.return_value = None
+        handler = OSMDataHandler(history_store=history_store)
+        result = handler.get_way_history(12345)
+        self.mock_osm_api.WayHistory.assert_called_once_with(12345)
+        history_store.put_history.assert_called_once_with('way', 12345, 'Mocked Way History')
+        self.assertEqual(result, 'Mocked Way History')
+
     def test_get_item_history_invalid_item(self):
         item = {}
         handler = OSMDataHandler()
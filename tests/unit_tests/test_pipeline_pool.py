@@ -0,0 +1,93 @@
+import time
+import threading
+import unittest
+from datetime import datetime
+from shapely.geometry import Polygon
+from src.osw_confidence_metric.pipeline_pool import PipelinedTilePool
+
+
+def _square(x):
+    return Polygon([(x, 0), (x + 1, 0), (x + 1, 1), (x, 1)])
+
+
+class FakeTrustScore:
+    """
+    Stages that sleep like network calls and record how many tiles are between discovery and scoring. The pool
+    runs on a copy of the analyzer, so the records are kept in objects the copies share.
+    """
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.scheduler = 'multiprocessing'
+        self.lock = threading.Lock()
+        self.counts = {'in_flight': 0, 'max_in_flight': 0}
+        self.scoring_threads = set()
+        self.schedulers = set()
+
+    def discover_tile_features(self, polygon, road_ids=None):
+        time.sleep(0.01)
+        if polygon.bounds[0] == self.fail_on:
+            raise RuntimeError('Overpass failed')
+        with self.lock:
+            self.counts['in_flight'] += 1
+            self.counts['max_in_flight'] = max(self.counts['max_in_flight'], self.counts['in_flight'])
+        return None if polygon.bounds[0] == 0 else polygon.bounds[0]
+
+    def fetch_tile_histories(self, polygon, discovered):
+        time.sleep(0.01)
+        return discovered
+
+    def score_tile_data(self, tile_data):
+        time.sleep(0.02)
+        self.scoring_threads.add(threading.get_ident())
+        self.schedulers.add(self.scheduler)
+        with self.lock:
+            self.counts['in_flight'] -= 1
+        return {'direct_trust_score': tile_data}
+
+    def score_tile_data_series(self, tile_data, dates):
+        return {date: self.score_tile_data(tile_data=tile_data) for date in dates}
+
+
+class TestPipelinedTilePool(unittest.TestCase):
+
+    def test_scores_every_tile_with_bounded_queues(self):
+        trust_score = FakeTrustScore()
+        tiles = [(tile_id, _square(tile_id)) for tile_id in range(20)]
+
+        with PipelinedTilePool(trust_score=trust_score, discovery_workers=3, fetch_workers=2,
+                               queue_size=2) as pool:
+            results = dict(pool.score_tiles(tiles=tiles))
+
+        self.assertEqual(results, {tile_id: {'direct_trust_score': tile_id or None} for tile_id in range(20)})
+        self.assertEqual(trust_score.scoring_threads, {threading.get_ident()})
+        # The calling thread scores the edges of a tile itself instead of forking a process pool per tile
+        self.assertEqual(trust_score.schedulers, {'synchronous'})
+        self.assertEqual(trust_score.scheduler, 'multiprocessing')
+        # Two queues of two tiles, plus the tile held by every stage thread and the one being scored
+        self.assertGreater(trust_score.counts['max_in_flight'], 0)
+        self.assertLessEqual(trust_score.counts['max_in_flight'], 2 + 2 + 3 + 2 + 1)
+
+    def test_scores_series(self):
+        dates = [datetime(2022, 1, 1), datetime(2023, 1, 1)]
+        pool = PipelinedTilePool(trust_score=FakeTrustScore())
+
+        results = dict(pool.score_tiles(tiles=[(5, _square(5))], dates=dates))
+
+        self.assertEqual(results, {5: {date: {'direct_trust_score': 5} for date in dates}})
+
+    def test_stage_error_is_raised_and_stops_the_stages(self):
+        pool = PipelinedTilePool(trust_score=FakeTrustScore(fail_on=3), queue_size=1)
+        threads_before = threading.active_count()
+
+        with self.assertRaises(RuntimeError):
+            list(pool.score_tiles(tiles=[(tile_id, _square(tile_id)) for tile_id in range(1, 10)]))
+
+        self.assertEqual(threading.active_count(), threads_before)
+
+    def test_no_tiles(self):
+        self.assertEqual(list(PipelinedTilePool(trust_score=FakeTrustScore()).score_tiles(tiles=[])), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import math
+import unittest
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import Point
+from src.osw_confidence_metric.progressive import AreaEstimate, estimate_area_mean, stratified_order
+
+
+class TestStratifiedOrder(unittest.TestCase):
+
+    def test_order_is_a_seeded_permutation(self):
+        geometry = gpd.GeoSeries([Point(i % 10, i // 10) for i in range(100)] + [None], index=range(5, 106))
+
+        order = stratified_order(geometry=geometry, seed=3)
+
+        self.assertEqual(sorted(order), list(range(5, 106)))
+        self.assertEqual(order, stratified_order(geometry=geometry, seed=3))
+        self.assertNotEqual(order, stratified_order(geometry=geometry, seed=4))
+        self.assertEqual(stratified_order(geometry=gpd.GeoSeries([], dtype='geometry')), [])
+
+    def test_prefixes_cover_the_area(self):
+        # Two halves of the area, one four times as dense as the other
+        geometry = gpd.GeoSeries([Point(i % 40 / 40, i // 40 / 40) for i in range(1600)] +
+                                 [Point(1 + i % 20 / 20, i // 20 / 20) for i in range(400)])
+
+        order = stratified_order(geometry=geometry, seed=0)
+
+        for prefix in (20, 100, 500):
+            east = sum(1 for tile_id in order[:prefix] if tile_id >= 1600)
+            self.assertAlmostEqual(east / prefix, 0.2, delta=0.05)
+
+
+class TestEstimateAreaMean(unittest.TestCase):
+
+    def test_interval(self):
+        scores = pd.Series([0.2, 0.4, 0.6, 0.8])
+
+        mean, lower, upper, half_width = estimate_area_mean(scores=scores, tiles=1000)
+        self.assertAlmostEqual(mean, 0.5)
+        self.assertAlmostEqual(upper - mean, 1.959964 * scores.std() / 2 * math.sqrt(1 - 4 / 1000), places=5)
+        self.assertAlmostEqual(mean - lower, upper - mean)
+        self.assertAlmostEqual(half_width, upper - mean)
+
+        # The interval narrows as the sample covers more of the area, down to the mean itself
+        self.assertLess(estimate_area_mean(scores=scores, tiles=5)[2], upper)
+        self.assertEqual(estimate_area_mean(scores=scores, tiles=4), (0.5, 0.5, 0.5, 0.0))
+
+    def test_small_samples(self):
+        self.assertEqual(estimate_area_mean(scores=pd.Series([0.3]), tiles=10), (0.3, 0.0, 1.0, math.inf))
+        mean, lower, upper, half_width = estimate_area_mean(scores=pd.Series([], dtype=float), tiles=10)
+        self.assertTrue(math.isnan(mean))
+        self.assertEqual((lower, upper, half_width), (0.0, 1.0, math.inf))
+
+        # Clipping the lower bound at 0 narrows the bounds, not the half-width
+        mean, lower, upper, half_width = estimate_area_mean(scores=pd.Series([0.0, 0.0, 1.0]), tiles=1000)
+        self.assertEqual(lower, 0.0)
+        self.assertGreater(half_width, (upper - lower) / 2)
+
+
+class TestAreaEstimate(unittest.TestCase):
+
+    def test_properties(self):
+        estimate = AreaEstimate(mean=0.5, lower=0.4, upper=0.6, scored=10, tiles=40, seconds=1.5)
+
+        self.assertFalse(estimate.complete)
+        self.assertAlmostEqual(estimate.half_width, 0.1)
+        self.assertEqual(estimate.to_dict()['scored'], 10)
+        self.assertTrue(AreaEstimate(mean=0.5, lower=0.5, upper=0.5, scored=40, tiles=40, seconds=2).complete)
+        clipped = AreaEstimate(mean=0.05, lower=0.0, upper=0.15, scored=10, tiles=40, seconds=1.5, half_width=0.1)
+        self.assertAlmostEqual(clipped.half_width, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
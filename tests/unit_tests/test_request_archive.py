@@ -0,0 +1,115 @@
+import shutil
+import pickle
+import threading
+import tempfile
+import unittest
+import osmnx as ox
+from unittest.mock import patch, MagicMock
+from osmapi import OsmApi
+from osmapi.errors import ElementDeletedApiError
+from src.osw_confidence_metric.osm_data_handler import OSMDataHandler
+from src.osw_confidence_metric.request_archive import RequestArchive, ArchiveMissError, get_request_key
+
+
+class TestRequestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_request_key_normalizes_arguments(self):
+        import numpy as np
+        self.assertEqual(get_request_key('osm_api', 'WayHistory', args=(np.int64(5),)),
+                         get_request_key('osm_api', 'WayHistory', args=[5]))
+        self.assertNotEqual(get_request_key('osm_api', 'WayHistory', args=(5,)),
+                            get_request_key('osm_api', 'NodeHistory', args=(5,)))
+
+    def test_record_then_replay(self):
+        fetch = MagicMock(return_value={1: {'id': 5}})
+        recorder = RequestArchive(self.directory, mode='record')
+        self.assertEqual(recorder.call('osm_api', 'WayHistory', fetch=fetch, args=(5,)), {1: {'id': 5}})
+
+        replayer = pickle.loads(pickle.dumps(RequestArchive(self.directory, mode='replay')))
+        offline = MagicMock(side_effect=AssertionError('network'))
+        self.assertEqual(replayer.call('osm_api', 'WayHistory', fetch=offline, args=(5,)), {1: {'id': 5}})
+        offline.assert_not_called()
+        fetch.assert_called_once()
+
+        with self.assertRaises(ArchiveMissError):
+            replayer.call('osm_api', 'WayHistory', fetch=offline, args=(6,))
+
+    def test_errors_are_recorded(self):
+        recorder = RequestArchive(self.directory, mode='record')
+        fetch = MagicMock(side_effect=ElementDeletedApiError(410, 'Gone', ''))
+        with self.assertRaises(ElementDeletedApiError):
+            recorder.call('osm_api', 'NodeHistory', fetch=fetch, args=(1,))
+
+        with self.assertRaises(ElementDeletedApiError):
+            RequestArchive(self.directory).call('osm_api', 'NodeHistory', fetch=fetch, args=(1,))
+        fetch.assert_called_once()
+
+    @patch('src.osw_confidence_metric.request_archive.time.sleep')
+    def test_replay_latency(self, mock_sleep):
+        with patch('src.osw_confidence_metric.request_archive.time.perf_counter', side_effect=[10.0, 10.25]):
+            RequestArchive(self.directory, mode='record').call('overpass', 'interpreter', fetch=lambda: {})
+
+        RequestArchive(self.directory).call('overpass', 'interpreter', fetch=None)
+        mock_sleep.assert_not_called()
+        RequestArchive(self.directory, latency='recorded').call('overpass', 'interpreter', fetch=None)
+        mock_sleep.assert_called_once_with(0.25)
+        RequestArchive(self.directory, latency=0.5).call('overpass', 'interpreter', fetch=None)
+        mock_sleep.assert_called_with(0.5)
+
+    def test_overpass_requests_of_osmnx(self):
+        response = {'elements': [{'type': 'way', 'id': 7}]}
+        with patch('osmnx._overpass._overpass_request', return_value=response) as mock_request:
+            with RequestArchive(self.directory, mode='record').overpass():
+                self.assertEqual(ox._overpass._overpass_request(data={'data': 'way(1);out;'}), response)
+            self.assertIs(ox._overpass._overpass_request, mock_request)
+
+            with RequestArchive(self.directory).overpass():
+                self.assertEqual(ox._overpass._overpass_request(data={'data': 'way(1);out;'}), response)
+            mock_request.assert_called_once()
+            self.assertIs(ox._overpass._overpass_request, mock_request)
+
+    def test_overpass_routed_only_inside_block(self):
+        replayer = RequestArchive(self.directory)
+        with patch('osmnx._overpass._overpass_request', return_value={'elements': []}) as mock_request:
+            with replayer.overpass():
+                # Requests of another thread, outside any block, still go to the network
+                thread = threading.Thread(target=ox._overpass._overpass_request, kwargs={'data': {'data': 'a'}})
+                thread.start()
+                thread.join()
+                mock_request.assert_called_once()
+
+                with self.assertRaises(ArchiveMissError):
+                    ox._overpass._overpass_request(data={'data': 'a'})
+            self.assertEqual(ox._overpass._overpass_request(data={'data': 'a'}), {'elements': []})
+
+    def test_osm_data_handler_overpass(self):
+        response = {'elements': []}
+        with patch('osmnx._overpass._overpass_request', return_value=response) as mock_request:
+            with OSMDataHandler().overpass():
+                self.assertIs(ox._overpass._overpass_request, mock_request)
+            # Creating or unpickling a handler with an archive no longer replaces the osmnx function
+            handler = pickle.loads(pickle.dumps(OSMDataHandler(archive=RequestArchive(self.directory))))
+            self.assertIs(ox._overpass._overpass_request, mock_request)
+
+            with handler.overpass():
+                with self.assertRaises(ArchiveMissError):
+                    ox._overpass._overpass_request(data={'data': 'a'})
+            mock_request.assert_not_called()
+
+    def test_osm_data_handler_record_and_replay(self):
+        with patch.object(OsmApi, 'WayHistory', return_value={1: {'id': 5}}) as mock_way_history:
+            recorder = OSMDataHandler(archive=RequestArchive(self.directory, mode='record'))
+            self.assertEqual(recorder.get_way_history(5), {1: {'id': 5}})
+
+        handler = pickle.loads(pickle.dumps(OSMDataHandler(archive=RequestArchive(self.directory))))
+        with patch.object(OsmApi, 'WayHistory', side_effect=AssertionError('network')):
+            self.assertEqual(handler.get_way_history(5), {1: {'id': 5}})
+        mock_way_history.assert_called_once_with(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import math
+import shutil
+import tempfile
+import unittest
+import geopandas as gpd
+from datetime import datetime
+from shapely.geometry import Polygon
+from src.osw_confidence_metric.result_cache import ResultCache, get_result_key
+
+SQUARE = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+TRIANGLE = Polygon([(2, 0), (3, 0), (3, 1)])
+DATE = datetime(2024, 1, 16)
+SIDEWALK_FILTER = '["highway"~"footway"]'
+
+
+class TestResultKey(unittest.TestCase):
+
+    def test_key_ignores_feature_and_vertex_order(self):
+        key = get_result_key(gpd.GeoSeries([SQUARE, TRIANGLE], crs='epsg:4326'), DATE, SIDEWALK_FILTER, 's1')
+        rotated_square = Polygon([(1, 1), (0, 1), (0, 0), (1, 0)])
+
+        self.assertEqual(
+            get_result_key(gpd.GeoSeries([TRIANGLE, rotated_square], crs='epsg:4326'), DATE, SIDEWALK_FILTER, 's1'),
+            key
+        )
+        self.assertEqual(
+            get_result_key(gpd.GeoSeries([SQUARE, TRIANGLE], crs='epsg:4326').to_crs('epsg:3857'), DATE,
+                           SIDEWALK_FILTER, 's1'),
+            key
+        )
+
+    def test_key_changes_with_inputs(self):
+        geometries = gpd.GeoSeries([SQUARE])
+        key = get_result_key(geometries, DATE, SIDEWALK_FILTER, 's1')
+
+        self.assertNotEqual(get_result_key(gpd.GeoSeries([TRIANGLE]), DATE, SIDEWALK_FILTER, 's1'), key)
+        self.assertNotEqual(get_result_key(geometries, datetime(2024, 1, 17), SIDEWALK_FILTER, 's1'), key)
+        self.assertNotEqual(get_result_key(geometries, DATE, '["highway"]', 's1'), key)
+        self.assertNotEqual(get_result_key(geometries, DATE, SIDEWALK_FILTER, 's2'), key)
+        self.assertNotEqual(get_result_key(geometries, DATE, SIDEWALK_FILTER, 's1', settings={'tiling': 'none'}),
+                            key)
+
+    def test_key_counts_the_date_by_the_day(self):
+        geometries = gpd.GeoSeries([SQUARE])
+        settings = {'thresholds': {'poi_count': 1.5}, 'tiling': 'auto'}
+        key = get_result_key(geometries, datetime(2024, 1, 16, 9, 30, 12, 5), SIDEWALK_FILTER, 's1', settings)
+
+        self.assertEqual(
+            get_result_key(geometries, datetime(2024, 1, 16, 17, 1), SIDEWALK_FILTER, 's1', dict(settings)), key
+        )
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = ResultCache(os.path.join(self.directory, 'results.sqlite'))
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get('a'))
+
+        self.cache.put('a', 0.42, snapshot_id='s1')
+        self.cache.put('b', float('nan'))
+
+        self.assertEqual(self.cache.get('a'), 0.42)
+        self.assertTrue(math.isnan(self.cache.get('b')))
+
+    def test_invalidate(self):
+        self.cache.put('a', 0.1, snapshot_id='s1')
+        self.cache.put('b', 0.2, snapshot_id='s2')
+        self.cache.put('c', 0.3)
+
+        self.assertEqual(self.cache.invalidate(snapshot_id='s1'), 1)
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('b'), 0.2)
+
+        self.assertEqual(self.cache.invalidate(), 2)
+        self.assertIsNone(self.cache.get('c'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import math
+import shutil
+import tempfile
+import unittest
+from src.osw_confidence_metric.result_spill import TileResultSpill, SPILL_COLUMNS, _ROW_BYTES
+
+
+def make_measures(score):
+    return {'direct_trust_score': score, 'time_trust_score': 1, 'indirect_values': {'poi_count': score * 10}}
+
+
+class TestTileResultSpill(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_spills_parts_at_the_memory_budget(self):
+        with TileResultSpill(memory_budget=2 * _ROW_BYTES, directory=self.directory) as results:
+            for tile_id in range(5):
+                results.add(tile_id=tile_id, measures=make_measures(tile_id / 10))
+
+            self.assertEqual(len(results.parts), 2)
+            self.assertTrue(all(os.path.isfile(part) for part in results.parts))
+            frames = list(results.frames())
+            self.assertEqual([len(frame.index) for frame in frames], [2, 2, 1])
+            self.assertEqual(len(results), 5)
+            self.assertEqual(list(frames[0].columns), SPILL_COLUMNS[1:])
+            self.assertEqual(frames[1].at[3, 'poi_count'], 3)
+            self.assertTrue(math.isnan(frames[1].at[3, 'bldg_time']))
+            path = results.path
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_tile_without_measures(self):
+        with TileResultSpill(memory_budget=2 ** 20, directory=self.directory) as results:
+            results.add(tile_id=7, measures=None)
+            frame, = results.frames()
+
+        self.assertEqual(results.parts, [])
+        self.assertTrue(frame.loc[7].isna().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import math
+import unittest
+import pandas as pd
+import geopandas as gpd
+from shapely.geometry import box
+from src.osw_confidence_metric.rollup import roll_up_boundaries, roll_up_quadtree
+
+
+def make_tiles():
+    # A 4 x 4 grid of unit tiles scored by their column
+    tiles = gpd.GeoSeries([box(x, y, x + 1, y + 1) for y in range(4) for x in range(4)], crs='epsg:4326')
+    scores = pd.Series([float(x) for y in range(4) for x in range(4)], index=tiles.index)
+    return scores, tiles
+
+
+class TestRollUp(unittest.TestCase):
+
+    def test_roll_up_boundaries(self):
+        scores, tiles = make_tiles()
+        blocks = gpd.GeoDataFrame({'name': ['west', 'east', 'empty']},
+                                  geometry=[box(0, 0, 2, 4), box(2, 0, 4, 4), box(10, 10, 11, 11)], crs='epsg:4326')
+        city = gpd.GeoDataFrame({'name': ['city']}, geometry=[box(-1, -1, 5, 5)], crs='epsg:4326')
+
+        result = roll_up_boundaries(tile_scores=scores, tile_geometry=tiles, levels={'block': blocks, 'city': city})
+
+        self.assertEqual(list(result), ['block', 'city'])
+        self.assertEqual(list(result['block']['tiles']), [8, 8, 0])
+        self.assertEqual(list(result['block']['trust_score'][:2]), [0.5, 2.5])
+        self.assertTrue(math.isnan(result['block']['trust_score'].iloc[2]))
+        self.assertEqual(result['city'].at[0, 'tiles'], 16)
+        self.assertEqual(result['city'].at[0, 'trust_score'], scores.mean())
+
+    def test_roll_up_quadtree(self):
+        scores, tiles = make_tiles()
+
+        result = roll_up_quadtree(tile_scores=scores, tile_geometry=tiles, depth=2)
+
+        self.assertEqual(list(result), ['quadtree_2', 'quadtree_1', 'quadtree_0'])
+        self.assertEqual(len(result['quadtree_2']), 16)
+        level_1 = result['quadtree_1'].set_index(['x', 'y'])
+        self.assertEqual(level_1.loc[(0, 0), 'tiles'], 4)
+        self.assertEqual(level_1.loc[(1, 1), 'trust_score'], 2.5)
+        self.assertTrue(level_1.loc[(1, 0), 'geometry'].equals(box(2, 0, 4, 2)))
+        root = result['quadtree_0'].iloc[0]
+        self.assertEqual((root['tiles'], root['trust_score']), (16, scores.mean()))
+
+
+if __name__ == '__main__':
+    unittest.main()
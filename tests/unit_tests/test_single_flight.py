@@ -0,0 +1,138 @@
+import os
+import time
+import pickle
+import shutil
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.osw_confidence_metric.single_flight import FlightStore, SingleFlight
+
+
+class _BlockingFetch:
+    def __init__(self, response='history'):
+        self.response = response
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        return self.response
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_requests_share_one_call(self):
+        single_flight = SingleFlight()
+        fetch = _BlockingFetch()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(single_flight.do, ('way', 10), fetch)
+            fetch.started.wait(timeout=5)
+            waiters = [executor.submit(single_flight.do, ('way', 10), fetch) for _ in range(3)]
+            time.sleep(0.1)
+            fetch.release.set()
+            results = [leader.result()] + [waiter.result() for waiter in waiters]
+
+        self.assertEqual(results, ['history'] * 4)
+        self.assertEqual(fetch.count, 1)
+        self.assertEqual(single_flight.stats(), {'calls': 1, 'coalesced': 3})
+        # A later request is a new call
+        self.assertEqual(single_flight.do(('way', 10), lambda: 'newer'), 'newer')
+        self.assertEqual(single_flight.stats()['calls'], 2)
+
+    def test_error_raised_to_waiters_and_not_kept(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+
+        def failing_fetch():
+            started.set()
+            release.wait(timeout=5)
+            raise ValueError('unavailable')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(single_flight.do, 'key', failing_fetch)
+            started.wait(timeout=5)
+            waiter = executor.submit(single_flight.do, 'key', failing_fetch)
+            time.sleep(0.05)
+            release.set()
+            for future in (leader, waiter):
+                with self.assertRaises(ValueError):
+                    future.result()
+
+        self.assertEqual(single_flight.do('key', lambda: 'ok'), 'ok')
+
+    def test_pickles_without_calls_in_flight(self):
+        single_flight = SingleFlight()
+        single_flight.do('key', lambda: 1)
+
+        copy = pickle.loads(pickle.dumps(single_flight))
+
+        self.assertIsNone(copy.store)
+        self.assertEqual(copy.stats(), {'calls': 0, 'coalesced': 0})
+
+
+class TestFlightStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'flights.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_requests_of_other_processes_are_coalesced(self):
+        store = FlightStore(path=self.path)
+        # One SingleFlight per process, sharing the store
+        first, second = SingleFlight(store=store), SingleFlight(store=pickle.loads(pickle.dumps(store)))
+        fetch = _BlockingFetch(response={1: {'user': 'user1'}})
+        other_fetch = _BlockingFetch()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(first.do, ('way', 10), fetch)
+            fetch.started.wait(timeout=5)
+            waiter = executor.submit(second.do, ('way', 10), other_fetch)
+            time.sleep(0.1)
+            fetch.release.set()
+
+            self.assertEqual(leader.result(), {1: {'user': 'user1'}})
+            self.assertEqual(waiter.result(), {1: {'user': 'user1'}})
+
+        self.assertEqual(other_fetch.count, 0)
+        self.assertEqual(second.stats(), {'calls': 0, 'coalesced': 1})
+        self.assertEqual(store.stats(), {'calls': 1, 'coalesced': 1})
+
+    def test_claims(self):
+        store = FlightStore(path=self.path)
+
+        self.assertTrue(store.claim('way/10'))
+        self.assertFalse(store.claim('way/10'))
+        store.release('way/10')
+        self.assertTrue(store.claim('way/10'))
+        # A claim older than the lease was left by a crashed process
+        self.assertTrue(FlightStore(path=self.path, lease=0).claim('way/10'))
+
+    def test_responses_expire(self):
+        store = FlightStore(path=self.path, retention=0.1)
+        self.assertTrue(store.claim('way/10'))
+        store.publish('way/10', response='history')
+
+        self.assertEqual(store.response('way/10'), (True, 'history'))
+        time.sleep(0.2)
+        self.assertEqual(store.response('way/10'), (False, None))
+
+    def test_failed_request_is_made_again(self):
+        store = FlightStore(path=self.path)
+        single_flight = SingleFlight(store=store)
+
+        with self.assertRaises(ValueError):
+            single_flight.do('key', lambda: (_ for _ in ()).throw(ValueError('unavailable')))
+
+        self.assertEqual(SingleFlight(store=store).do('key', lambda: 'ok'), 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,20 @@
 import unittest
+from contextlib import nullcontext
 import networkx as nx
+import pandas as pd
 import geopandas as gpd
 from datetime import datetime
 from unittest.mock import patch, Mock, MagicMock
 from shapely.geometry import Polygon, LineString
+from src.osw_confidence_metric.element_index import ELEMENT_SEGMENT_COLUMNS, merge_element_scores
 from src.osw_confidence_metric.trust_score_calculator import TrustScoreAnalyzer, _prepare_dask_dataframe, \
     _calculate_comprehensive_trust_scores
 
 
 class MockOSMDataHandler:
+    def overpass(self):
+        return nullcontext()
+
     def get_way_history(self, osmid):
         return {
             'osmid': osmid,
@@ -54,6 +60,198 @@ class TestTrustScoreAnalyzer(unittest.TestCase):
         # Restore the original method
         self.trust_score_analyzer._analyze_sidewalk_features = original_graph_from_polygon
 
+    @patch('src.osw_confidence_metric.trust_score_calculator.calculate_indirect_trust_components')
+    @patch('src.osw_confidence_metric.trust_score_calculator.extract_indirect_feature_ids_from_polygon')
+    @patch('osmnx.graph.graph_from_polygon')
+    def test_get_measures_from_polygon_fetches_shared_histories_once(self, mock_graph_from_polygon,
+                                                                     mock_extract_feature_ids,
+                                                                     mock_indirect_components):
+        graph = nx.MultiDiGraph()
+        graph.add_node(1, x=0, y=0)
+        graph.add_node(2, x=1, y=1)
+        graph.add_edge(1, 2, osmid=10)
+        graph.add_edge(2, 1, osmid=10)
+        mock_graph_from_polygon.return_value = graph
+        feature_ids = {
+            'poi': pd.DataFrame({'element_type': ['way'], 'osmid': [10]}),
+            'bldg': pd.DataFrame({'element_type': ['way', 'node'], 'osmid': [10, 20]}),
+            'road': pd.DataFrame({'element_type': [], 'osmid': []}),
+        }
+        mock_extract_feature_ids.return_value = feature_ids
+        mock_indirect_components.return_value = {'poi_count': 1}
+        osm_data_handler = MagicMock()
+        osm_data_handler.get_item_history.side_effect = lambda item: {1: {'id': item['osmid']}}
+        analyzer = TrustScoreAnalyzer(lambda x: True, osm_data_handler, datetime(2024, 1, 16))
+
+        with patch.object(TrustScoreAnalyzer, '_score_sidewalk_edges', return_value=(0.5, 1)) as mock_sidewalk:
+            measures = analyzer.get_measures_from_polygon(Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]))
+
+        self.assertEqual(osm_data_handler.get_item_history.call_count, 2)
+        histories = mock_sidewalk.call_args.kwargs['histories']
+        self.assertEqual(set(histories), {('way', 10), ('node', 20)})
+        self.assertIs(mock_indirect_components.call_args.kwargs['histories'], histories)
+        self.assertEqual(measures['direct_trust_score'], 0.5)
+        self.assertEqual(measures['indirect_values'], {'poi_count': 1})
+
+    @patch('src.osw_confidence_metric.trust_score_calculator.calculate_indirect_trust_components')
+    @patch('src.osw_confidence_metric.trust_score_calculator.extract_indirect_feature_ids_from_polygon')
+    @patch('osmnx.graph.graph_from_polygon')
+    def test_get_measures_from_polygon_with_map_snapshot(self, mock_graph_from_polygon, mock_extract_feature_ids,
+                                                         mock_indirect_components):
+        graph = nx.MultiDiGraph()
+        graph.add_node(1, x=0, y=0)
+        graph.add_node(2, x=1, y=1)
+        graph.add_edge(1, 2, osmid=10)
+        mock_graph_from_polygon.return_value = graph
+        mock_extract_feature_ids.return_value = {
+            'bldg': pd.DataFrame({'element_type': ['way', 'node'], 'osmid': [30, 20]}),
+        }
+        mock_indirect_components.return_value = {}
+        osm_data_handler = MagicMock()
+        snapshot = {('way', 10): {1: {'id': 10, 'version': 1}}, ('node', 99): {1: {'id': 99, 'version': 1}}}
+        osm_data_handler.get_snapshot_histories.return_value = snapshot
+        osm_data_handler.get_item_history.side_effect = lambda item: {1: {'id': item['osmid']}, 2: {}}
+        analyzer = TrustScoreAnalyzer(lambda x: True, osm_data_handler, datetime(2024, 1, 16), map_snapshot=True)
+        polygon = Polygon([(0, 0), (1, 0), (1, 1), (0, 1)])
+
+        with patch.object(TrustScoreAnalyzer, '_score_sidewalk_edges', return_value=(0.5, 1)) as mock_sidewalk:
+            analyzer.get_measures_from_polygon(polygon)
+
+        osm_data_handler.get_snapshot_histories.assert_called_once_with(bounding_params=polygon.bounds)
+        fetched = [call.kwargs['item'] for call in osm_data_handler.get_item_history.call_args_list]
+        self.assertCountEqual(fetched, [{'element_type': 'way', 'osmid': 30}, {'element_type': 'node', 'osmid': 20}])
+        histories = mock_sidewalk.call_args.kwargs['histories']
+        self.assertEqual(set(histories), {('way', 10), ('way', 30), ('node', 20)})
+        self.assertIs(histories[('way', 10)], snapshot[('way', 10)])
+
+    @patch('src.osw_confidence_metric.trust_score_calculator.calculate_indirect_trust_components')
+    @patch('src.osw_confidence_metric.trust_score_calculator.extract_indirect_feature_ids_from_polygon')
+    @patch('src.osw_confidence_metric.trust_score_calculator.extract_sidewalk_ways_from_polygon')
+    @patch('osmnx.graph.graph_from_polygon')
+    def test_get_measures_from_polygon_from_sidewalk_ways(self, mock_graph_from_polygon, mock_extract_ways,
+                                                          mock_extract_feature_ids, mock_indirect_components):
+        mock_extract_ways.return_value = gpd.GeoDataFrame({
+            'osmid': [10, 11], 'u': [1, 3], 'v': [2, 4], 'way_tags': [{}, {}],
+            'geometry': [LineString([(0, 0), (1, 1)]), LineString([(1, 1), (2, 2)])]
+        })
+        mock_extract_feature_ids.return_value = {'poi': pd.DataFrame({'element_type': [], 'osmid': []})}
+        mock_indirect_components.return_value = {}
+        osm_data_handler = MagicMock()
+        osm_data_handler.get_item_history.side_effect = lambda item: {
+            1: {'user': 'user1', 'timestamp': datetime(2020, 1, 1), 'tag': {'highway': 'footway'}}
+        }
+        analyzer = TrustScoreAnalyzer('["highway"="footway"]', osm_data_handler, datetime(2024, 1, 16),
+                                      scheduler='synchronous', sidewalk_source='ways')
+
+        measures = analyzer.get_measures_from_polygon(Polygon([(0, 0), (2, 0), (2, 2), (0, 2)]))
+
+        mock_graph_from_polygon.assert_not_called()
+        mock_extract_ways.assert_called_once()
+        self.assertEqual(mock_extract_ways.call_args.kwargs['sidewalk_filter'], '["highway"="footway"]')
+        self.assertEqual(osm_data_handler.get_item_history.call_count, 2)
+        self.assertIsNotNone(measures['direct_trust_score'])
+
+        mock_extract_ways.return_value = mock_extract_ways.return_value.iloc[:0]
+        self.assertIsNone(analyzer.get_measures_from_polygon(Polygon([(0, 0), (2, 0), (2, 2)]))['direct_trust_score'])
+
+    @patch('src.osw_confidence_metric.trust_score_calculator.calculate_indirect_trust_components')
+    @patch('src.osw_confidence_metric.trust_score_calculator.extract_indirect_feature_ids_from_polygon')
+    @patch('src.osw_confidence_metric.trust_score_calculator.extract_sidewalk_ways_from_polygon')
+    def test_get_measures_from_polygon_with_element_scores(self, mock_extract_ways, mock_extract_feature_ids,
+                                                           mock_indirect_components):
+        mock_extract_ways.return_value = gpd.GeoDataFrame({
+            'osmid': [10, 10, 11], 'u': [1, 2, 3], 'v': [2, 3, 4], 'way_tags': [{}, {}, {}],
+            'geometry': [LineString([(0, 0), (1, 1)]), LineString([(1, 1), (2, 1)]), LineString([(2, 2), (3, 3)])]
+        })
+        mock_extract_feature_ids.return_value = {'poi': pd.DataFrame({'element_type': [], 'osmid': []})}
+        mock_indirect_components.return_value = {}
+        histories = {
+            10: {1: {'user': 'user1', 'timestamp': datetime(2020, 1, 1), 'tag': {'highway': 'footway'}}},
+            11: {1: {'user': 'user1', 'timestamp': datetime(2020, 1, 1), 'tag': {'highway': 'footway'}},
+                 2: {'user': 'user2', 'timestamp': datetime(2023, 1, 1), 'tag': {'highway': 'footway'}}},
+        }
+        osm_data_handler = MagicMock()
+        osm_data_handler.get_item_history.side_effect = lambda item: histories[item['osmid']]
+        analyzer = TrustScoreAnalyzer('["highway"="footway"]', osm_data_handler, datetime(2024, 1, 16),
+                                      scheduler='synchronous', sidewalk_source='ways', element_scores=True)
+
+        measures = analyzer.get_measures_from_polygon(Polygon([(0, 0), (3, 0), (3, 3), (0, 3)]))
+
+        # The tile keeps a row per segment, merged into ways once every tile is scored
+        segments = measures['element_scores']
+        self.assertEqual(list(segments.columns), ELEMENT_SEGMENT_COLUMNS)
+        self.assertEqual(list(segments['osmid']), [10, 10, 11])
+        self.assertAlmostEqual(measures['direct_trust_score'], segments['direct_trust_score'].mean())
+
+        element_scores = merge_element_scores(frames=[segments])
+        self.assertEqual(list(element_scores['osmid']), [10, 11])
+        self.assertEqual(element_scores.geometry.iloc[0].geom_type, 'LineString')
+        self.assertAlmostEqual(element_scores.geometry.iloc[0].length, 2 ** 0.5 + 1)
+
+        analyzer.element_scores = False
+        self.assertNotIn('element_scores', analyzer.get_measures_from_polygon(Polygon([(0, 0), (3, 0), (3, 3)])))
+
+    @patch('src.osw_confidence_metric.trust_score_calculator.calculate_indirect_trust_components')
+    @patch('src.osw_confidence_metric.trust_score_calculator.extract_indirect_feature_ids_from_polygon')
+    @patch('osmnx.graph.graph_from_polygon')
+    def test_get_measures_series_from_polygon(self, mock_graph_from_polygon, mock_extract_feature_ids,
+                                              mock_indirect_components):
+        graph = nx.MultiDiGraph()
+        graph.add_edge(1, 2, osmid=10, geometry=LineString([(0, 0), (1, 1)]))
+        mock_graph_from_polygon.return_value = graph
+        mock_extract_feature_ids.return_value = {
+            'poi': pd.DataFrame({'element_type': ['node', 'node'], 'osmid': [20, 21]}),
+            'bldg': pd.DataFrame({'element_type': [], 'osmid': []}),
+            'road': pd.DataFrame({'element_type': [], 'osmid': []}),
+        }
+        mock_indirect_components.side_effect = lambda feature_ids, **kwargs: {'poi_count': len(feature_ids['poi'])}
+        histories = {
+            ('way', 10): {1: {'user': 'user1', 'timestamp': datetime(2020, 1, 1), 'tag': {}}},
+            ('node', 20): {1: {'user': 'user2', 'timestamp': datetime(2022, 1, 1), 'tag': {}}},
+            # A history that could not be fetched leaves its feature out at every date
+            ('node', 21): None,
+        }
+        osm_data_handler = MagicMock()
+        osm_data_handler.get_item_history.side_effect = lambda item: histories[(item['element_type'],
+                                                                                item['osmid'])]
+        analyzer = TrustScoreAnalyzer(lambda x: True, osm_data_handler, datetime(2024, 1, 16))
+        dates = [datetime(2019, 1, 1), datetime(2021, 1, 1), datetime(2023, 1, 1)]
+
+        with patch.object(TrustScoreAnalyzer, '_score_sidewalk_edges', return_value=(0.5, 1)) as mock_edges:
+            series = analyzer.get_measures_series_from_polygon(Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]), dates)
+
+        # One fetch per element covers every date
+        self.assertEqual(osm_data_handler.get_item_history.call_count, 3)
+        self.assertEqual(mock_graph_from_polygon.call_count, 1)
+        self.assertEqual(mock_edges.call_count, 2)
+        self.assertEqual(series[dates[0]]['direct_trust_score'], 0)
+        self.assertEqual(series[dates[1]]['direct_trust_score'], 0.5)
+        self.assertEqual([series[date]['indirect_values']['poi_count'] for date in dates], [0, 0, 1])
+        self.assertEqual(mock_indirect_components.call_args.kwargs['date'], dates[2])
+        self.assertEqual(analyzer.date, datetime(2024, 1, 16))
+
+    @patch('osmnx.graph.graph_from_polygon', side_effect=ValueError('Empty graph'))
+    def test_get_measures_series_from_polygon_empty_graph(self, mock_graph_from_polygon):
+        dates = [datetime(2021, 1, 1), datetime(2023, 1, 1)]
+
+        series = self.trust_score_analyzer.get_measures_series_from_polygon(Polygon([(0, 0), (1, 0), (1, 1)]), dates)
+
+        self.assertEqual(list(series), dates)
+        self.assertIsNone(series[dates[0]]['indirect_values'])
+
+    def test_compute_edge_statistics_uses_planned_histories(self):
+        osm_data_handler = MagicMock()
+        analyzer = TrustScoreAnalyzer(lambda x: True, osm_data_handler, datetime(2024, 1, 16))
+        feature = pd.Series({'osmid': 10, 'versions': None, 'direct_confirmations': None, 'changes_to_tags': None,
+                             'rollbacks': None, 'tags': None, 'user_count': None, 'days_since_last_edit': None})
+        histories = {('way', 10): {1: {'user': 'user1', 'timestamp': datetime(2024, 1, 1), 'tag': {}}}}
+
+        result = analyzer._compute_edge_statistics(feature, histories)
+
+        osm_data_handler.get_way_history.assert_not_called()
+        self.assertEqual(result.user_count, 1)
+        self.assertEqual(result.days_since_last_edit, 15)
+
     @patch('src.osw_confidence_metric.trust_score_calculator._initialize_gdf_columns')
     @patch('src.osw_confidence_metric.trust_score_calculator._prepare_dask_dataframe')
     @patch('geonetworkx.graph_edges_to_gdf')
@@ -283,6 +481,22 @@ class TestTrustScoreAnalyzer(unittest.TestCase):
             'rollbacks', 'tags', 'user_count', 'days_since_last_edit'
         ]))
 
+    def test_calculate_comprehensive_trust_scores_with_supplied_thresholds(self):
+        gdf = gpd.GeoDataFrame({
+            'u': [1, 2], 'v': [2, 3], 'osmid': [10, 11],
+            'geometry': [LineString([(0, 0), (1, 1)]), LineString([(1, 1), (2, 2)])],
+            'versions': [1, 3], 'direct_confirmations': [0, 1], 'changes_to_tags': [0, 0], 'rollbacks': [0, 0],
+            'tags': [2, 4], 'user_count': [1, 3], 'days_since_last_edit': [10, 100],
+        })
+
+        own = _calculate_comprehensive_trust_scores(gdf.copy(), scheduler='synchronous')
+        supplied = _calculate_comprehensive_trust_scores(gdf.copy(), scheduler='synchronous', thresholds={
+            'versions': 0, 'direct_confirmations': 0, 'tags': 0, 'user_count': 0, 'days_since_last_edit': 0
+        })
+
+        self.assertEqual(tuple(round(score, 6) for score in own), (0.4, 0.5))
+        self.assertEqual(tuple(round(score, 6) for score in supplied), (0.8, 1))
+
     def test_calculate_comprehensive_trust_scores_empty_gdf(self):
         empty_gdf = gpd.GeoDataFrame(
             columns=['geometry', 'versions', 'direct_confirmations', 'tags', 'user_count', 'days_since_last_edit'])
@@ -2,13 +2,16 @@ import unittest
 import pandas as pd
 import geopandas as gpd
 from datetime import datetime
-from shapely.geometry import Polygon, Point
+from shapely.geometry import Polygon, Point, LineString
 from unittest.mock import patch, MagicMock
 from src.osw_confidence_metric.utils import compute_feature_indirect_trust, calculate_overall_trust_score, \
     calculate_indirect_trust_components_from_polygon, extract_features_from_polygon, extract_road_features_from_polygon, \
+    extract_feature_ids_from_polygon, extract_road_ids_from_polygon, \
     aggregate_feature_statistics, calculate_user_interaction_stats, calculate_number_users_edited, \
     calculate_days_since_last_edit, calculate_direct_confirmations, get_relevant_tags, count_tag_changes, \
-    check_for_rollbacks, count_tags, calculate_feature_trust_scores
+    check_for_rollbacks, count_tags, calculate_feature_trust_scores, compute_indirect_trust_scores, \
+    calculate_overall_trust_scores, extract_sidewalk_ways_from_polygon, extract_tile_road_ids, \
+    extract_indirect_feature_ids_from_polygon, INDIRECT_TRUST_ITEMS
 
 
 class MockFeature:
@@ -87,6 +90,37 @@ class TestUtils(unittest.TestCase):
         result = compute_feature_indirect_trust(feature=feature, thresholds=self.thresholds)
         self.assertEqual(result, 0)
 
+    def test_vectorized_scores_match_row_scores(self):
+        rows = [
+            {'road_users': 10, 'road_time': 20, 'poi_count': 30, 'poi_users': 40, 'poi_time': 50, 'bldg_count': 60,
+             'bldg_users': 70, 'bldg_time': 80},
+            {'road_users': None, 'road_time': 20, 'poi_count': 30, 'poi_users': None, 'poi_time': 0, 'bldg_count': 0,
+             'bldg_users': 0, 'bldg_time': None},
+            {'road_users': 5, 'road_time': 10, 'poi_count': 3, 'poi_users': 1, 'poi_time': 1, 'bldg_count': 1,
+             'bldg_users': 1, 'bldg_time': 0},
+            None,
+        ]
+        columns = pd.DataFrame([row or {} for row in rows], columns=INDIRECT_TRUST_ITEMS, dtype=float)
+        columns['direct_trust_score'] = [0.8, None, 0.4, 0.2]
+        columns['time_trust_score'] = [1, 0, None, 1]
+
+        indirect = compute_indirect_trust_scores(gdf=columns, thresholds=self.thresholds)
+        expected_indirect = [compute_feature_indirect_trust(feature=MockFeature(row), thresholds=self.thresholds)
+                             for row in rows]
+        self.assertEqual(list(indirect), expected_indirect)
+
+        columns['indirect_trust_score'] = indirect
+        overall = calculate_overall_trust_scores(gdf=columns)
+        for i, value in enumerate(overall):
+            row = columns.iloc[i].astype(object).where(columns.iloc[i].notna(), None)
+            feature = MockScoreFeature(direct=row['direct_trust_score'], indirect=row['indirect_trust_score'],
+                                       time=row['time_trust_score'])
+            self.assertAlmostEqual(value, calculate_overall_trust_score(feature=feature))
+
+    def test_calculate_overall_trust_scores_missing_columns(self):
+        result = calculate_overall_trust_scores(gdf=pd.DataFrame({'direct_trust_score': [0.6]}))
+        self.assertAlmostEqual(result.iloc[0], 0.3)
+
     def test_calculate_overall_trust_score_with_scores_present(self):
         feature = MockScoreFeature(direct=0.8, indirect=0.6, time=.4)
         result = calculate_overall_trust_score(feature=feature)
@@ -110,8 +144,8 @@ class TestUtils(unittest.TestCase):
         expected_score = (-0.5 * 0.5) + (-0.3 * 0.25) + (-0.2 * 0.25)
         self.assertAlmostEqual(result, expected_score)
 
-    @patch('src.osw_confidence_metric.utils.extract_features_from_polygon')
-    @patch('src.osw_confidence_metric.utils.extract_road_features_from_polygon')
+    @patch('src.osw_confidence_metric.utils.extract_feature_ids_from_polygon')
+    @patch('src.osw_confidence_metric.utils.extract_road_ids_from_polygon')
     @patch('src.osw_confidence_metric.utils.aggregate_feature_statistics')
     def test_calculate_indirect_trust_components_from_polygon(self, mock_aggregate_feature_statistics,
                                                               mock_extract_road_features_from_polygon,
@@ -125,7 +159,7 @@ class TestUtils(unittest.TestCase):
         polygon = 'valid_polygon'
 
         osm_data_handler = MagicMock()
-        result = calculate_indirect_trust_components_from_polygon(polygon=polygon, proj=self.proj, date=self.date,
+        result = calculate_indirect_trust_components_from_polygon(polygon=polygon, date=self.date,
                                                                   osm_data_handler=osm_data_handler)
         expected_values = {
             'poi_count': len(mock_extract_features_from_polygon.return_value),
@@ -154,7 +188,8 @@ class TestUtils(unittest.TestCase):
         tags = {'amenity': True}
 
         # Call the function
-        result = extract_features_from_polygon(polygon=polygon, tags=tags, proj=self.proj)
+        with self.assertWarns(DeprecationWarning):
+            result = extract_features_from_polygon(polygon=polygon, tags=tags, proj=self.proj)
 
         # Check the result is a GeoDataFrame
         self.assertIsInstance(result, gpd.GeoDataFrame)
@@ -189,11 +224,21 @@ class TestUtils(unittest.TestCase):
         polygon = Polygon([(0, 0), (1, 1), (1, 0)])
 
         # Call the function
-        result = extract_road_features_from_polygon(polygon=polygon, proj=self.proj)
+        with self.assertWarns(DeprecationWarning):
+            result = extract_road_features_from_polygon(polygon=polygon, proj=self.proj)
 
         # Check the result is a GeoDataFrame
         self.assertIsInstance(result, gpd.GeoDataFrame)
 
+    @patch('osmnx.features.features_from_polygon')
+    def test_extract_features_from_polygon_without_projection(self, mock_features_from_polygon):
+        dummy_gdf = gpd.GeoDataFrame({'geometry': [Point(1, 1)]}, crs='epsg:4326')
+        mock_features_from_polygon.return_value = MagicMock(wraps=dummy_gdf)
+
+        extract_features_from_polygon(polygon=Polygon([(0, 0), (1, 1), (1, 0)]), tags={'building': True})
+
+        mock_features_from_polygon.return_value.to_crs.assert_not_called()
+
     @patch('osmnx.graph.graph_from_polygon')
     def test_extract_road_features_from_polygon_failure(self, mock_graph_from_polygon):
         # Set up the mock to raise ValueError
@@ -211,6 +256,138 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(list(result.columns), expected_columns)
         self.assertTrue(result.empty)
 
+    @patch('osmnx._overpass._overpass_request')
+    @patch('osmnx._overpass._make_overpass_polygon_coord_strs')
+    def test_extract_feature_ids_from_polygon(self, mock_polygon_coord_strs, mock_overpass_request):
+        mock_polygon_coord_strs.return_value = ['0 0 1 1 1 0', '1 1 2 2 2 1']
+        mock_overpass_request.side_effect = [
+            {'elements': [
+                {'type': 'node', 'id': 1, 'version': 2, 'timestamp': '2023-12-01T10:00:00Z'},
+                {'type': 'way', 'id': 5, 'version': 1, 'timestamp': '2023-11-01T10:00:00Z'}
+            ]},
+            {'elements': [{'type': 'way', 'id': 5, 'version': 1, 'timestamp': '2023-11-01T10:00:00Z'}]}
+        ]
+
+        polygon = Polygon([(0, 0), (1, 1), (1, 0)])
+        result = extract_feature_ids_from_polygon(polygon=polygon, tags={'amenity': True})
+
+        self.assertEqual(list(result.columns), ['element_type', 'osmid', 'version', 'timestamp'])
+        self.assertEqual(list(zip(result['element_type'], result['osmid'])), [('node', 1), ('way', 5)])
+        self.assertEqual(result['timestamp'].iloc[0], pd.Timestamp(2023, 12, 1, 10))
+        query = mock_overpass_request.call_args_list[0].kwargs['data']['data']
+        self.assertIn("node['amenity'](poly:'0 0 1 1 1 0');", query)
+        self.assertIn("relation['amenity'](poly:'0 0 1 1 1 0');", query)
+        self.assertTrue(query.endswith('out meta;'))
+        self.assertNotIn('>;', query)
+
+    @patch('osmnx._overpass._make_overpass_polygon_coord_strs')
+    def test_extract_feature_ids_from_polygon_failure(self, mock_polygon_coord_strs):
+        mock_polygon_coord_strs.side_effect = ValueError
+
+        polygon = Polygon([(0, 0), (1, 1), (1, 0)])
+        result = extract_feature_ids_from_polygon(polygon=polygon, tags={'building': True})
+
+        self.assertEqual(list(result.columns), ['element_type', 'osmid', 'version', 'timestamp'])
+        self.assertTrue(result.empty)
+
+    @patch('osmnx._overpass._overpass_request')
+    @patch('osmnx._overpass._make_overpass_polygon_coord_strs')
+    def test_extract_road_ids_from_polygon(self, mock_polygon_coord_strs, mock_overpass_request):
+        mock_polygon_coord_strs.return_value = ['0 0 1 1 1 0']
+        mock_overpass_request.return_value = {
+            'elements': [{'type': 'way', 'id': 7, 'version': 3, 'timestamp': '2022-01-01T00:00:00Z'}]
+        }
+
+        polygon = Polygon([(0, 0), (1, 1), (1, 0)])
+        result = extract_road_ids_from_polygon(polygon=polygon)
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result['version'].iloc[0], 3)
+        query = mock_overpass_request.call_args.kwargs['data']['data']
+        self.assertIn('way["highway"]', query)
+        self.assertNotIn('>;', query)
+
+    def test_extract_tile_road_ids(self):
+        tiles = gpd.GeoDataFrame(geometry=[Polygon([(0, 0), (1, 0), (1, 1), (0, 1)]),
+                                           Polygon([(1, 0), (2, 0), (2, 1), (1, 1)]),
+                                           Polygon([(2, 0), (3, 0), (3, 1), (2, 1)])], index=[4, 5, 6],
+                                 crs='epsg:4326')
+        # Two segments of way 7 cross both of the first tiles, way 8 only the second one
+        roads = gpd.GeoDataFrame({'osmid': [7, 7, 8]}, geometry=[
+            LineString([(0.5, 0.5), (1.2, 0.5)]), LineString([(1.2, 0.5), (1.5, 0.5)]),
+            LineString([(1.5, 0.2), (1.5, 0.8)])
+        ], crs='epsg:4326')
+        road_ids = pd.DataFrame({'element_type': ['way'], 'osmid': [7], 'version': [3],
+                                 'timestamp': [pd.Timestamp(2022, 1, 1)]})
+
+        result = extract_tile_road_ids(tiles=tiles, roads=roads, road_ids=road_ids)
+
+        self.assertEqual(sorted(result), [4, 5, 6])
+        self.assertEqual(list(result[4]['osmid']), [7])
+        self.assertEqual(list(result[4].columns), ['element_type', 'osmid', 'version', 'timestamp'])
+        self.assertEqual(sorted(result[5]['osmid']), [7, 8])
+        self.assertTrue(result[5].set_index('osmid').loc[8, ['version', 'timestamp']].isna().all())
+        self.assertTrue(result[6].empty)
+
+    @patch('src.osw_confidence_metric.utils.extract_road_ids_from_polygon')
+    @patch('src.osw_confidence_metric.utils.extract_feature_ids_from_polygon')
+    def test_extract_indirect_feature_ids_from_polygon_with_road_ids(self, mock_extract_feature_ids,
+                                                                     mock_extract_road_ids):
+        road_ids = pd.DataFrame({'element_type': ['way'], 'osmid': [7], 'version': [3], 'timestamp': [None]})
+
+        result = extract_indirect_feature_ids_from_polygon(polygon=Polygon([(0, 0), (1, 1), (1, 0)]),
+                                                           road_ids=road_ids)
+
+        self.assertIs(result['road'], road_ids)
+        mock_extract_road_ids.assert_not_called()
+        self.assertEqual(mock_extract_feature_ids.call_count, 2)
+
+    @patch('osmnx._overpass._overpass_request')
+    @patch('osmnx._overpass._make_overpass_polygon_coord_strs')
+    def test_extract_sidewalk_ways_from_polygon(self, mock_polygon_coord_strs, mock_overpass_request):
+        mock_polygon_coord_strs.return_value = ['0 0 1 1 1 0', '1 1 2 2 2 1']
+        mock_overpass_request.return_value = {
+            'elements': [
+                {'type': 'way', 'id': 7, 'nodes': [1, 2, 3], 'tags': {'highway': 'footway'},
+                 'geometry': [{'lat': 0, 'lon': 0}, {'lat': 1, 'lon': 1}, {'lat': 1, 'lon': 2}]},
+                {'type': 'way', 'id': 8, 'nodes': [4], 'geometry': [{'lat': 0, 'lon': 0}]},
+            ]
+        }
+
+        polygon = Polygon([(0, 0), (1, 1), (1, 0)])
+        result = extract_sidewalk_ways_from_polygon(polygon=polygon, sidewalk_filter='["highway"~"footway"]')
+
+        self.assertEqual(list(result.columns), ['osmid', 'u', 'v', 'way_tags', 'geometry'])
+        self.assertEqual(len(result), 1)
+        self.assertEqual((result.at[0, 'osmid'], result.at[0, 'u'], result.at[0, 'v']), (7, 1, 3))
+        self.assertEqual(result.at[0, 'way_tags'], {'highway': 'footway'})
+        self.assertEqual(list(result.at[0, 'geometry'].coords), [(0, 0), (1, 1), (2, 1)])
+        query = mock_overpass_request.call_args.kwargs['data']['data']
+        self.assertIn('way["highway"~"footway"](poly:\'1 1 2 2 2 1\');out geom;', query)
+
+    @patch('osmnx._overpass._make_overpass_polygon_coord_strs', side_effect=ValueError)
+    def test_extract_sidewalk_ways_from_polygon_failure(self, mock_polygon_coord_strs):
+        result = extract_sidewalk_ways_from_polygon(polygon=Polygon([(0, 0), (1, 1), (1, 0)]), sidewalk_filter='')
+
+        self.assertIsInstance(result, gpd.GeoDataFrame)
+        self.assertTrue(result.empty)
+
+    @patch('src.osw_confidence_metric.osm_data_handler.OSMDataHandler')
+    def test_aggregate_feature_statistics_with_feature_ids(self, mock_osm_data_handler):
+        feature_ids = pd.DataFrame({'element_type': ['way'], 'osmid': [42], 'version': [1],
+                                    'timestamp': [pd.Timestamp(2023, 12, 27)]})
+        mock_osm_data_handler.return_value.get_item_history.return_value = {
+            1: {'user': 'user1', 'timestamp': datetime(2023, 12, 27)}
+        }
+
+        result = aggregate_feature_statistics(gdf=feature_ids, date=self.date,
+                                              osm_data_handler=mock_osm_data_handler.return_value)
+
+        item = mock_osm_data_handler.return_value.get_item_history.call_args.kwargs['item']
+        self.assertEqual(item['element_type'], 'way')
+        self.assertEqual(item['osmid'], 42)
+        self.assertEqual(result, (1, 5))
+
     @patch('src.osw_confidence_metric.osm_data_handler.OSMDataHandler')
     @patch('src.osw_confidence_metric.utils.calculate_user_interaction_stats')
     def test_aggregate_feature_statistics(self, mock_calculate_user_interaction_stats, mock_osm_data_handler):
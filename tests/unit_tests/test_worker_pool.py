@@ -0,0 +1,83 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from shapely.geometry import Polygon
+from src.osw_confidence_metric import worker_pool
+from src.osw_confidence_metric.worker_pool import TileWorkerPool, _init_worker, _score_tile
+from src.osw_confidence_metric.osm_data_handler import OSMDataHandler
+from src.osw_confidence_metric.trust_score_calculator import TrustScoreAnalyzer
+
+
+def _fake_measures(self, polygon, road_ids=None):
+    return {'direct_trust_score': polygon.bounds[0], 'scheduler': self.scheduler, 'pid': os.getpid(),
+            'handler_id': id(self.osm_data_handler), 'date': self.date}
+
+
+def _square(x):
+    return Polygon([(x, 0), (x + 1, 0), (x + 1, 1), (x, 1)])
+
+
+class TestWorkerInitializer(unittest.TestCase):
+
+    def tearDown(self):
+        worker_pool._worker_trust_score = None
+
+    def test_init_worker_preloads_modules_and_keeps_analyzer(self):
+        trust_score = MagicMock()
+
+        _init_worker(trust_score, ['json'])
+
+        self.assertIn('json', sys.modules)
+        self.assertIs(worker_pool._worker_trust_score, trust_score)
+        self.assertEqual(trust_score.scheduler, 'synchronous')
+
+    def test_score_tile_from_wkb(self):
+        trust_score = MagicMock()
+        trust_score.get_measures_from_polygon.return_value = {'direct_trust_score': 1}
+        _init_worker(trust_score, [])
+
+        tile_id, measures = _score_tile(7, _square(2).wkb, datetime(2024, 1, 16))
+
+        self.assertEqual(tile_id, 7)
+        self.assertEqual(trust_score.date, datetime(2024, 1, 16))
+        self.assertEqual(measures, {'direct_trust_score': 1})
+        self.assertTrue(trust_score.get_measures_from_polygon.call_args.kwargs['polygon'].equals(_square(2)))
+        self.assertIsNone(trust_score.get_measures_from_polygon.call_args.kwargs['road_ids'])
+
+        _score_tile(7, _square(2).wkb, datetime(2024, 1, 16), road_ids='road ids of tile 7')
+        self.assertEqual(trust_score.get_measures_from_polygon.call_args.kwargs['road_ids'], 'road ids of tile 7')
+
+
+class TestTileWorkerPool(unittest.TestCase):
+
+    @patch.object(TrustScoreAnalyzer, 'get_measures_from_polygon', new=_fake_measures)
+    def test_score_tiles_reuses_warm_workers(self):
+        trust_score = TrustScoreAnalyzer('["highway"]', OSMDataHandler(), datetime(2024, 1, 16))
+
+        with TileWorkerPool(trust_score=trust_score, processes=2, preload_modules=['json']) as pool:
+            first = dict(pool.score_tiles(tiles=[(i, _square(i)) for i in range(6)]))
+            # A date set after the workers started reaches them, as when a checkpointed run is resumed
+            trust_score.date = datetime(2023, 5, 1)
+            second = dict(pool.score_tiles(tiles=[(i, _square(i)) for i in range(6, 8)]))
+
+        self.assertIsNone(pool._executor)
+        self.assertEqual(sorted(first), list(range(6)))
+        self.assertEqual(first[3]['direct_trust_score'], 3)
+        self.assertEqual({measures['date'] for measures in first.values()}, {datetime(2024, 1, 16)})
+        self.assertEqual({measures['date'] for measures in second.values()}, {datetime(2023, 5, 1)})
+        results = list(first.values()) + list(second.values())
+        self.assertTrue(all(measures['scheduler'] == 'synchronous' for measures in results))
+        self.assertNotIn(os.getpid(), {measures['pid'] for measures in results})
+        self.assertLessEqual(len({measures['pid'] for measures in results}), 2)
+        # Each worker set its handler up once and kept it for every tile it scored
+        handlers_per_pid = {}
+        for measures in results:
+            handlers_per_pid.setdefault(measures['pid'], set()).add(measures['handler_id'])
+        self.assertTrue(all(len(handlers) == 1 for handlers in handlers_per_pid.values()))
+        self.assertEqual(trust_score.scheduler, 'multiprocessing')
+
+
+if __name__ == '__main__':
+    unittest.main()